@@ -5,8 +5,22 @@ Handles various AI models and response generation
 
 import logging
 import json
-from typing import Dict, List, Optional
+import os
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
+from ai_models.area_safety import AreaSafetyEngine, apply_incidents
+from ai_models.intent_matcher import default_matcher
+from ai_models.intent_responses import INTENT_RESPONSES
+from ai_models.places import create_places_source
+from ai_models.providers import ProviderError, create_provider
+from ai_models.route_safety import RouteSafetyScorer
+from ai_models.transformers_generator import get_generator
+from config.config import Config
+from utils.session_store import SessionStore, DEFAULT_SESSION
+from utils.history_db import SQLiteHistoryStore
+from utils.incident_log import IncidentAggregator
+from utils.sse import iter_chunks
+from utils.tile_grid import TileGrid, parse_hour
 
 logger = logging.getLogger(__name__)
 
@@ -21,11 +35,106 @@ class AIModelHandler:
             model_type: Type of model ('custom', 'transformers', 'api')
         """
         self.model_type = model_type
-        self.chat_history = []
+        self.chat_history = self._create_history_store()
         self.system_prompt = self._get_system_prompt()
+        self.intent_matcher = default_matcher
+        
+        # Intent responses are fixed texts, so they can be pre-encoded
+        self.constant_responses = frozenset(INTENT_RESPONSES.values())
+        
+        self.transformers_generator = None
+        if model_type == 'transformers':
+            self.transformers_generator = get_generator(
+                model_name=Config.MODEL_NAME,
+                max_new_tokens=Config.MAX_OUTPUT_LENGTH,
+                max_batch_size=Config.TRANSFORMERS_BATCH_SIZE,
+                max_wait_ms=Config.TRANSFORMERS_BATCH_WAIT_MS
+            )
+            try:
+                self.transformers_generator.warm_up()
+            except ImportError:
+                logger.warning("Transformers library not installed, using fallback")
+        
+        self.api_provider = None
+        if model_type == 'api':
+            try:
+                self.api_provider = self._create_api_provider()
+                self.api_provider.warm_up()
+            except ValueError as e:
+                logger.error(f"API provider not available, using fallback: {str(e)}")
+        
+        self.area_safety = self._create_area_engine()
+        self.incidents = IncidentAggregator(
+            Config.INCIDENT_LOG_PATH,
+            half_life_days=Config.INCIDENT_HALF_LIFE_DAYS,
+            precision=Config.INCIDENT_CELL_PRECISION,
+            reporter_cap=Config.INCIDENT_REPORTER_CAP,
+            cell_cap=Config.INCIDENT_CELL_CAP,
+            unverified_weight=Config.INCIDENT_UNVERIFIED_WEIGHT,
+            compact_bytes=Config.INCIDENT_COMPACT_BYTES
+        )
+        self.route_safety = RouteSafetyScorer(
+            self.area_safety,
+            incidents=self.incidents,
+            spacing_m=Config.ROUTE_SAMPLE_SPACING_M,
+            max_samples=Config.ROUTE_MAX_SAMPLES,
+            max_lookups=Config.ROUTE_MAX_LOOKUPS
+        )
         
         logger.info(f"Initializing AI Model Handler - Type: {model_type}")
     
+    def _create_area_engine(self) -> AreaSafetyEngine:
+        """Create the area safety engine on the places source selected by Config.PLACES_SOURCE"""
+        try:
+            source = create_places_source(
+                Config.PLACES_SOURCE,
+                api_key=Config.GOOGLE_PLACES_API_KEY,
+                fixture_path=Config.PLACES_FIXTURE_PATH
+            )
+        except ValueError as e:
+            logger.warning(f"{str(e)} - using the places fixture")
+            source = create_places_source('fixture', fixture_path=Config.PLACES_FIXTURE_PATH)
+        tiles = None
+        if os.path.exists(Config.SAFETY_TILES_PATH):
+            try:
+                tiles = TileGrid(Config.SAFETY_TILES_PATH, check_interval=Config.SAFETY_TILES_CHECK_INTERVAL)
+                logger.info(f"Serving precomputed safety tiles from {Config.SAFETY_TILES_PATH}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Safety tiles not available: {str(e)}")
+        return AreaSafetyEngine(source, ttl=Config.AREA_CACHE_TTL, max_entries=Config.AREA_CACHE_MAX_ENTRIES,
+                                tiles=tiles)
+    
+    def _create_api_provider(self):
+        """Create the hosted model provider selected by Config.API_PROVIDER"""
+        if Config.API_PROVIDER == 'stub':
+            return create_provider('stub', latency_ms=Config.STUB_LATENCY_MS)
+        return create_provider(
+            Config.API_PROVIDER,
+            api_key=Config.API_KEY,
+            models=[model.strip() for model in Config.API_MODELS if model.strip()],
+            pool_size=Config.API_POOL_SIZE,
+            connect_timeout=Config.API_CONNECT_TIMEOUT,
+            read_timeout=Config.API_READ_TIMEOUT
+        )
+    
+    def _create_history_store(self):
+        """Create the history backend selected by Config.HISTORY_BACKEND"""
+        sessions = SessionStore(
+            max_messages=Config.CHAT_HISTORY_LIMIT,
+            session_timeout=Config.SESSION_TIMEOUT.total_seconds(),
+            shards=Config.SESSION_STORE_SHARDS
+        )
+        if Config.HISTORY_BACKEND == 'sqlite':
+            return SQLiteHistoryStore(
+                Config.DATABASE_URL,
+                cache=sessions,
+                flush_interval=Config.HISTORY_FLUSH_INTERVAL,
+                batch_size=Config.HISTORY_BATCH_SIZE,
+                retention_days=Config.HISTORY_RETENTION_DAYS,
+                prune_interval=Config.HISTORY_PRUNE_INTERVAL
+            )
+        return sessions
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for emotional support"""
         return """You are a compassionate and empowering AI Safety Assistant for women's safety.
@@ -48,48 +157,37 @@ Remember: Your goal is both safety AND emotional wellbeing.
 Always validate feelings while providing practical solutions.
 """
     
-    def generate_response(self, user_message: str, context: Optional[Dict] = None) -> Dict:
+    def generate_response(self, user_message: str, context: Optional[Dict] = None,
+                          session_id: str = DEFAULT_SESSION) -> Dict:
         """
         Generate AI response with emotional support
         
         Args:
             user_message: User's input message
             context: Optional context data (location, time, etc.)
+            session_id: Conversation the exchange is recorded under
         
         Returns:
             Dictionary with AI response and metadata
         """
         try:
-            logger.info(f"Processing message: {user_message[:50]}...")
+            logger.info(f"Processing message ({len(user_message)} chars)")
             
-            # Add to chat history
-            self.chat_history.append({
+            user_entry = {
                 'role': 'user',
                 'content': user_message,
                 'timestamp': datetime.now().isoformat()
-            })
+            }
             
-            # Generate response based on model type
-            if self.model_type == 'transformers':
-                response = self._generate_with_transformers(user_message, context)
-            elif self.model_type == 'custom':
-                response = self._generate_with_custom_model(user_message, context)
-            elif self.model_type == 'api':
-                response = self._generate_with_api(user_message, context)
-            else:
-                response = self._generate_fallback_response(user_message)
+            response = self._generate(user_message, context)
             
-            # Add to chat history
-            self.chat_history.append({
+            # Add to chat history (bounded per session)
+            self.chat_history.append(session_id, user_entry, {
                 'role': 'assistant',
                 'content': response,
                 'timestamp': datetime.now().isoformat()
             })
             
-            # Keep chat history limited
-            if len(self.chat_history) > 20:
-                self.chat_history = self.chat_history[-20:]
-            
             return {
                 'success': True,
                 'response': response,
@@ -106,20 +204,52 @@ Always validate feelings while providing practical solutions.
                 'timestamp': datetime.now().isoformat()
             }
     
+    def stream_response(self, user_message: str, context: Optional[Dict] = None,
+                        session_id: str = DEFAULT_SESSION) -> Iterator[str]:
+        """
+        Generate AI response and yield it in sentence-sized chunks
+        
+        History is recorded once the full response has been produced.
+        """
+        user_entry = {
+            'role': 'user',
+            'content': user_message,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        try:
+            response = self._generate(user_message, context)
+        except Exception as e:
+            logger.error(f"Error generating streamed response: {str(e)}")
+            response = self._generate_fallback_response(user_message)
+        
+        for chunk in iter_chunks(response):
+            yield chunk
+        
+        self.chat_history.append(session_id, user_entry, {
+            'role': 'assistant',
+            'content': response,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def _generate(self, user_message: str, context: Optional[Dict] = None) -> str:
+        """Generate response based on model type"""
+        if self.model_type == 'transformers':
+            return self._generate_with_transformers(user_message, context)
+        elif self.model_type == 'custom':
+            return self._generate_with_custom_model(user_message, context)
+        elif self.model_type == 'api':
+            return self._generate_with_api(user_message, context)
+        return self._generate_fallback_response(user_message)
+    
     def _generate_with_transformers(self, user_message: str, context: Optional[Dict] = None) -> str:
         """Generate response using transformers library (Hugging Face models)"""
         try:
-            from transformers import pipeline
-            
-            # Use text generation pipeline
-            generator = pipeline('text-generation', model='gpt2')
-            
             # Create prompt with emotional support context
             prompt = f"{self.system_prompt}\n\nUser: {user_message}\n\nAssistant:"
             
-            # Generate response
-            result = generator(prompt, max_length=300, num_return_sequences=1)
-            response = result[0]['generated_text'].split("Assistant:")[-1].strip()
+            # Generate response on the shared, warm pipeline (batched with concurrent requests)
+            response = self.transformers_generator.generate(prompt, timeout=Config.TIMEOUT)
             
             return response
         
@@ -132,175 +262,41 @@ Always validate feelings while providing practical solutions.
     
     def _generate_with_custom_model(self, user_message: str, context: Optional[Dict] = None) -> str:
         """Generate response using custom rule-based model"""
-        
-        # Emotional support keywords and responses
-        emotional_keywords = {
-            'scared': self._respond_to_fear,
-            'anxious': self._respond_to_anxiety,
-            'afraid': self._respond_to_fear,
-            'uncomfortable': self._respond_to_discomfort,
-            'help': self._respond_to_help,
-            'emergency': self._respond_to_emergency,
-            'followed': self._respond_to_threat,
-            'alone': self._respond_to_isolation,
-            'safe': self._respond_to_safety_check,
-            'area': self._respond_to_area_check,
-        }
-        
-        # Check for keywords in message
-        message_lower = user_message.lower()
-        for keyword, handler in emotional_keywords.items():
-            if keyword in message_lower:
-                return handler(user_message)
+        intent = self.intent_matcher.classify(user_message)
+        if intent is not None:
+            return INTENT_RESPONSES[intent]
         
         # Default response
         return self._generate_general_response(user_message)
     
-    def _generate_with_api(self, user_message: str, context: Optional[Dict] = None) -> str:
-        """Generate response using external API (for future integration)"""
-        # Can be integrated with OpenAI, Anthropic, etc. in future
-        logger.info("API-based generation - using fallback for now")
-        return self._generate_fallback_response(user_message)
-    
-    # Response handlers for custom model
-    def _respond_to_fear(self, message: str) -> str:
-        return """I understand why you feel scared, and your concerns are completely valid. Fear is a 
-natural response to uncertain or potentially unsafe situations.
-
-Here's what you can do:
-1. **Acknowledge your fear** - It's your instinct protecting you
-2. **Trust your gut** - If something feels wrong, it probably is
-3. **Tell someone** - Share your location and plans with a trusted person
-4. **Stay visible** - Stay in populated, well-lit areas
-5. **Keep connected** - Ensure your phone is charged
-6. **Have a plan** - Know safe places and emergency contacts
-
-Remember: You are capable and strong. Fear doesn't mean you're weak - it means you're aware. 
-With these precautions, you can navigate confidently. You're not alone in this. 💚"""
-    
-    def _respond_to_anxiety(self, message: str) -> str:
-        return """I completely understand your anxiety, and it's valid. Many women experience anxiety 
-about their safety, especially when traveling or in unfamiliar situations.
-
-Here's how to manage anxiety while staying safe:
-1. **Prepare** - Plan your route beforehand
-2. **Breathe** - Deep breathing calms your nervous system
-3. **Connect** - Text friends about your whereabouts
-4. **Focus** - Keep your mind engaged (music, podcasts)
-5. **Celebrate** - Acknowledge your courage
-6. **Practice** - Start small and build confidence gradually
-
-Your anxiety is not weakness - it's awareness. With each safe journey, your confidence will grow.
-You have the strength to do this. Take it one step at a time. 💚"""
-    
-    def _respond_to_discomfort(self, message: str) -> str:
-        return """Your discomfort is telling you something important. Trust that feeling.
-
-When you feel uncomfortable:
-1. **Acknowledge it** - Don't ignore your instincts
-2. **Remove yourself** - Leave the situation if possible
-3. **Go to safety** - Find a public, populated place
-4. **Tell someone** - Contact a trusted friend or family
-5. **Don't apologize** - Your safety comes first
-6. **Debrief** - Talk about it to process the experience
-
-Remember: You have every right to feel safe and comfortable. Your instincts are protecting you. 
-Listen to them. You deserve to be in environments where you feel good. 💚"""
-    
-    def _respond_to_help(self, message: str) -> str:
-        return """I'm here to help you. Your safety and well-being are important.
-
-Here's what you can do:
-1. **Describe the situation** - Tell me specifically what concerns you
-2. **Share context** - Time, location, and people involved matter
-3. **Ask directly** - What specific help do you need?
-4. **Trust resources** - Emergency contacts and services are available
-5. **Reach out** - Don't isolate yourself in difficult situations
-
-Whatever you're facing, remember: You are not alone. Help is available. Emergency services 
-are just a call away. I'm here to support you with guidance and encouragement. 💚"""
-    
-    def _respond_to_emergency(self, message: str) -> str:
-        return """🚨 EMERGENCY RESPONSE 🚨
-
-If you are in immediate danger:
-1. **CALL EMERGENCY IMMEDIATELY** - Dial 911 (or your country's emergency number)
-2. **Go to safety** - Leave the situation if possible
-3. **Tell someone** - Inform a trusted person of your location
-4. **Stay on the line** - Keep communication with emergency services
-5. **Provide details** - Location, description of threat, number of people
-
-This AI is support and guidance, NOT emergency response.
-For immediate danger, always call emergency services first.
-
-Your safety is the priority. Get help NOW. 💚"""
+    def is_constant_response(self, response: str) -> bool:
+        """Whether a response is one of the fixed intent responses"""
+        return response in self.constant_responses
     
-    def _respond_to_threat(self, message: str) -> str:
-        return """This is serious, and I'm taking your safety very seriously.
-
-If you're being followed:
-1. **Trust your instincts** - If you feel threatened, you probably are
-2. **Go to safety** - Head to a police station, hospital, or public place
-3. **Be visible** - Stay in well-lit, populated areas
-4. **Don't go home** - Don't lead them to your residence
-5. **Call for help** - Contact police or emergency services
-6. **Tell someone** - Inform a trusted person immediately
-
-If in immediate danger, CALL 911 NOW.
-
-Your safety is paramount. Don't hesitate to reach out for help. 💚"""
-    
-    def _respond_to_isolation(self, message: str) -> str:
-        return """I hear you. Feeling alone can make safety concerns feel bigger and scarier.
-
-You're not truly alone:
-1. **Connect with people** - Reach out to friends, family, or support groups
-2. **Build your network** - Find trusted people in your life
-3. **Join communities** - Safety groups, hobby groups, or online communities
-4. **Professional support** - Counselors and therapists are available
-5. **This app** - I'm here 24/7 for support and guidance
-6. **Emergency services** - Always available when you need them
-
-Remember: Isolation amplifies fear. Connection builds confidence. You deserve community 
-and support. Reach out. You don't have to do this alone. 💚"""
-    
-    def _respond_to_safety_check(self, message: str) -> str:
-        return """Great question - assessing safety is smart thinking.
-
-To evaluate if an area is safe:
-1. **Time of day** - Daytime = more people = safer
-2. **Visibility** - Well-lit streets with clear sightlines
-3. **Foot traffic** - More people = more witnesses and help
-4. **Nearby services** - Police, hospitals, businesses
-5. **Your instinct** - How do you FEEL about the area?
-6. **Get updates** - Check recent incident reports if available
-
-Safe areas typically have:
-- Good lighting
-- Active businesses and people
-- Emergency services nearby
-- Community presence
-- Low reported incidents
-
-Trust your gut feeling about places. If it doesn't feel right, avoid it. 💚"""
+    def classify_many(self, messages: List[str]) -> List[Optional[str]]:
+        """
+        Classify a batch of messages with the custom model's intent matcher
+        
+        Args:
+            messages: User messages to classify
+        
+        Returns:
+            Intent name per message, or None when no intent matched
+        """
+        return self.intent_matcher.classify_many(messages)
     
-    def _respond_to_area_check(self, message: str) -> str:
-        return """I can help you assess an area's safety.
-
-To give you accurate guidance, I need to know:
-1. **Which area?** - Specific location or neighborhood
-2. **What time?** - Day, evening, night?
-3. **Your activity** - What will you be doing?
-4. **Travel method** - Walking, driving, transit?
-5. **With who** - Alone, with friends?
-
-Once I understand your situation, I can provide:
-- Safety assessment
-- Practical precautions
-- Alternative options
-- Emergency resources
-
-Tell me more about your plan, and I'll help you prepare safely. 💚"""
+    def _generate_with_api(self, user_message: str, context: Optional[Dict] = None) -> str:
+        """Generate response using the hosted model provider"""
+        if self.api_provider is None:
+            return self._generate_fallback_response(user_message)
+        
+        try:
+            prompt = f"{self.system_prompt}\n\nUser: {user_message}\n\nAssistant:"
+            return self.api_provider.generate(prompt, timeout=Config.TIMEOUT)
+        
+        except ProviderError as e:
+            logger.warning(f"{self.api_provider.name} provider failed: {str(e)}")
+            return self._generate_fallback_response(user_message)
     
     def _generate_general_response(self, message: str) -> str:
         """Generate a general helpful response"""
@@ -338,27 +334,40 @@ Key safety principles:
 For specific advice on your situation, please share more details, and I'll provide 
 tailored guidance. Your safety and well-being matter. 💚"""
     
-    def clear_history(self):
-        """Clear chat history"""
-        self.chat_history = []
+    def clear_history(self, session_id: str = DEFAULT_SESSION):
+        """Clear chat history for a session"""
+        self.chat_history.clear(session_id)
         logger.info("Chat history cleared")
     
-    def get_history(self) -> List[Dict]:
-        """Get chat history"""
-        return self.chat_history
+    def get_history(self, session_id: str = DEFAULT_SESSION) -> List[Dict]:
+        """Get chat history for a session"""
+        return self.chat_history.get(session_id)
     
     def process_area_safety(self, latitude: float, longitude: float, 
-                          radius: int = 500) -> Dict:
+                          radius: int = 500, time_of_day: Optional[str] = None) -> Dict:
         """
         Process area safety analysis
-        Can be integrated with maps data in future
+        
+        Scores the area from nearby places (results are shared per geohash cell),
+        lowered by incidents reported around it
+        
+        Args:
+            time_of_day: Time the user asked about ("9:30 PM" or "21:30"); defaults to now
         """
-        return {
-            'location': {
-                'latitude': latitude,
-                'longitude': longitude,
-                'radius': radius
-            },
-            'analysis': f"Area analysis for location ({latitude}, {longitude})",
-            'timestamp': datetime.now().isoformat()
-        }
+        analysis = self.area_safety.assess(latitude, longitude, radius, parse_hour(time_of_day))
+        apply_incidents(analysis, self.incidents.summary(latitude, longitude))
+        analysis['analysis'] = analysis['message']
+        return analysis
+    
+    def process_route_safety(self, polylines: List[str], radius: int = 500) -> Dict:
+        """
+        Score alternative routes and mark the safest
+        
+        Each sampled cell is lowered by reported incidents, as in process_area_safety
+        
+        Raises:
+            ValueError: If a polyline cannot be decoded
+        """
+        result = self.route_safety.score_routes(polylines, radius)
+        result['timestamp'] = datetime.now().isoformat()
+        return result
@@ -0,0 +1,341 @@
+"""
+Area safety scoring from nearby places
+Scores a location by the types and ratings of nearby places (same rules as the
+app's GooglePlacesSafetyService) and caches results per geohash cell and radius bucket,
+so everyone in the same neighbourhood shares one upstream lookup
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ai_models.places import PlacesSource, PlacesSourceError
+from utils import geohash
+from utils.tile_grid import TileGrid, hour_of_week
+
+logger = logging.getLogger(__name__)
+
+# Safety indicators based on place types (first matching type wins)
+PLACE_TYPE_SCORES = {
+    'police': 100,
+    'hospital': 95,
+    'fire_station': 95,
+    'shopping_mall': 80,
+    'grocery_or_supermarket': 75,
+    'cafe': 70,
+    'restaurant': 70,
+    'bank': 75,
+    'atm': 60,
+    'parking': 50,
+    'parking_lot': 50,
+    'gas_station': 65,
+    'transit_station': 65,
+    'bus_station': 65,
+    'train_station': 65,
+    'park': 40,
+    'night_club': 30,
+    'bar': 35,
+    'liquor_store': 25,
+    'movie_theater': 75,
+}
+
+NEUTRAL_PLACE_SCORE = 50
+MAX_PLACES = 10  # Places considered per check, as in the app
+
+# Points taken off a score per unit of decayed incident weight: in the current
+# time-of-day bucket, in the rest of the day, and at most overall
+RECENT_INCIDENT_PENALTY = 10
+OTHER_INCIDENT_PENALTY = 3
+MAX_INCIDENT_PENALTY = 30
+
+# Radii are rounded up to one of these so nearby requests share cache entries
+RADIUS_BUCKETS = (250, 500, 1000, 2000, 5000)
+
+
+def radius_bucket(radius: float) -> int:
+    for bucket in RADIUS_BUCKETS:
+        if radius <= bucket:
+            return bucket
+    return RADIUS_BUCKETS[-1]
+
+
+def cell_precision(radius: int) -> int:
+    """Geohash precision whose cells are small next to the search radius"""
+    if radius <= 250:
+        return 8  # ~38 m x 19 m
+    if radius <= 1000:
+        return 7  # ~153 m x 153 m
+    return 6  # ~1.2 km x 0.6 km
+
+
+def score_place(place: Dict) -> Tuple[int, Optional[str]]:
+    """Score one place by its first known type, scaled by its rating"""
+    score = NEUTRAL_PLACE_SCORE
+    matched = None
+    for place_type in place.get('types') or []:
+        if place_type in PLACE_TYPE_SCORES:
+            score = PLACE_TYPE_SCORES[place_type]
+            matched = place_type
+            break
+    rating = float(place.get('rating') or 0.0)
+    if rating > 0:
+        score = int(score * (rating / 5.0))
+    return score, matched
+
+
+def describe_score(score: int) -> Tuple[str, str]:
+    """(message, recommendation) for a safety score"""
+    if score >= 80:
+        return ('Area is VERY SAFE with good infrastructure and businesses.',
+                'Good area to be in. Maintain normal precautions.')
+    if score >= 60:
+        return ('Area is MODERATELY SAFE with decent infrastructure.',
+                'Area is reasonably safe. Stay alert and avoid late night visits.')
+    if score >= 40:
+        return ('Area has MIXED SAFETY with some concerning locations.',
+                'Use caution. Avoid isolated areas and travel in groups if possible.')
+    return ('Area has POOR SAFETY indicators.',
+            'Avoid this area if possible. If you must go, use extreme caution and inform others.')
+
+
+def analyze_places(places: List[Dict]) -> Dict:
+    """Turn nearby places into a safety verdict"""
+    if not places:
+        return {
+            'isSafe': False,
+            'safetyScore': 30,
+            'message': 'Area appears isolated with no nearby places.',
+            'recommendation': 'Avoid this area, especially at night.',
+            'details': {'totalPlaces': 0},
+        }
+
+    total_score = 0
+    safe_places = 0
+    risky_places = 0
+    neutral_places = 0
+    places_by_type: Dict[str, int] = {}
+
+    for place in places:
+        score, matched = score_place(place)
+        if matched:
+            places_by_type[matched] = places_by_type.get(matched, 0) + 1
+        total_score += score
+        if score >= 70:
+            safe_places += 1
+        elif score < 40:
+            risky_places += 1
+        else:
+            neutral_places += 1
+
+    average = total_score // len(places)
+    message, recommendation = describe_score(average)
+
+    return {
+        'isSafe': average >= 60 and safe_places > risky_places,
+        'safetyScore': average,
+        'message': message,
+        'recommendation': recommendation,
+        'details': {
+            'totalPlaces': len(places),
+            'safePlaces': safe_places,
+            'riskyPlaces': risky_places,
+            'neutralPlaces': neutral_places,
+            'placeTypes': places_by_type,
+        },
+    }
+
+
+def apply_incidents(analysis: Dict, incidents: Dict) -> Dict:
+    """Lower an analysis by the reported incidents around it (see IncidentAggregator.summary)"""
+    if analysis.get('isSafe') is None:
+        return analysis  # Scoring failed; nothing to adjust
+    penalty = min(MAX_INCIDENT_PENALTY, round(
+        RECENT_INCIDENT_PENALTY * incidents['recent']
+        + OTHER_INCIDENT_PENALTY * (incidents['allDay'] - incidents['recent'])
+    ))
+    analysis['incidents'] = dict(incidents, penalty=penalty)
+    if penalty:
+        score = max(0, analysis['safetyScore'] - penalty)
+        analysis['safetyScore'] = score
+        analysis['isSafe'] = bool(analysis['isSafe']) and score >= 60
+        analysis['message'], analysis['recommendation'] = describe_score(score)
+    return analysis
+
+
+class AreaSafetyEngine:
+    """Scores locations, sharing cached results per geohash cell"""
+
+    def __init__(self, source: PlacesSource, ttl: float = 600, max_entries: int = 10000,
+                 wait_timeout: float = 15.0, tiles: Optional[TileGrid] = None):
+        """
+        Args:
+            source: Where nearby places come from
+            ttl: Seconds a cell's result is reused
+            max_entries: Cached cells kept before the least recently used are evicted
+            wait_timeout: How long a request waits on another request's lookup of the same cell
+            tiles: Precomputed scores, answered before the cache and the source
+        """
+        self.source = source
+        self.tiles = tiles
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (result, expires_at)
+        self._in_flight: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self.tile_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.lookups = 0
+        self.evictions = 0
+
+    def cell_for(self, latitude: float, longitude: float, radius: float) -> Tuple[str, int]:
+        bucket = radius_bucket(radius)
+        return geohash.encode(latitude, longitude, cell_precision(bucket)), bucket
+
+    def _cached(self, key: tuple, now: float) -> Optional[Dict]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    def _lookup(self, cell: str, bucket: int) -> Dict:
+        """Score a cell from its centre, so every point in the cell gets the same answer"""
+        latitude, longitude = geohash.center(cell)
+        places = self.source.nearby(latitude, longitude, bucket)
+        return analyze_places(places[:MAX_PLACES])
+
+    def cached_cell(self, cell: str, bucket: int) -> Optional[Dict]:
+        """A cell's cached analysis, or None; never calls the places source"""
+        with self._lock:
+            result = self._cached((cell, bucket), time.monotonic())
+            if result is not None:
+                self.hits += 1
+            return result
+
+    def score_cell(self, cell: str, bucket: int) -> Tuple[Dict, bool]:
+        """
+        Return (analysis, cached) for a cell; concurrent misses share one lookup
+
+        Raises:
+            PlacesSourceError: If the places source failed
+        """
+        key = (cell, bucket)
+        while True:
+            with self._lock:
+                result = self._cached(key, time.monotonic())
+                if result is not None:
+                    self.hits += 1
+                    return result, True
+                waiting = self._in_flight.get(key)
+                if waiting is None:
+                    self.misses += 1
+                    self.lookups += 1
+                    done = self._in_flight[key] = threading.Event()
+                    break
+            # Another request is fetching this cell; use its result when it lands
+            if not waiting.wait(self.wait_timeout):
+                with self._lock:
+                    self.misses += 1
+                    self.lookups += 1
+                done = None
+                break
+
+        try:
+            result = self._lookup(cell, bucket)
+        except Exception:
+            self._finish_flight(key, done)
+            raise
+
+        with self._lock:
+            self._cache[key] = (result, time.monotonic() + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        self._finish_flight(key, done)
+        return result, False
+
+    def _finish_flight(self, key: tuple, done: Optional[threading.Event]):
+        if done is None:
+            return
+        with self._lock:
+            if self._in_flight.get(key) is done:
+                del self._in_flight[key]
+        done.set()
+
+    def assess(self, latitude: float, longitude: float, radius: float = 500,
+               hour_of_day: Optional[int] = None) -> Dict:
+        """
+        Score the area around a point
+
+        Args:
+            hour_of_day: Hour (0-23) the user asked about, today; defaults to now.
+                Only the hourly tile scores depend on it.
+        """
+        if self.tiles is not None:
+            hour = hour_of_week(hour_of_day=hour_of_day)
+            score = self.tiles.lookup(latitude, longitude, hour)
+            if score is not None:
+                with self._lock:
+                    self.tile_hits += 1
+                message, recommendation = describe_score(score)
+                return {
+                    'isSafe': score >= 60,
+                    'safetyScore': score,
+                    'message': message,
+                    'recommendation': recommendation,
+                    'details': {'hourOfWeek': hour},
+                    'location': {'latitude': latitude, 'longitude': longitude, 'radius': radius},
+                    'cached': True,
+                    'source': 'tiles',
+                    'timestamp': datetime.now().isoformat()
+                }
+
+        cell, bucket = self.cell_for(latitude, longitude, radius)
+        try:
+            analysis, cached = self.score_cell(cell, bucket)
+        except PlacesSourceError as e:
+            logger.error(f"Error checking area safety: {str(e)}")
+            return {
+                'isSafe': None,
+                'safetyScore': 0,
+                'message': 'Unable to analyze area safety at this moment.',
+                'error': str(e),
+                'location': {'latitude': latitude, 'longitude': longitude, 'radius': radius},
+                'timestamp': datetime.now().isoformat()
+            }
+
+        return dict(
+            analysis,
+            location={'latitude': latitude, 'longitude': longitude, 'radius': radius},
+            cell=cell,
+            radiusBucket=bucket,
+            cached=cached,
+            source=self.source.name,
+            timestamp=datetime.now().isoformat()
+        )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'tiles': self.tiles.stats() if self.tiles is not None else None,
+                'tile_hits': self.tile_hits,
+                'cells': len(self._cache),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'upstream_lookups': self.lookups,
+                'evictions': self.evictions,
+                'ttl_seconds': self.ttl,
+                'source': self.source.name,
+            }
@@ -0,0 +1,92 @@
+"""
+Intent matcher for the custom rule-based model
+Compiles all emotional keywords into a single pattern at startup
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Keyword -> intent mapping used by the custom model
+INTENT_KEYWORDS = {
+    'scared': 'fear',
+    'afraid': 'fear',
+    'anxious': 'anxiety',
+    'uncomfortable': 'discomfort',
+    'help': 'help',
+    'emergency': 'emergency',
+    'followed': 'threat',
+    'alone': 'isolation',
+    'safe': 'safety_check',
+    'area': 'area_check',
+}
+
+# Most severe first - when several intents match, the earliest one wins
+INTENT_SEVERITY = [
+    'emergency',
+    'threat',
+    'fear',
+    'discomfort',
+    'anxiety',
+    'isolation',
+    'help',
+    'area_check',
+    'safety_check',
+]
+
+
+class IntentMatcher:
+    """Single-pass keyword matcher that picks the most severe intent"""
+
+    def __init__(self, keywords: Dict[str, str] = None,
+                 severity: List[str] = None):
+        """
+        Build the matcher
+
+        Args:
+            keywords: Mapping of keyword to intent name
+            severity: Intent names ordered from most to least severe
+        """
+        self.keywords = dict(keywords or INTENT_KEYWORDS)
+        severity = severity or INTENT_SEVERITY
+
+        unranked = set(self.keywords.values()) - set(severity)
+        if unranked:
+            raise ValueError(f"Intents missing from severity order: {sorted(unranked)}")
+
+        self._rank = {intent: rank for rank, intent in enumerate(severity)}
+
+        # Longest keywords first so overlapping alternatives prefer the longer match
+        alternation = '|'.join(
+            re.escape(keyword) for keyword in sorted(self.keywords, key=len, reverse=True)
+        )
+        self._pattern = re.compile(alternation)
+
+    def scores(self, message: str) -> Dict[str, int]:
+        """Count keyword hits per intent in a single scan of the message"""
+        counts: Dict[str, int] = {}
+        for match in self._pattern.finditer(message.lower()):
+            intent = self.keywords[match.group(0)]
+            counts[intent] = counts.get(intent, 0) + 1
+        return counts
+
+    def classify(self, message: str) -> Optional[str]:
+        """Return the most severe matched intent, or None when nothing matches"""
+        best = None
+        best_rank = len(self._rank)
+        for match in self._pattern.finditer(message.lower()):
+            rank = self._rank[self.keywords[match.group(0)]]
+            if rank < best_rank:
+                best_rank = rank
+                best = match.group(0)
+                if rank == 0:
+                    break
+        return self.keywords[best] if best is not None else None
+
+    def classify_many(self, messages: Iterable[str]) -> List[Optional[str]]:
+        """Classify a batch of messages"""
+        classify = self.classify
+        return [classify(message) for message in messages]
+
+
+# Shared matcher, compiled once at import time
+default_matcher = IntentMatcher()
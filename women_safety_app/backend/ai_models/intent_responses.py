@@ -0,0 +1,128 @@
+"""
+Fixed responses for the custom model's intents
+Also imported by the Gemini backend, which answers common chat messages with them locally.
+"""
+
+INTENT_RESPONSES = {
+    'fear': """I understand why you feel scared, and your concerns are completely valid. Fear is a 
+natural response to uncertain or potentially unsafe situations.
+
+Here's what you can do:
+1. **Acknowledge your fear** - It's your instinct protecting you
+2. **Trust your gut** - If something feels wrong, it probably is
+3. **Tell someone** - Share your location and plans with a trusted person
+4. **Stay visible** - Stay in populated, well-lit areas
+5. **Keep connected** - Ensure your phone is charged
+6. **Have a plan** - Know safe places and emergency contacts
+
+Remember: You are capable and strong. Fear doesn't mean you're weak - it means you're aware. 
+With these precautions, you can navigate confidently. You're not alone in this. 💚""",
+    'anxiety': """I completely understand your anxiety, and it's valid. Many women experience anxiety 
+about their safety, especially when traveling or in unfamiliar situations.
+
+Here's how to manage anxiety while staying safe:
+1. **Prepare** - Plan your route beforehand
+2. **Breathe** - Deep breathing calms your nervous system
+3. **Connect** - Text friends about your whereabouts
+4. **Focus** - Keep your mind engaged (music, podcasts)
+5. **Celebrate** - Acknowledge your courage
+6. **Practice** - Start small and build confidence gradually
+
+Your anxiety is not weakness - it's awareness. With each safe journey, your confidence will grow.
+You have the strength to do this. Take it one step at a time. 💚""",
+    'discomfort': """Your discomfort is telling you something important. Trust that feeling.
+
+When you feel uncomfortable:
+1. **Acknowledge it** - Don't ignore your instincts
+2. **Remove yourself** - Leave the situation if possible
+3. **Go to safety** - Find a public, populated place
+4. **Tell someone** - Contact a trusted friend or family
+5. **Don't apologize** - Your safety comes first
+6. **Debrief** - Talk about it to process the experience
+
+Remember: You have every right to feel safe and comfortable. Your instincts are protecting you. 
+Listen to them. You deserve to be in environments where you feel good. 💚""",
+    'help': """I'm here to help you. Your safety and well-being are important.
+
+Here's what you can do:
+1. **Describe the situation** - Tell me specifically what concerns you
+2. **Share context** - Time, location, and people involved matter
+3. **Ask directly** - What specific help do you need?
+4. **Trust resources** - Emergency contacts and services are available
+5. **Reach out** - Don't isolate yourself in difficult situations
+
+Whatever you're facing, remember: You are not alone. Help is available. Emergency services 
+are just a call away. I'm here to support you with guidance and encouragement. 💚""",
+    'emergency': """🚨 EMERGENCY RESPONSE 🚨
+
+If you are in immediate danger:
+1. **CALL EMERGENCY IMMEDIATELY** - Dial 911 (or your country's emergency number)
+2. **Go to safety** - Leave the situation if possible
+3. **Tell someone** - Inform a trusted person of your location
+4. **Stay on the line** - Keep communication with emergency services
+5. **Provide details** - Location, description of threat, number of people
+
+This AI is support and guidance, NOT emergency response.
+For immediate danger, always call emergency services first.
+
+Your safety is the priority. Get help NOW. 💚""",
+    'threat': """This is serious, and I'm taking your safety very seriously.
+
+If you're being followed:
+1. **Trust your instincts** - If you feel threatened, you probably are
+2. **Go to safety** - Head to a police station, hospital, or public place
+3. **Be visible** - Stay in well-lit, populated areas
+4. **Don't go home** - Don't lead them to your residence
+5. **Call for help** - Contact police or emergency services
+6. **Tell someone** - Inform a trusted person immediately
+
+If in immediate danger, CALL 911 NOW.
+
+Your safety is paramount. Don't hesitate to reach out for help. 💚""",
+    'isolation': """I hear you. Feeling alone can make safety concerns feel bigger and scarier.
+
+You're not truly alone:
+1. **Connect with people** - Reach out to friends, family, or support groups
+2. **Build your network** - Find trusted people in your life
+3. **Join communities** - Safety groups, hobby groups, or online communities
+4. **Professional support** - Counselors and therapists are available
+5. **This app** - I'm here 24/7 for support and guidance
+6. **Emergency services** - Always available when you need them
+
+Remember: Isolation amplifies fear. Connection builds confidence. You deserve community 
+and support. Reach out. You don't have to do this alone. 💚""",
+    'safety_check': """Great question - assessing safety is smart thinking.
+
+To evaluate if an area is safe:
+1. **Time of day** - Daytime = more people = safer
+2. **Visibility** - Well-lit streets with clear sightlines
+3. **Foot traffic** - More people = more witnesses and help
+4. **Nearby services** - Police, hospitals, businesses
+5. **Your instinct** - How do you FEEL about the area?
+6. **Get updates** - Check recent incident reports if available
+
+Safe areas typically have:
+- Good lighting
+- Active businesses and people
+- Emergency services nearby
+- Community presence
+- Low reported incidents
+
+Trust your gut feeling about places. If it doesn't feel right, avoid it. 💚""",
+    'area_check': """I can help you assess an area's safety.
+
+To give you accurate guidance, I need to know:
+1. **Which area?** - Specific location or neighborhood
+2. **What time?** - Day, evening, night?
+3. **Your activity** - What will you be doing?
+4. **Travel method** - Walking, driving, transit?
+5. **With who** - Alone, with friends?
+
+Once I understand your situation, I can provide:
+- Safety assessment
+- Practical precautions
+- Alternative options
+- Emergency resources
+
+Tell me more about your plan, and I'll help you prepare safely. 💚""",
+}
@@ -0,0 +1,133 @@
+"""
+Nearby-places sources for area safety scoring
+GooglePlacesSource calls Places Nearby Search; FixturePlacesSource answers from a
+local JSON file so the engine works offline and in tests
+"""
+
+import json
+import logging
+import math
+import threading
+from typing import Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.json_codec import loads
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+
+class PlacesSourceError(Exception):
+    """Raised when nearby places could not be fetched"""
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class PlacesSource:
+    """Interface for nearby-places lookups"""
+
+    name = 'base'
+
+    def nearby(self, latitude: float, longitude: float, radius: int) -> List[Dict]:
+        """
+        Return places near a point, in Places API result format
+        (name, place_id, types, rating, opening_hours, geometry)
+
+        Raises:
+            PlacesSourceError: If the lookup failed
+        """
+        raise NotImplementedError
+
+
+class GooglePlacesSource(PlacesSource):
+    """Google Places Nearby Search over a pooled keep-alive session"""
+
+    name = 'google'
+    URL = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+
+    def __init__(self, api_key: str, timeout: float = 10.0, pool_size: int = 10):
+        if not api_key:
+            raise ValueError("GooglePlacesSource needs an API key (set GOOGLE_PLACES_API_KEY)")
+        self.api_key = api_key
+        self.timeout = timeout
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def nearby(self, latitude: float, longitude: float, radius: int) -> List[Dict]:
+        try:
+            response = self._session.get(self.URL, params={
+                'location': f"{latitude},{longitude}",
+                'radius': radius,
+                'key': self.api_key,
+            }, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise PlacesSourceError(str(e))
+
+        if response.status_code != 200:
+            raise PlacesSourceError(f"Google API error: {response.status_code}")
+        try:
+            data = loads(response.content)
+        except ValueError:
+            raise PlacesSourceError("Google API returned invalid JSON")
+        if data.get('status') not in ('OK', 'ZERO_RESULTS', None):
+            raise PlacesSourceError(f"Google API status: {data.get('status')}")
+        return data.get('results') or []
+
+
+class FixturePlacesSource(PlacesSource):
+    """Places from a local JSON file (a list of Places API results)"""
+
+    name = 'fixture'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._places = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[Dict]:
+        if self._places is None:
+            with self._lock:
+                if self._places is None:
+                    try:
+                        with open(self.path, encoding='utf-8') as handle:
+                            self._places = json.load(handle)
+                    except (OSError, ValueError) as e:
+                        raise PlacesSourceError(f"Could not load places fixture {self.path}: {str(e)}")
+                    logger.info(f"Loaded {len(self._places)} fixture places from {self.path}")
+        return self._places
+
+    def nearby(self, latitude: float, longitude: float, radius: int) -> List[Dict]:
+        found = []
+        for place in self._load():
+            location = place.get('geometry', {}).get('location', {})
+            if 'lat' not in location or 'lng' not in location:
+                continue
+            distance = distance_m(latitude, longitude, location['lat'], location['lng'])
+            if distance <= radius:
+                found.append((distance, place))
+        found.sort(key=lambda item: item[0])
+        return [place for _, place in found]
+
+
+def create_places_source(name: str, **settings) -> PlacesSource:
+    """
+    Build a places source by name ('google' or 'fixture')
+
+    Raises:
+        ValueError: If the source name is unknown
+    """
+    if name == GooglePlacesSource.name:
+        return GooglePlacesSource(settings['api_key'], timeout=settings.get('timeout', 10.0))
+    if name == FixturePlacesSource.name:
+        return FixturePlacesSource(settings['fixture_path'])
+    raise ValueError(f"Unknown places source: {name}")
@@ -0,0 +1,185 @@
+"""
+Hosted model providers for the 'api' model type
+Each provider turns a prompt into text; Gemini uses one pooled keep-alive session
+per process, and the stub provider answers locally for offline testing
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.json_codec import loads
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """Raised when a provider could not produce a response"""
+
+
+class Provider:
+    """Interface for hosted model providers"""
+
+    name = 'base'
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Generate a completion for a prompt
+
+        Raises:
+            ProviderError: If no response could be produced
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Prepare connections ahead of the first request (optional)"""
+
+    def close(self):
+        """Release pooled resources (optional)"""
+
+
+class GeminiProvider(Provider):
+    """Google Gemini generateContent over a pooled requests session"""
+
+    name = 'gemini'
+    BASE_URL = 'https://generativelanguage.googleapis.com'
+
+    def __init__(self, api_key: str, models: List[str], pool_size: int = 20,
+                 connect_timeout: float = 3.05, read_timeout: float = 15.0):
+        """
+        Args:
+            api_key: Gemini API key
+            models: Models to try, in preference order
+            pool_size: Keep-alive connections kept to the API host
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for the response
+        """
+        if not api_key:
+            raise ValueError("GeminiProvider needs an API key (set API_KEY)")
+        self.api_key = api_key
+        self.models = list(models)
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.mount(self.BASE_URL, HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_size,
+                        max_retries=0  # generate() moves on to the next model instead
+                    ))
+                    session.headers.update({'Content-Type': 'application/json'})
+                    self._session = session
+        return self._session
+
+    def _timeouts(self, timeout: Optional[float]) -> Tuple[float, float]:
+        read_timeout = self.read_timeout if timeout is None else min(self.read_timeout, timeout)
+        return self.connect_timeout, read_timeout
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        payload = {'contents': [{'parts': [{'text': prompt}]}]}
+        session = self._get_session()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        last_error = 'No models configured'
+
+        for model in self.models:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            url = f"{self.BASE_URL}/v1beta/models/{model}:generateContent"
+            try:
+                response = session.post(url, json=payload, params={'key': self.api_key},
+                                        timeout=self._timeouts(remaining))
+            except requests.RequestException as e:
+                last_error = f"{model}: {str(e)}"
+                logger.warning(f"Gemini request failed: {last_error}")
+                continue
+
+            if response.status_code != 200:
+                last_error = f"{model}: {response.status_code} {response.text[:200]}"
+                logger.warning(f"Gemini error: {last_error}")
+                continue
+
+            try:
+                candidate = loads(response.content)['candidates'][0]
+                return candidate['content']['parts'][0]['text']
+            except (ValueError, KeyError, IndexError, TypeError):
+                last_error = f"{model}: response had no text"
+                logger.warning(f"Gemini error: {last_error}")
+
+        raise ProviderError(last_error)
+
+    def warm_up(self, connections: int = 2):
+        """Open a few connections in the background"""
+        session = self._get_session()
+
+        def _open():
+            try:
+                session.head(self.BASE_URL, timeout=(self.connect_timeout, self.connect_timeout))
+            except requests.RequestException as e:
+                logger.warning(f"Gemini warm-up failed: {str(e)}")
+
+        for i in range(connections):
+            threading.Thread(target=_open, name=f'gemini-warm-up-{i}', daemon=True).start()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class StubProvider(Provider):
+    """Local provider that never touches the network (offline testing, load tests)"""
+
+    name = 'stub'
+
+    def __init__(self, latency_ms: float = 0.0, response: Optional[str] = None):
+        """
+        Args:
+            latency_ms: Simulated upstream latency per call
+            response: Fixed reply; by default the reply echoes the user's message
+        """
+        self.latency = max(0.0, latency_ms) / 1000.0
+        self.response = response
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise ProviderError(f"stub: timed out after {timeout}s")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.response is not None:
+            return self.response
+        user_text = prompt.rsplit('User:', 1)[-1].replace('Assistant:', '').strip()
+        return (f"I hear you: \"{user_text[:200]}\". Your safety matters. Stay in a well-lit, "
+                f"populated place and keep a trusted contact informed.")
+
+
+# provider name -> class, for Config.API_PROVIDER
+PROVIDERS: Dict[str, type] = {
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+def create_provider(name: str, **settings) -> Provider:
+    """
+    Build a provider by name
+
+    Raises:
+        ValueError: If the provider name is unknown
+    """
+    provider_class = PROVIDERS.get(name)
+    if provider_class is None:
+        raise ValueError(f"Unknown API provider: {name} (choose from {', '.join(PROVIDERS)})")
+    return provider_class(**settings)
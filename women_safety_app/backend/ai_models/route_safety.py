@@ -0,0 +1,240 @@
+"""
+Batch route safety scoring
+Decodes encoded polylines, resamples them by distance and scores every sample of
+every route in one NumPy pass against the area safety engine's geohash cells.
+Cells come from the precomputed tiles or the engine's cache when possible; at
+most max_lookups cells per request go to the (billed) places source.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ai_models.area_safety import AreaSafetyEngine, apply_incidents, cell_precision, radius_bucket
+from ai_models.places import EARTH_RADIUS_M, PlacesSourceError
+from utils import geohash
+from utils.incident_log import IncidentAggregator
+from utils.tile_grid import hour_of_week
+
+logger = logging.getLogger(__name__)
+
+NEUTRAL_SCORE = 50  # Used for samples whose cell could not be scored
+HIGH_RISK_SCORE = 30
+HIGH_RISK_PENALTY = 20
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    """
+    Decode a Google encoded polyline into an (n, 2) array of (lat, lng)
+
+    Raises:
+        ValueError: If the string is not a valid polyline
+    """
+    deltas = []
+    value = 0
+    shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        if byte < 0 or byte > 95:
+            raise ValueError("Invalid character in polyline")
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            deltas.append(~(value >> 1) if value & 1 else value >> 1)
+            value = 0
+            shift = 0
+    if shift or len(deltas) % 2:
+        raise ValueError("Truncated polyline")
+    if not deltas:
+        return np.empty((0, 2))
+    return np.cumsum(np.array(deltas, dtype=np.int64).reshape(-1, 2), axis=0) / 1e5
+
+
+def cumulative_distance_m(points: np.ndarray) -> np.ndarray:
+    """Distance along the path to each point, in metres (haversine)"""
+    if len(points) < 2:
+        return np.zeros(len(points))
+    lat = np.radians(points[:, 0])
+    lng = np.radians(points[:, 1])
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lng) / 2) ** 2)
+    steps = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def resample(points: np.ndarray, spacing_m: float, min_samples: int, max_samples: int):
+    """Evenly spaced samples along the path; returns (samples, distance along path, total length)"""
+    distance = cumulative_distance_m(points)
+    total = float(distance[-1]) if len(distance) else 0.0
+    count = int(np.clip(np.ceil(total / spacing_m) + 1, min_samples, max_samples))
+    if total == 0.0:
+        return np.repeat(points[:1], count, axis=0), np.zeros(count), total
+    at = np.linspace(0.0, total, count)
+    samples = np.column_stack((np.interp(at, distance, points[:, 0]), np.interp(at, distance, points[:, 1])))
+    return samples, at, total
+
+
+class RouteSafetyScorer:
+    """Scores alternative routes against the area safety engine"""
+
+    def __init__(self, engine: AreaSafetyEngine, incidents: Optional[IncidentAggregator] = None,
+                 spacing_m: float = 1000, min_samples: int = 3, max_samples: int = 50, workers: int = 8,
+                 max_lookups: int = 20):
+        """
+        Args:
+            engine: Area safety engine whose geohash cells are scored
+            incidents: Reported incidents that lower cell scores, as for area safety
+            spacing_m: Distance between samples along a route
+            min_samples / max_samples: Sample count bounds per route
+            workers: Concurrent upstream lookups for cells not in the cache
+            max_lookups: Uncached cells looked up per request; the rest get NEUTRAL_SCORE
+        """
+        self.engine = engine
+        self.incidents = incidents
+        self.spacing_m = spacing_m
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.max_lookups = max_lookups
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route-cells')
+
+    def _score_cells(self, cells: np.ndarray, bucket: int) -> Tuple[Dict[str, Dict], int, int]:
+        """
+        Score each distinct cell once, given in route order
+
+        Returns (analyses, upstream lookups, cells skipped over the lookup budget);
+        failed and skipped cells are left out of the analyses.
+        """
+        analyses, uncached = {}, []
+        hour = hour_of_week()
+        for cell in cells:
+            if self.engine.tiles is not None:
+                score = self.engine.tiles.lookup(*geohash.center(cell), hour)
+                if score is not None:
+                    analyses[cell] = {'isSafe': score >= 60, 'safetyScore': score, 'details': {}}
+                    continue
+            analysis = self.engine.cached_cell(cell, bucket)
+            if analysis is not None:
+                analyses[cell] = analysis
+            else:
+                uncached.append(cell)
+
+        if len(uncached) > self.max_lookups:
+            # Spread the budget evenly along the route rather than spending it on the start
+            picks = np.unique(np.linspace(0, len(uncached) - 1, self.max_lookups).round().astype(int))
+            lookups = [uncached[i] for i in picks]
+        else:
+            lookups = uncached
+
+        def score(cell):
+            try:
+                return cell, self.engine.score_cell(cell, bucket)[0]
+            except PlacesSourceError as e:
+                logger.warning(f"Could not score cell {cell}: {str(e)}")
+                return cell, None
+        analyses.update((cell, analysis) for cell, analysis in self._pool.map(score, lookups) if analysis is not None)
+        return analyses, len(lookups), len(uncached) - len(lookups)
+
+    def score_routes(self, polylines: List[str], radius: float = 500) -> Dict:
+        """
+        Score every route and pick the safest
+
+        Raises:
+            ValueError: If a polyline cannot be decoded or is empty
+        """
+        routes = []
+        for index, encoded in enumerate(polylines):
+            points = decode_polyline(encoded)
+            if len(points) == 0:
+                raise ValueError(f"Route {index} has no points")
+            routes.append(resample(points, self.spacing_m, self.min_samples, self.max_samples))
+
+        # All samples of all routes together
+        samples = np.concatenate([route[0] for route in routes])
+        route_ids = np.repeat(np.arange(len(routes)), [len(route[0]) for route in routes])
+
+        bucket = radius_bucket(radius)
+        cells = geohash.encode_many(samples[:, 0], samples[:, 1], cell_precision(bucket))
+        unique_cells, first_sample, cell_index = np.unique(cells, return_index=True, return_inverse=True)
+        analyses, lookups, skipped = self._score_cells(unique_cells[np.argsort(first_sample)], bucket)
+        if self.incidents is not None:
+            # Cell analyses are shared cache entries; adjust copies
+            for position, cell in enumerate(unique_cells):
+                if cell in analyses:
+                    latitude, longitude = samples[first_sample[position]]
+                    analyses[cell] = apply_incidents(
+                        dict(analyses[cell]), self.incidents.summary(float(latitude), float(longitude)))
+
+        cell_scores = np.array([analyses[c]['safetyScore'] if c in analyses else NEUTRAL_SCORE
+                                for c in unique_cells], dtype=np.float64)
+        cell_types = [set((analyses.get(c) or {}).get('details', {}).get('placeTypes', {})) for c in unique_cells]
+        has_police = np.array(['police' in types for types in cell_types], dtype=bool)
+        has_hospital = np.array(['hospital' in types for types in cell_types], dtype=bool)
+        scored = np.array([c in analyses for c in unique_cells], dtype=bool)
+
+        scores = cell_scores[cell_index]
+        counts = np.bincount(route_ids, minlength=len(routes))
+        means = np.bincount(route_ids, weights=scores, minlength=len(routes)) / counts
+        high_risk = np.bincount(route_ids, weights=scores < HIGH_RISK_SCORE, minlength=len(routes)) > 0
+        route_scores = np.clip(np.round(means) - HIGH_RISK_PENALTY * high_risk, 0, 100).astype(int)
+
+        def any_per_route(mask):
+            return np.bincount(route_ids, weights=mask, minlength=len(routes)) > 0
+
+        busy = any_per_route(scores > 80)
+        isolated = any_per_route(scores < 40)
+        police = any_per_route(has_police[cell_index])
+        hospital = any_per_route(has_hospital[cell_index])
+        unscored = np.bincount(route_ids, weights=~scored[cell_index], minlength=len(routes)).astype(int)
+
+        results = []
+        offset = 0
+        for index, (route_samples, along, total) in enumerate(routes):
+            route_slice = scores[offset:offset + len(route_samples)]
+            offset += len(route_samples)
+            segment_scores = (route_slice[:-1] + route_slice[1:]) / 2 if len(route_slice) > 1 else route_slice
+
+            features, warnings = [], []
+            if busy[index]:
+                features.append('Passes through safe/busy areas')
+            if police[index]:
+                features.append('Near Police Station')
+            if hospital[index]:
+                features.append('Near Hospital')
+            if isolated[index]:
+                warnings.append('Contains isolated segments')
+            if high_risk[index]:
+                warnings.append('Includes high-risk zones')
+
+            results.append({
+                'index': index,
+                'safetyScore': int(route_scores[index]),
+                'distanceMeters': round(total),
+                'samples': len(route_samples),
+                'unscoredSamples': int(unscored[index]),
+                'segments': [
+                    {
+                        'start': {'lat': round(float(route_samples[i, 0]), 6), 'lng': round(float(route_samples[i, 1]), 6)},
+                        'end': {'lat': round(float(route_samples[i + 1, 0]), 6), 'lng': round(float(route_samples[i + 1, 1]), 6)},
+                        'fromMeters': round(float(along[i])),
+                        'toMeters': round(float(along[i + 1])),
+                        'score': round(float(segment_scores[i]), 1),
+                    }
+                    for i in range(len(route_samples) - 1)
+                ],
+                'safetyFeatures': features,
+                'warnings': warnings,
+                'isSafest': False,
+            })
+
+        best = int(np.argmax(route_scores))
+        results[best]['isSafest'] = True
+        return {
+            'routes': results,
+            'bestRoute': best,
+            'distinctCells': len(unique_cells),
+            'upstreamLookups': lookups,
+            'skippedCells': skipped,
+            'radiusBucket': bucket,
+        }
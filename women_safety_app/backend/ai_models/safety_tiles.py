@@ -0,0 +1,118 @@
+"""
+Offline build of the safety score tile file
+Scores the centre of every tile in a bounding box from nearby places, adjusts the
+score for each hour of the week and publishes the result atomically
+
+    python -m ai_models.safety_tiles --bbox 30.60,76.40,30.90,76.90 --out data/safety_tiles.bin
+"""
+
+import argparse
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+from ai_models.area_safety import MAX_PLACES, analyze_places
+from ai_models.places import PlacesSource, PlacesSourceError, create_places_source
+from utils.tile_grid import HOURS_PER_WEEK, NO_DATA, write_tile_grid
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE = 111320.0
+
+# Points taken off a tile's score by hour of day
+HOUR_PENALTIES = {0: 15, 1: 15, 2: 15, 3: 15, 4: 15, 5: 10, 6: 5, 20: 5, 21: 8, 22: 10, 23: 12}
+
+# Friday and Saturday nights get this much more
+WEEKEND_NIGHT_PENALTY = 3
+
+# Places staffed around the clock halve the night penalty
+ALWAYS_OPEN_TYPES = ('police', 'hospital', 'fire_station')
+
+
+def hourly_scores(analysis: Dict) -> bytes:
+    """HOURS_PER_WEEK scores for one tile, Monday 00:00 first"""
+    base = analysis['safetyScore']
+    staffed = any(place_type in ALWAYS_OPEN_TYPES
+                  for place_type in analysis['details'].get('placeTypes', {}))
+    scores = bytearray(HOURS_PER_WEEK)
+    for hour in range(HOURS_PER_WEEK):
+        day, hour_of_day = divmod(hour, 24)
+        penalty = HOUR_PENALTIES.get(hour_of_day, 0)
+        # Friday/Saturday evening, and the small hours of Saturday/Sunday
+        if penalty and ((day in (4, 5) and hour_of_day >= 20) or (day in (5, 6) and hour_of_day < 6)):
+            penalty += WEEKEND_NIGHT_PENALTY
+        if staffed:
+            penalty //= 2
+        scores[hour] = max(0, min(100, base - penalty))
+    return bytes(scores)
+
+
+def build_tiles(source: PlacesSource, bbox: Tuple[float, float, float, float], tile_meters: float = 500,
+                radius: int = 500, workers: int = 8) -> Tuple[bytes, int, int, float, int]:
+    """
+    Score every tile in a bounding box; tiles whose lookup fails are written as NO_DATA
+
+    Args:
+        source: Places source to score from
+        bbox: (min_lat, min_lon, max_lat, max_lon)
+        tile_meters: Tile height; tiles are square in degrees
+        radius: Places search radius around each tile centre
+        workers: Concurrent places lookups
+
+    Returns:
+        (data, rows, cols, tile_deg) for write_tile_grid, and the number of failed tiles
+    """
+    min_lat, min_lon, max_lat, max_lon = bbox
+    tile_deg = tile_meters / METERS_PER_DEGREE
+    rows = max(1, math.ceil((max_lat - min_lat) / tile_deg))
+    cols = max(1, math.ceil((max_lon - min_lon) / tile_deg))
+
+    no_data = bytes([NO_DATA]) * HOURS_PER_WEEK
+
+    def score_tile(index: int) -> bytes:
+        row, col = divmod(index, cols)
+        latitude = min_lat + (row + 0.5) * tile_deg
+        longitude = min_lon + (col + 0.5) * tile_deg
+        try:
+            places = source.nearby(latitude, longitude, radius)
+        except (PlacesSourceError, OSError) as e:
+            # Lookups fall back to the live places source for this tile
+            logger.warning(f"No data for tile ({row}, {col}): {str(e)}")
+            return no_data
+        return hourly_scores(analyze_places(places[:MAX_PLACES]))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tiles = list(pool.map(score_tile, range(rows * cols)))
+    return b''.join(tiles), rows, cols, tile_deg, tiles.count(no_data)
+
+
+def main(argv=None):
+    from config.config import Config
+
+    parser = argparse.ArgumentParser(description='Build the safety score tile file')
+    parser.add_argument('--bbox', required=True, help='min_lat,min_lon,max_lat,max_lon')
+    parser.add_argument('--out', default=Config.SAFETY_TILES_PATH)
+    parser.add_argument('--tile-meters', type=float, default=500)
+    parser.add_argument('--radius', type=int, default=500)
+    parser.add_argument('--source', default=Config.PLACES_SOURCE, help="'google' or 'fixture'")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    bbox = tuple(float(value) for value in args.bbox.split(','))
+    if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        parser.error('--bbox must be min_lat,min_lon,max_lat,max_lon')
+
+    source = create_places_source(args.source, api_key=Config.GOOGLE_PLACES_API_KEY,
+                                  fixture_path=Config.PLACES_FIXTURE_PATH)
+    started = time.monotonic()
+    data, rows, cols, tile_deg, failed = build_tiles(source, bbox, args.tile_meters, args.radius, args.workers)
+    write_tile_grid(args.out, data, rows, cols, HOURS_PER_WEEK, bbox[0], bbox[1], tile_deg)
+    logger.info(f"Wrote {rows}x{cols} tiles ({len(data)} bytes, {failed} without data) to {args.out} "
+                f"in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
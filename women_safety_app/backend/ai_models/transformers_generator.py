@@ -0,0 +1,189 @@
+"""
+Shared Hugging Face text-generation pipeline with dynamic micro-batching
+Loads the model once per process and batches concurrent prompts together; every
+handler in the process shares one batching worker per model
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# model name -> loaded pipeline, shared by every generator in the process
+_pipelines: Dict[str, object] = {}
+_pipelines_lock = threading.Lock()
+
+# (model name, max new tokens) -> generator, so handlers share one worker and queue
+_generators: Dict[tuple, "TransformersGenerator"] = {}
+_generators_lock = threading.Lock()
+
+
+def get_pipeline(model_name: str):
+    """
+    Load (once) and return the text-generation pipeline for a model
+
+    Raises:
+        ImportError: If the transformers library is not installed
+    """
+    generator = _pipelines.get(model_name)
+    if generator is not None:
+        return generator
+
+    with _pipelines_lock:
+        generator = _pipelines.get(model_name)
+        if generator is None:
+            from transformers import pipeline
+
+            logger.info(f"Loading transformers model: {model_name}")
+            generator = pipeline('text-generation', model=model_name)
+
+            # Decoder-only models need left padding and a pad token to batch
+            tokenizer = generator.tokenizer
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = 'left'
+
+            _pipelines[model_name] = generator
+    return generator
+
+
+def get_generator(model_name: str, max_new_tokens: int, max_batch_size: int = 8,
+                  max_wait_ms: float = 20) -> "TransformersGenerator":
+    """
+    Return the process-wide generator for a model, creating it on first use
+
+    Batch settings come from the first caller; later callers share its worker.
+    """
+    key = (model_name, max_new_tokens)
+    with _generators_lock:
+        generator = _generators.get(key)
+        if generator is None:
+            generator = _generators[key] = TransformersGenerator(
+                model_name, max_new_tokens, max_batch_size, max_wait_ms
+            )
+    return generator
+
+
+class TransformersGenerator:
+    """Collects concurrent generation requests into micro-batches"""
+
+    def __init__(self, model_name: str, max_new_tokens: int,
+                 max_batch_size: int = 8, max_wait_ms: float = 20):
+        """
+        Initialize the generator
+
+        Args:
+            model_name: Hugging Face model to load
+            max_new_tokens: Maximum tokens generated per prompt
+            max_batch_size: Largest number of prompts run in one forward pass
+            max_wait_ms: How long the first queued prompt waits for company
+        """
+        self.model_name = model_name
+        self.max_new_tokens = max_new_tokens
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def warm_up(self):
+        """Load the model ahead of the first request"""
+        get_pipeline(self.model_name)
+        self._ensure_worker()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Generate a completion for one prompt
+
+        Blocks until the batch containing this prompt has run.
+
+        Raises:
+            ImportError: If the transformers library is not installed
+        """
+        # Surface a missing library on the caller's thread, not the worker's
+        get_pipeline(self.model_name)
+        self._ensure_worker()
+
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='transformers-batcher', daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[tuple]:
+        """Block for the first request, then gather more until full or timed out"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _fail(batch: List[tuple], error: BaseException):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _run_batch(self, generator, batch: List[tuple]):
+        """Generate one batch; every future in it is resolved, whatever happens"""
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            results = generator(
+                prompts,
+                max_new_tokens=self.max_new_tokens,
+                num_return_sequences=1,
+                return_full_text=False,
+                batch_size=len(prompts),
+                pad_token_id=generator.tokenizer.pad_token_id,
+            )
+            if len(results) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} results, got {len(results)}")
+            texts = [result[0]['generated_text'].strip() for result in results]
+        except Exception as e:
+            logger.error(f"Error in batched generation: {str(e)}")
+            self._fail(batch, e)
+            return
+
+        logger.debug(f"Generated batch of {len(prompts)} prompts")
+        for (_, future), text in zip(batch, texts):
+            if not future.done():
+                future.set_result(text)
+
+    def _run(self):
+        batch: List[tuple] = []
+        try:
+            generator = get_pipeline(self.model_name)
+            while True:
+                batch = self._collect_batch()
+                self._run_batch(generator, batch)
+                batch = []
+        except BaseException as e:
+            # The worker is going away: nothing queued may wait forever.
+            # The next generate() starts a new worker.
+            logger.error(f"Transformers batch worker stopped: {str(e)}")
+            self._fail(batch, e)
+            while True:
+                try:
+                    self._fail([self._queue.get_nowait()], e)
+                except queue.Empty:
+                    break
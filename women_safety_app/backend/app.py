@@ -3,16 +3,20 @@ Women Safety App - Custom AI Backend Server
 A Flask-based REST API for AI-powered safety guidance with emotional support
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 import logging
 import os
+import time
 from datetime import datetime
 from routes.ai_routes import ai_bp
 from routes.health_routes import health_bp
 from routes.chat_routes import chat_bp
+from routes.incident_routes import incident_bp
 from config.config import Config
-from utils.logger import setup_logger
+from utils.json_codec import FastJSONProvider
+from utils.logger import AccessSampler, setup_logger, start_logging
+from utils.precompressed import conditional_json
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,22 +24,35 @@ app = Flask(__name__)
 # Load configuration
 app.config.from_object(Config)
 
+# orjson-backed request parsing and jsonify (standard library if orjson is missing)
+app.json = FastJSONProvider(app)
+
 # Enable CORS for Flutter app
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"]
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["ETag"]
     }
 })
 
-# Setup logging
-logger = setup_logger(__name__)
+# Setup logging (written by a background thread, never on the request thread)
+start_logging()  # File, format and rotation from Config
+logger = setup_logger(__name__, Config.LOG_LEVEL)
+for package in ('routes', 'ai_models', 'utils'):
+    setup_logger(package, Config.LOG_LEVEL)
+
+# One sampled line per request
+access_logger = setup_logger('access', Config.LOG_LEVEL)
+access_logger.addFilter(AccessSampler(Config.ACCESS_LOG_SAMPLE_RATE, Config.ACCESS_LOG_SLOW_MS))
+access_logger.propagate = False
 
 # Register blueprints (modular routes)
 app.register_blueprint(health_bp)
 app.register_blueprint(ai_bp)
 app.register_blueprint(chat_bp)
+app.register_blueprint(incident_bp)
 
 # Error handlers
 @app.errorhandler(400)
@@ -70,20 +87,28 @@ def internal_error(error):
     }), 500
 
 @app.before_request
-def log_request():
-    """Log incoming requests"""
-    logger.info(f"{request.method} {request.path} - {request.remote_addr}")
+def start_request_timer():
+    """Remember when the request started for the access log"""
+    g.request_started = time.perf_counter()
 
 @app.after_request
 def log_response(response):
-    """Log outgoing responses"""
-    logger.info(f"Response: {response.status_code}")
+    """Access log line (sampled; formatted lazily so dropped lines cost nothing)"""
+    duration_ms = round((time.perf_counter() - g.get('request_started', time.perf_counter())) * 1000, 1)
+    access_logger.info('%s %s %s %.1fms - %s', request.method, request.path, response.status_code,
+                       duration_ms, request.remote_addr, extra={
+                           'method': request.method,
+                           'path': request.path,
+                           'status': response.status_code,
+                           'duration_ms': duration_ms,
+                           'remote_addr': request.remote_addr
+                       })
     return response
 
 @app.route('/')
 def home():
     """Home endpoint - provides API information"""
-    return jsonify({
+    return conditional_json(request, {
         'name': 'Women Safety App - AI Backend',
         'version': '1.0.0',
         'status': 'running',
@@ -93,6 +118,7 @@ def home():
             'ai_chat': '/api/ai/chat',
             'ai_support': '/api/ai/support',
             'ai_area_safety': '/api/ai/area-safety',
+            'incidents': '/api/incidents',
             'chat_history': '/api/chat/history',
             'chat_clear': '/api/chat/clear'
         }
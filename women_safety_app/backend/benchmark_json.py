@@ -0,0 +1,89 @@
+"""
+JSON codec benchmark
+Compares Flask's default provider (json module) with FastJSONProvider on
+payloads shaped like the backend's chat and history responses
+
+Run from the backend directory:
+    python benchmark_json.py
+"""
+
+import timeit
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from ai_models.intent_responses import INTENT_RESPONSES
+from config.config import Config
+from utils import json_codec
+from utils.json_codec import FastJSONProvider
+
+
+def chat_payload() -> dict:
+    """/api/ai/chat response for a message answered with a fixed intent response"""
+    return {
+        'success': True,
+        'response': INTENT_RESPONSES['fear'],
+        'timestamp': datetime.now().isoformat(),
+        'model_type': 'custom'
+    }
+
+
+def history_payload() -> dict:
+    """/api/chat/history response for a full session"""
+    started = datetime.now() - timedelta(hours=1)
+    replies = list(INTENT_RESPONSES.values())
+    messages = []
+    for turn in range(Config.CHAT_HISTORY_LIMIT // 2):
+        messages.append({
+            'role': 'user',
+            'content': f"Message {turn}: I'm walking home and I feel unsafe near the station 😟",
+            'timestamp': (started + timedelta(minutes=2 * turn)).isoformat()
+        })
+        messages.append({
+            'role': 'assistant',
+            'content': replies[turn % len(replies)],
+            'timestamp': (started + timedelta(minutes=2 * turn + 1)).isoformat()
+        })
+    return {
+        'success': True,
+        'messages': messages,
+        'count': len(messages),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def measure(function) -> float:
+    """Best per-call time in microseconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main():
+    app = Flask(__name__)
+    standard = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    # Built from the fixed texts, so no handler (history DB, incident log, threads) is started
+    payloads = {'chat': chat_payload(), 'history': history_payload()}
+
+    print(f"Codec: {json_codec.BACKEND} {json_codec.describe()['version']}")
+    print(f"{'payload':<10}{'bytes':>8}{'operation':>12}{'json (us)':>12}{'fast (us)':>12}{'speed-up':>10}")
+    with app.app_context():
+        for name, payload in payloads.items():
+            text = standard.dumps(payload)
+            body = text.encode('utf-8')
+            rows = {
+                'dumps': (lambda: standard.dumps(payload), lambda: fast.dumps(payload)),
+                'response': (lambda: standard.response(payload), lambda: fast.response(payload)),
+                'loads': (lambda: standard.loads(body), lambda: fast.loads(body)),
+            }
+            for operation, (baseline, candidate) in rows.items():
+                baseline_us, candidate_us = measure(baseline), measure(candidate)
+                print(f"{name:<10}{len(body):>8}{operation:>12}{baseline_us:>12.1f}{candidate_us:>12.1f}"
+                      f"{baseline_us / candidate_us:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
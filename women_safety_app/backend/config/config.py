@@ -14,29 +14,89 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', False)
     
     # AI Model settings
-    MODEL_TYPE = os.getenv('AI_MODEL_TYPE', 'transformers')  # 'transformers', 'custom', 'api'
+    MODEL_TYPE = os.getenv('AI_MODEL_TYPE', 'custom')  # 'transformers', 'custom', 'api'
     MODEL_NAME = os.getenv('AI_MODEL_NAME', 'gpt2')  # Model to use
     MAX_INPUT_LENGTH = 512
     MAX_OUTPUT_LENGTH = 250
     
+    # Hosted model settings (MODEL_TYPE = 'api')
+    API_PROVIDER = os.getenv('API_PROVIDER', 'gemini')  # 'gemini', 'stub'
+    API_KEY = os.getenv('API_KEY', os.getenv('GEMINI_API_KEY', ''))
+    API_MODELS = os.getenv('API_MODELS', 'gemini-2.0-flash,gemini-2.0-flash-lite').split(',')  # Tried in order
+    API_POOL_SIZE = int(os.getenv('API_POOL_SIZE', 20))  # Keep-alive connections to the provider
+    API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+    API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 15))
+    STUB_LATENCY_MS = float(os.getenv('STUB_LATENCY_MS', 0))  # Simulated latency for the stub provider
+    
+    # Transformers micro-batching
+    TRANSFORMERS_BATCH_SIZE = int(os.getenv('TRANSFORMERS_BATCH_SIZE', 8))  # Max prompts per forward pass
+    TRANSFORMERS_BATCH_WAIT_MS = float(os.getenv('TRANSFORMERS_BATCH_WAIT_MS', 20))  # Max wait to fill a batch
+    
+    # Area safety (nearby places scoring)
+    GOOGLE_PLACES_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY', '')
+    PLACES_SOURCE = os.getenv('PLACES_SOURCE', 'google' if GOOGLE_PLACES_API_KEY else 'fixture')  # 'google', 'fixture'
+    PLACES_FIXTURE_PATH = os.getenv('PLACES_FIXTURE_PATH', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'places_fixture.json'))
+    AREA_CACHE_TTL = int(os.getenv('AREA_CACHE_TTL', 600))  # Seconds a geohash cell's score is reused
+    AREA_CACHE_MAX_ENTRIES = int(os.getenv('AREA_CACHE_MAX_ENTRIES', 10000))
+    SAFETY_TILES_PATH = os.getenv('SAFETY_TILES_PATH', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'safety_tiles.bin'))  # Built by ai_models.safety_tiles
+    SAFETY_TILES_CHECK_INTERVAL = float(os.getenv('SAFETY_TILES_CHECK_INTERVAL', 30))  # Seconds between checks for a new build
+    INCIDENT_LOG_PATH = os.getenv('INCIDENT_LOG_PATH', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'incidents.log'))  # Append-only, shared by all workers
+    INCIDENT_HALF_LIFE_DAYS = float(os.getenv('INCIDENT_HALF_LIFE_DAYS', 30))  # Reported incidents fade with this half-life
+    INCIDENT_CELL_PRECISION = int(os.getenv('INCIDENT_CELL_PRECISION', 7))  # Geohash cells (~150 m) incidents are counted in
+    INCIDENT_MAX_BATCH = int(os.getenv('INCIDENT_MAX_BATCH', 200))  # Incidents per upload
+    INCIDENT_DEVICE_RATE = os.getenv('INCIDENT_DEVICE_RATE', '500/day')  # Incidents one device can upload
+    INCIDENT_REPORTER_CAP = float(os.getenv('INCIDENT_REPORTER_CAP', 1.0))  # Most weight one device adds to a cell
+    INCIDENT_CELL_CAP = float(os.getenv('INCIDENT_CELL_CAP', 3.0))  # Most weight a cell counts for
+    INCIDENT_UNVERIFIED_WEIGHT = float(os.getenv('INCIDENT_UNVERIFIED_WEIGHT', 0.5))  # Client uploads are unverified
+    INCIDENT_COMPACT_BYTES = int(os.getenv('INCIDENT_COMPACT_BYTES', 1 << 20))  # Log size that triggers a snapshot
+    DEVICE_TOKEN_SECRET = os.getenv('DEVICE_TOKEN_SECRET', '')  # Signs device tokens; uploads are refused without it
+    ROUTE_MAX_ROUTES = int(os.getenv('ROUTE_MAX_ROUTES', 5))  # Alternatives scored per request
+    ROUTE_MAX_SAMPLES = int(os.getenv('ROUTE_MAX_SAMPLES', 50))  # Samples per route, whatever its length
+    ROUTE_SAMPLE_SPACING_M = float(os.getenv('ROUTE_SAMPLE_SPACING_M', 1000))
+    ROUTE_MAX_LOOKUPS = int(os.getenv('ROUTE_MAX_LOOKUPS', 20))  # Uncached (billed) cell lookups per request
+    ROUTE_MAX_POLYLINE_LENGTH = int(os.getenv('ROUTE_MAX_POLYLINE_LENGTH', 20000))  # Characters
+    
     # Chat settings
-    CHAT_HISTORY_LIMIT = 20  # Keep last 20 messages
-    SESSION_TIMEOUT = timedelta(hours=24)
+    CHAT_HISTORY_LIMIT = 20  # Keep last 20 messages per session
+    SESSION_TIMEOUT = timedelta(hours=24)  # Idle sessions are evicted after this
+    SESSION_STORE_SHARDS = 16  # Lock shards for the session store
     
     # API settings
     TIMEOUT = 30  # Request timeout in seconds
-    RATE_LIMIT = '100/hour'  # Rate limiting
+    RATE_LIMIT = os.getenv('RATE_LIMIT', '100/hour')  # Default per-client limit for AI routes
+    RATE_LIMIT_AREA_SAFETY = os.getenv('RATE_LIMIT_AREA_SAFETY', '300/hour')  # Map screens poll this one
+    RATE_LIMIT_KEY = os.getenv('RATE_LIMIT_KEY', 'client')  # 'client' (IP address) or 'session'
+    RATE_LIMIT_DB = os.getenv('RATE_LIMIT_DB', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rate_limits.db'))  # Shared by all workers on the host
+    
+    # Admission control (emergency, then support, then chat)
+    ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', 8))  # AI requests running at once
+    ADMISSION_MAX_WAITING = int(os.getenv('ADMISSION_MAX_WAITING', 64))  # Waiting requests across all lanes
     
     # Emotional Support settings
     ENABLE_EMOTIONAL_SUPPORT = True
     EMPATHY_MODE = True
     
-    # Database settings (if needed)
+    # Database settings
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///chat_history.db')
+    HISTORY_BACKEND = os.getenv('HISTORY_BACKEND', 'sqlite')  # 'sqlite', 'memory'
+    HISTORY_FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', 0.5))  # Max seconds before a write is flushed
+    HISTORY_BATCH_SIZE = 256  # Pending writes that force an early flush
+    HISTORY_RETENTION_DAYS = float(os.getenv('HISTORY_RETENTION_DAYS', 30))  # Older messages are deleted (0 keeps all)
+    HISTORY_PRUNE_INTERVAL = float(os.getenv('HISTORY_PRUNE_INTERVAL', 3600))  # Seconds between deletions
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-    LOG_FILE = 'logs/backend.log'
+    LOG_FILE = os.getenv('LOG_FILE', os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'backend.log'))  # Shared by all workers
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text', 'json' (log file only)
+    LOG_ROTATION = os.getenv('LOG_ROTATION', 'external')  # 'external' (logrotate), 'midnight' (one file per process)
+    LOG_BACKUP_DAYS = int(os.getenv('LOG_BACKUP_DAYS', 14))  # Rotated files kept with 'midnight'
+    ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', 1.0))  # Share of requests logged
+    ACCESS_LOG_SLOW_MS = float(os.getenv('ACCESS_LOG_SLOW_MS', 1000))  # Slower requests (and 5xx) are always logged
     
     # CORS settings
     CORS_ORIGINS = ['*']
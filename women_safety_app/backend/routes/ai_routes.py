@@ -2,19 +2,50 @@
 AI routes for safety guidance and emotional support
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import logging
+import time
 from datetime import datetime
 from ai_models.ai_handler import AIModelHandler
+from config.config import Config
+from utils.admission import AdmissionController
+from utils.precompressed import PrecompressedCache
+from utils.rate_limit import RateLimiter
+from utils.session_store import get_session_id
+from utils.sse import SSE_HEADERS, format_sse
 
 logger = logging.getLogger(__name__)
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
 
-# Initialize AI handler
-ai_handler = AIModelHandler(model_type='custom')
+# Initialize AI handler (shared with the chat history routes)
+ai_handler = AIModelHandler(model_type=Config.MODEL_TYPE)
+
+# Per-client token buckets, shared across worker processes
+rate_limiter = RateLimiter(Config.RATE_LIMIT_DB, Config.RATE_LIMIT, key_by=Config.RATE_LIMIT_KEY)
+
+# Priority lanes so threat assessments are not stuck behind chat traffic
+admission = AdmissionController(
+    max_concurrent=Config.ADMISSION_MAX_CONCURRENT,
+    max_waiting=Config.ADMISSION_MAX_WAITING
+)
+
+# Encoded and gzipped bodies for the custom model's fixed responses
+constant_responses = PrecompressedCache()
+
+def _chat_response(response):
+    """JSON response for generate_response output, pre-encoded when the text is a fixed one"""
+    if response.get('success') and ai_handler.is_constant_response(response['response']):
+        return constant_responses.respond(request, {
+            'success': True,
+            'response': response['response'],
+            'model_type': response['model_type']
+        }, {'timestamp': response['timestamp']})
+    return jsonify(response), 200
 
 @ai_bp.route('/chat', methods=['POST'])
+@rate_limiter.limit()
+@admission.admit('chat')
 def ai_chat():
     """
     Main AI chat endpoint
@@ -40,12 +71,14 @@ def ai_chat():
         # Get context if provided
         context = data.get('context', {})
         
-        logger.info(f"AI Chat request: {user_message[:100]}")
+        logger.info(f"AI Chat request ({len(user_message)} chars)")
         
         # Generate response
-        response = ai_handler.generate_response(user_message, context)
+        response = ai_handler.generate_response(
+            user_message, context, session_id=get_session_id(request, data)
+        )
         
-        return jsonify(response), 200
+        return _chat_response(response)
     
     except Exception as e:
         logger.error(f"Error in AI chat: {str(e)}")
@@ -55,7 +88,56 @@ def ai_chat():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@ai_bp.route('/chat/stream', methods=['POST'])
+@rate_limiter.limit()
+@admission.admit('chat')
+def ai_chat_stream():
+    """
+    Streaming AI chat endpoint
+    Returns the response as server-sent events, one chunk per event
+    """
+    started = time.monotonic()
+    data = request.get_json(silent=True)
+    
+    if not data or not data.get('message', '').strip():
+        return jsonify({
+            'success': False,
+            'error': 'Missing message in request'
+        }), 400
+    
+    user_message = data['message'].strip()
+    context = data.get('context', {})
+    session_id = get_session_id(request, data)
+    
+    logger.info(f"AI Chat stream request ({len(user_message)} chars)")
+    
+    def generate():
+        first_chunk_at = None
+        try:
+            for chunk in ai_handler.stream_response(user_message, context, session_id=session_id):
+                if first_chunk_at is None:
+                    first_chunk_at = time.monotonic()
+                yield format_sse({'text': chunk})
+        except Exception as e:
+            logger.error(f"Error in AI chat stream: {str(e)}")
+            yield format_sse({'error': str(e)}, event='error')
+        
+        finished = time.monotonic()
+        ttfb_ms = round(((first_chunk_at or finished) - started) * 1000, 1)
+        total_ms = round((finished - started) * 1000, 1)
+        logger.info(f"AI Chat stream finished - ttfb {ttfb_ms}ms, total {total_ms}ms")
+        yield format_sse({
+            'model_type': ai_handler.model_type,
+            'ttfb_ms': ttfb_ms,
+            'total_ms': total_ms,
+            'timestamp': datetime.now().isoformat()
+        }, event='done')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @ai_bp.route('/support', methods=['POST'])
+@rate_limiter.limit()
+@admission.admit('support')
 def emotional_support():
     """
     Emotional support endpoint
@@ -78,16 +160,16 @@ def emotional_support():
                 'error': 'Concern cannot be empty'
             }), 400
         
-        logger.info(f"Emotional support request: {concern[:100]}")
+        logger.info(f"Emotional support request ({len(concern)} chars)")
         
         # Generate emotional support response
         message_with_context = f"I'm feeling: {concern}"
         response = ai_handler.generate_response(message_with_context, {
             'type': 'emotional_support',
             'timestamp': datetime.now().isoformat()
-        })
+        }, session_id=get_session_id(request, data))
         
-        return jsonify(response), 200
+        return _chat_response(response)
     
     except Exception as e:
         logger.error(f"Error in emotional support: {str(e)}")
@@ -98,6 +180,8 @@ def emotional_support():
         }), 500
 
 @ai_bp.route('/area-safety', methods=['POST'])
+@rate_limiter.limit(Config.RATE_LIMIT_AREA_SAFETY)
+@admission.admit('support')
 def area_safety():
     """
     Area safety analysis endpoint
@@ -116,15 +200,29 @@ def area_safety():
                 'error': 'Missing latitude or longitude'
             }), 400
         
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+            radius = float(data.get('radius', 500))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'latitude, longitude and radius must be numbers'
+            }), 400
+        
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or radius <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Coordinates or radius out of range'
+            }), 400
+        
         # Optional fields
-        radius = data.get('radius', 500)
         area_name = data.get('area_name', f"Area at ({latitude}, {longitude})")
         time_of_day = data.get('time_of_day', 'unknown')
         
         logger.info(f"Area safety request for {area_name}")
         
         # Process area safety
-        area_analysis = ai_handler.process_area_safety(latitude, longitude, radius)
+        area_analysis = ai_handler.process_area_safety(latitude, longitude, radius, time_of_day)
         
         # Get AI analysis
         message = f"Is the {area_name} area safe at {time_of_day}?"
@@ -132,7 +230,7 @@ def area_safety():
             'type': 'area_analysis',
             'location': {'latitude': latitude, 'longitude': longitude},
             'radius': radius
-        })
+        }, session_id=get_session_id(request, data))
         
         return jsonify({
             'success': True,
@@ -149,7 +247,74 @@ def area_safety():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-@ai_bp.route('/threat-assessment', methods=['POST'])
+@ai_bp.route('/route-safety', methods=['POST'])
+@rate_limiter.limit()
+@admission.admit('support')
+def route_safety():
+    """
+    Route safety endpoint
+    Scores alternative routes (encoded polylines) in one request and marks the safest
+    """
+    try:
+        data = request.get_json() or {}
+
+        # Either {"routes": [{"polyline": ...}]} or {"polylines": [...]}
+        if 'routes' in data:
+            polylines = [route.get('polyline') if isinstance(route, dict) else None
+                         for route in data.get('routes') or []]
+        else:
+            polylines = data.get('polylines') or []
+
+        if not polylines:
+            return jsonify({
+                'success': False,
+                'error': 'Missing routes'
+            }), 400
+
+        if len(polylines) > Config.ROUTE_MAX_ROUTES:
+            return jsonify({
+                'success': False,
+                'error': f'At most {Config.ROUTE_MAX_ROUTES} routes per request'
+            }), 400
+
+        if not all(isinstance(p, str) and 0 < len(p) <= Config.ROUTE_MAX_POLYLINE_LENGTH for p in polylines):
+            return jsonify({
+                'success': False,
+                'error': f'Each route needs an encoded polyline of at most {Config.ROUTE_MAX_POLYLINE_LENGTH} characters'
+            }), 400
+
+        try:
+            radius = float(data.get('radius', 500))
+        except (TypeError, ValueError):
+            radius = -1
+        if radius <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'radius must be a positive number'
+            }), 400
+
+        logger.info(f"Route safety request for {len(polylines)} routes")
+
+        try:
+            result = ai_handler.process_route_safety(polylines, radius)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid polyline: {str(e)}'
+            }), 400
+
+        return jsonify(dict(result, success=True)), 200
+
+    except Exception as e:
+        logger.error(f"Error in route safety: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@ai_bp.route('/threat-assessment', methods=['POST'])  # Never rate limited
+@admission.admit('emergency')
 def threat_assessment():
     """
     Threat assessment endpoint
@@ -172,14 +337,21 @@ def threat_assessment():
                 'error': 'Threat description cannot be empty'
             }), 400
         
-        logger.info(f"Threat assessment request: {threat[:100]}")
+        logger.info(f"Threat assessment request ({len(threat)} chars)")
         
         # Generate emergency response
         message = f"Emergency situation: {threat}"
         response = ai_handler.generate_response(message, {
             'type': 'threat_assessment',
             'severity': 'high'
-        })
+        }, session_id=get_session_id(request, data))
+        
+        if ai_handler.is_constant_response(response['response']):
+            return constant_responses.respond(request, {
+                'success': True,
+                'response': response['response'],
+                'emergency': True
+            }, {'timestamp': datetime.now().isoformat()})
         
         return jsonify({
             'success': True,
@@ -195,3 +367,21 @@ def threat_assessment():
             'error': str(e),
             'timestamp': datetime.now().isoformat()
         }), 500
+
+@ai_bp.route('/area-safety/stats', methods=['GET'])
+def area_safety_stats():
+    """Geohash cell cache statistics for area safety"""
+    return jsonify({
+        'success': True,
+        'area_safety': ai_handler.area_safety.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@ai_bp.route('/admission', methods=['GET'])
+def admission_stats():
+    """Queue depth and wait times for each priority lane"""
+    return jsonify({
+        'success': True,
+        'admission': admission.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
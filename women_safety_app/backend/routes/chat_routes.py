@@ -2,33 +2,32 @@
 Chat history routes
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 import logging
 from datetime import datetime
-from ai_models.ai_handler import AIModelHandler
+from routes.ai_routes import ai_handler
+from utils.precompressed import conditional_json
+from utils.session_store import get_session_id
 
 logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint('chat', __name__, url_prefix='/api/chat')
 
-# Initialize AI handler
-ai_handler = AIModelHandler(model_type='custom')
-
 @chat_bp.route('/history', methods=['GET'])
 def get_chat_history():
     """
     Get chat history
-    Returns all messages in the current conversation
+    Returns all messages in the caller's conversation
     """
     try:
-        history = ai_handler.get_history()
+        history = ai_handler.get_history(get_session_id(request))
         
-        return jsonify({
+        return conditional_json(request, {
             'success': True,
             'messages': history,
             'count': len(history),
             'timestamp': datetime.now().isoformat()
-        }), 200
+        })
     
     except Exception as e:
         logger.error(f"Error getting chat history: {str(e)}")
@@ -45,7 +44,7 @@ def clear_chat_history():
     Resets the conversation
     """
     try:
-        ai_handler.clear_history()
+        ai_handler.clear_history(get_session_id(request, request.get_json(silent=True)))
         
         logger.info("Chat history cleared")
         
@@ -69,12 +68,12 @@ def chat_stats():
     Get chat statistics
     """
     try:
-        history = ai_handler.get_history()
+        history = ai_handler.get_history(get_session_id(request))
         
         user_messages = len([m for m in history if m['role'] == 'user'])
         ai_messages = len([m for m in history if m['role'] == 'assistant'])
         
-        return jsonify({
+        return conditional_json(request, {
             'success': True,
             'stats': {
                 'total_messages': len(history),
@@ -83,7 +82,7 @@ def chat_stats():
                 'average_response_length': sum(len(m['content']) for m in history) // max(len(history), 1)
             },
             'timestamp': datetime.now().isoformat()
-        }), 200
+        })
     
     except Exception as e:
         logger.error(f"Error getting chat stats: {str(e)}")
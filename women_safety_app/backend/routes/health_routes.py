@@ -5,6 +5,7 @@ Health check routes
 from flask import Blueprint, jsonify
 import logging
 from datetime import datetime
+from utils import json_codec
 
 logger = logging.getLogger(__name__)
 
@@ -26,5 +27,6 @@ def status():
         'status': 'online',
         'service': 'Women Safety App AI Backend',
         'version': '1.0.0',
+        'json_codec': json_codec.describe(),
         'timestamp': datetime.now().isoformat()
     }), 200
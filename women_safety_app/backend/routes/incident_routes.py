@@ -0,0 +1,146 @@
+"""
+Incident ingestion routes
+Phones upload their incident history in bulk; incidents feed the area and route
+safety scores. Uploads need a device token and are stored as unverified.
+"""
+
+from flask import Blueprint, g, request, jsonify
+import logging
+import math
+from datetime import datetime
+from config.config import Config
+from routes.ai_routes import ai_handler, rate_limiter
+from utils.device_auth import DeviceTokens
+from utils.incident_log import parse_incident
+from utils.json_codec import loads
+
+logger = logging.getLogger(__name__)
+
+incident_bp = Blueprint('incidents', __name__, url_prefix='/api/incidents')
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# Rejections reported back per upload
+MAX_REPORTED_ERRORS = 20
+
+device_tokens = DeviceTokens(Config.DEVICE_TOKEN_SECRET)
+
+def _read_incidents():
+    """Uploaded incidents: NDJSON (one per line), a JSON list, or {"incidents": [...]}"""
+    if request.mimetype in NDJSON_TYPES:
+        items = []
+        for number, line in enumerate(request.get_data().splitlines(), 1):
+            if line.strip():
+                try:
+                    items.append(loads(line))
+                except ValueError:
+                    items.append(ValueError(f"line {number} is not JSON"))
+        return items
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('incidents')
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of incidents, {"incidents": [...]}, or NDJSON')
+    return data
+
+@incident_bp.route('', methods=['POST'])
+@rate_limiter.limit()
+@device_tokens.require
+def ingest_incidents():
+    """
+    Bulk incident upload (Authorization: Bearer <device token>)
+    Valid incidents are appended in one write as unverified reports from the
+    device; invalid ones are reported and skipped
+    """
+    try:
+        try:
+            items = _read_incidents()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        if len(items) > Config.INCIDENT_MAX_BATCH:
+            return jsonify({
+                'success': False,
+                'error': f'At most {Config.INCIDENT_MAX_BATCH} incidents per upload'
+            }), 413
+
+        incidents, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                if isinstance(item, ValueError):
+                    raise item
+                incidents.append(parse_incident(item))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+
+        if errors and not incidents:
+            return jsonify({
+                'success': False,
+                'error': 'No valid incidents in upload',
+                'rejected': len(errors),
+                'errors': errors[:MAX_REPORTED_ERRORS]
+            }), 400
+
+        # Volume cap per device, on top of the per-client request limit
+        if incidents:
+            allowed, _, retry_after = rate_limiter.check(
+                f"incidents|{g.device_id}", Config.INCIDENT_DEVICE_RATE, cost=len(incidents))
+            if not allowed:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Device incident limit exceeded',
+                    'limit': Config.INCIDENT_DEVICE_RATE
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response
+
+        accepted = ai_handler.incidents.ingest(incidents, reporter=g.device_id)
+        logger.info(f"Ingested {accepted} unverified incidents from {g.device_id} ({len(errors)} rejected)")
+
+        return jsonify({
+            'success': True,
+            'accepted': accepted,
+            'rejected': len(errors),
+            'verified': False,
+            'errors': errors[:MAX_REPORTED_ERRORS],
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error ingesting incidents: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+@incident_bp.route('/summary', methods=['GET'])
+def incident_summary():
+    """Decayed incident weight around a point (?latitude=..&longitude=..)"""
+    try:
+        latitude = float(request.args['latitude'])
+        longitude = float(request.args['longitude'])
+    except (KeyError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'latitude and longitude are required numbers'
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'incidents': ai_handler.incidents.summary(latitude, longitude),
+        'timestamp': datetime.now().isoformat()
+    }), 200
+
+@incident_bp.route('/stats', methods=['GET'])
+def incident_stats():
+    """Log size and aggregate counts"""
+    return jsonify({
+        'success': True,
+        'incidents': ai_handler.incidents.stats(),
+        'timestamp': datetime.now().isoformat()
+    }), 200
@@ -0,0 +1,281 @@
+"""
+Priority admission control for AI requests
+A fixed number of requests run at once; the rest wait in per-priority lanes
+(emergency first, chat last) with bounded queues and a maximum wait each.
+Threads wait with acquire(), asyncio tasks with acquire_async(); both share the lanes.
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from flask import jsonify, make_response
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted (queue full, shed or waited too long)"""
+
+    def __init__(self, lane: str, reason: str, retry_after: int = 1):
+        super().__init__(f"{lane} request {reason}")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """Settings and counters for one priority lane"""
+
+    def __init__(self, name: str, priority: int, max_queue: int, max_wait: float):
+        """
+        Args:
+            name: Lane name used by routes and in stats
+            priority: Lower numbers are admitted first
+            max_queue: Requests that may wait in this lane at once
+            max_wait: Seconds a request may wait before it is rejected
+        """
+        self.name = name
+        self.priority = priority
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self.waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.shed = 0
+        self.expired = 0
+        self.wait_times = deque(maxlen=200)
+
+    def stats(self) -> Dict:
+        waits = sorted(self.wait_times)
+        return {
+            'priority': self.priority,
+            'queue_depth': len(self.waiters),
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'shed': self.shed,
+            'expired': self.expired,
+            'wait_ms_p50': round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            'wait_ms_max': round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+class _Waiter:
+    __slots__ = ('lane', 'deadline', 'event', 'future', 'loop', 'outcome', 'seq')
+
+    def __init__(self, lane: Lane, deadline: float, seq: int,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.lane = lane
+        self.deadline = deadline
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.outcome = None  # 'admitted' or a rejection reason
+        self.seq = seq
+
+    def wake(self):
+        """Tell the waiting thread or task that outcome is set (called under the lock)"""
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    """Thread-safe priority admission with load shedding"""
+
+    def __init__(self, max_concurrent: int = 8, max_waiting: int = 64, lanes: Optional[Dict] = None):
+        """
+        Args:
+            max_concurrent: Requests allowed to run at the same time
+            max_waiting: Total waiting requests across lanes; when reached, the
+                lowest-priority waiter is shed to make room for a more urgent one
+            lanes: name -> (priority, max_queue, max_wait) overrides
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_waiting = max_waiting
+        self.lanes = {
+            name: Lane(name, priority, max_queue, max_wait)
+            for name, (priority, max_queue, max_wait) in (lanes or DEFAULT_LANES).items()
+        }
+        self._by_priority = sorted(self.lanes.values(), key=lambda lane: lane.priority)
+        self._running = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def acquire(self, lane_name: str):
+        """Block until the request may run; raises AdmissionRejected otherwise"""
+        now = time.monotonic()
+        waiter = self._enter(self.lanes[lane_name], now)
+        if waiter is None:
+            return
+        waiter.event.wait(waiter.lane.max_wait)
+        self._settle(waiter, now)
+
+    async def acquire_async(self, lane_name: str):
+        """acquire() for asyncio tasks: waits without blocking the event loop"""
+        now = time.monotonic()
+        waiter = self._enter(self.lanes[lane_name], now, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(waiter.future, waiter.lane.max_wait)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._settle(waiter, now)
+
+    def _enter(self, lane: Lane, now: float,
+               loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Admit immediately (returns None) or queue a waiter; raises AdmissionRejected"""
+        with self._lock:
+            if self._running < self.max_concurrent and not self._has_waiters(lane.priority):
+                self._running += 1
+                lane.admitted += 1
+                lane.wait_times.append(0.0)
+                return None
+
+            if len(lane.waiters) >= lane.max_queue:
+                lane.rejected += 1
+                raise AdmissionRejected(lane.name, 'queue full', self._retry_after(lane))
+            if self._waiting >= self.max_waiting and not self._shed_below(lane.priority):
+                lane.rejected += 1
+                raise AdmissionRejected(lane.name, 'queue full', self._retry_after(lane))
+
+            waiter = _Waiter(lane, now + lane.max_wait, next(self._seq), loop)
+            lane.waiters.append(waiter)
+            self._waiting += 1
+            return waiter
+
+    def _settle(self, waiter: _Waiter, now: float):
+        """After the wait: raise AdmissionRejected unless the waiter was handed a slot"""
+        lane = waiter.lane
+        with self._lock:
+            if waiter.outcome is None:
+                # Timed out before being handed a slot
+                lane.waiters.remove(waiter)
+                self._waiting -= 1
+                waiter.outcome = 'expired'
+                lane.expired += 1
+            if waiter.outcome != 'admitted':
+                raise AdmissionRejected(lane.name, waiter.outcome, self._retry_after(lane))
+            lane.wait_times.append(time.monotonic() - now)
+
+    def _abandon(self, waiter: _Waiter):
+        """A waiting task was cancelled: leave the queue, or give back a slot it was just handed"""
+        with self._lock:
+            if waiter.outcome is None:
+                waiter.lane.waiters.remove(waiter)
+                self._waiting -= 1
+                waiter.outcome = 'cancelled'
+                return
+            admitted = waiter.outcome == 'admitted'
+        if admitted:
+            self.release()
+
+    def release(self):
+        """Free a slot and hand it to the most urgent waiter that is still within its deadline"""
+        with self._lock:
+            self._running -= 1
+            now = time.monotonic()
+            for lane in self._by_priority:
+                while lane.waiters and self._running < self.max_concurrent:
+                    waiter = lane.waiters.popleft()
+                    self._waiting -= 1
+                    if waiter.deadline <= now:
+                        waiter.outcome = 'expired'
+                        lane.expired += 1
+                    else:
+                        waiter.outcome = 'admitted'
+                        lane.admitted += 1
+                        self._running += 1
+                    waiter.wake()
+                if self._running >= self.max_concurrent:
+                    return
+
+    def _has_waiters(self, priority: int) -> bool:
+        """Whether anyone at this priority or higher is already queued"""
+        return any(lane.waiters for lane in self._by_priority if lane.priority <= priority)
+
+    def _shed_below(self, priority: int) -> bool:
+        """Drop the newest waiter from the lowest lane below this priority"""
+        for lane in reversed(self._by_priority):
+            if lane.priority <= priority:
+                return False
+            if lane.waiters:
+                waiter = lane.waiters.pop()
+                self._waiting -= 1
+                waiter.outcome = 'shed'
+                lane.shed += 1
+                waiter.wake()
+                logger.warning(f"Shed a waiting {lane.name} request to admit a higher-priority one")
+                return True
+        return False
+
+    def _retry_after(self, lane: Lane) -> int:
+        return max(1, int(lane.max_wait))
+
+    def admit(self, lane_name: str):
+        """
+        Route decorator that runs the view inside an admission slot
+
+        The slot is held until the response has been sent, so streamed
+        responses count for their whole duration.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    self.acquire(lane_name)
+                except AdmissionRejected as e:
+                    logger.warning(f"Admission rejected: {e}")
+                    response = jsonify({
+                        'success': False,
+                        'error': 'Server busy, please retry',
+                        'lane': e.lane,
+                        'reason': e.reason
+                    })
+                    response.status_code = 503
+                    response.headers['Retry-After'] = str(e.retry_after)
+                    return response
+                try:
+                    response = make_response(view(*args, **kwargs))
+                except BaseException:
+                    self.release()
+                    raise
+                response.call_on_close(self.release)
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'running': self._running,
+                'max_concurrent': self.max_concurrent,
+                'waiting': self._waiting,
+                'max_waiting': self.max_waiting,
+                'lanes': {lane.name: lane.stats() for lane in self._by_priority},
+            }
+
+
+# name -> (priority, max_queue, max_wait seconds)
+DEFAULT_LANES = {
+    'emergency': (0, 64, 30.0),
+    'support': (1, 32, 10.0),
+    'chat': (2, 32, 5.0),
+}
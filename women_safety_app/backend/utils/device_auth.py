@@ -0,0 +1,96 @@
+"""
+Signed device tokens for routes that change shared state
+A token is "<device id>.<HMAC-SHA256 of the id>" signed with DEVICE_TOKEN_SECRET,
+so any worker can verify it without a lookup. Issue one per installed app with:
+
+    python -m utils.device_auth <device id>
+"""
+
+import functools
+import hashlib
+import hmac
+import re
+import sys
+from typing import Optional
+
+from flask import g, jsonify, request
+
+_DEVICE_ID = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+class DeviceTokens:
+    """Issues and verifies device tokens"""
+
+    def __init__(self, secret: str):
+        """
+        Args:
+            secret: Signing key; with an empty secret every token is rejected
+        """
+        self._key = secret.encode('utf-8')
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._key)
+
+    def _sign(self, device_id: str) -> str:
+        return hmac.new(self._key, device_id.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def issue(self, device_id: str) -> str:
+        """
+        Token for a device
+
+        Raises:
+            ValueError: If no secret is configured or the id is not 8-64 of [A-Za-z0-9_-]
+        """
+        if not self.enabled:
+            raise ValueError("DEVICE_TOKEN_SECRET is not set")
+        if not _DEVICE_ID.match(device_id):
+            raise ValueError("Device ids are 8-64 letters, digits, '_' or '-'")
+        return f"{device_id}.{self._sign(device_id)}"
+
+    def verify(self, token: str) -> Optional[str]:
+        """Device id of a valid token, or None"""
+        if not self.enabled or not token:
+            return None
+        device_id, _, signature = token.rpartition('.')
+        if not _DEVICE_ID.match(device_id):
+            return None
+        return device_id if hmac.compare_digest(signature, self._sign(device_id)) else None
+
+    def require(self, view):
+        """
+        Route decorator: reject requests without a valid "Authorization: Bearer <token>"
+
+        The device id is available to the view as flask.g.device_id.
+        """
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return jsonify({
+                    'success': False,
+                    'error': 'Device authentication is not configured'
+                }), 503
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            device_id = self.verify(token.strip()) if scheme.lower() == 'bearer' else None
+            if device_id is None:
+                response = jsonify({
+                    'success': False,
+                    'error': 'A valid device token is required'
+                })
+                response.status_code = 401
+                response.headers['WWW-Authenticate'] = 'Bearer'
+                return response
+            g.device_id = device_id
+            return view(*args, **kwargs)
+        return wrapper
+
+
+if __name__ == '__main__':
+    from config.config import Config
+
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m utils.device_auth <device id>")
+    try:
+        print(DeviceTokens(Config.DEVICE_TOKEN_SECRET).issue(sys.argv[1]))
+    except ValueError as e:
+        sys.exit(str(e))
@@ -0,0 +1,95 @@
+"""
+Geohash encoding
+Maps coordinates to base-32 cell ids so nearby requests share a cache key
+"""
+
+from typing import Tuple
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+
+def encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """Return the geohash of a point at the given precision (characters)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # bits alternate longitude, latitude
+    while len(chars) < precision:
+        target, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if target >= mid:
+            value = (value << 1) | 1
+            bounds[0] = mid
+        else:
+            value <<= 1
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Return (min_lat, min_lon, max_lat, max_lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bounds_ = lon_range if even else lat_range
+            mid = (bounds_[0] + bounds_[1]) / 2
+            if (value >> shift) & 1:
+                bounds_[0] = mid
+            else:
+                bounds_[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def center(geohash: str) -> Tuple[float, float]:
+    """Return the (latitude, longitude) centre of a geohash cell"""
+    min_lat, min_lon, max_lat, max_lon = bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def encode_many(latitudes, longitudes, precision: int = 7):
+    """
+    Vectorised encode() for NumPy arrays of coordinates
+
+    Returns an array of geohash strings, identical to calling encode() per point.
+    """
+    import numpy as np
+
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+
+    # Cell index along each axis, i.e. the bisection bits of encode()
+    lon_index = np.floor((longitudes + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64)
+    lat_index = np.floor((latitudes + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64)
+    lon_index = np.clip(lon_index, 0, (1 << lon_bits) - 1)
+    lat_index = np.clip(lat_index, 0, (1 << lat_bits) - 1)
+
+    # Interleave, longitude first, most significant bit first
+    code = np.zeros(latitudes.shape, dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            value = (lon_index >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_index >> (lat_bits - 1 - bit // 2)) & 1
+        code = (code << 1) | value
+
+    alphabet = np.array(list(_BASE32))
+    result = alphabet[(code >> (5 * (precision - 1))) & 31]
+    for i in range(1, precision):
+        result = np.char.add(result, alphabet[(code >> (5 * (precision - 1 - i))) & 31])
+    return result
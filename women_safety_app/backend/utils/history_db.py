@@ -0,0 +1,342 @@
+"""
+Durable SQLite chat history with batched write-behind
+Serves reads from the in-memory session store and persists writes in the background.
+A session is reloaded from SQLite when PRAGMA data_version shows a commit since it was
+last read, so writes and clears made by other workers are picked up; request threads
+never wait for the writer's commits. Old rows are pruned on a schedule.
+"""
+
+import atexit
+import itertools
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+from utils.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_time
+    ON messages (session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_created
+    ON messages (created_at);
+CREATE TABLE IF NOT EXISTS history_writers (
+    token TEXT PRIMARY KEY,
+    last_op INTEGER NOT NULL
+);
+"""
+
+INSERT = 'INSERT INTO messages (session_id, role, content, timestamp, created_at) VALUES (?, ?, ?, ?, ?)'
+MARK = 'INSERT OR REPLACE INTO history_writers (token, last_op) VALUES (?, ?)'
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """Turn a sqlite:/// URL into a path sqlite3 understands"""
+    prefix = 'sqlite:///'
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Unsupported database URL: {database_url}")
+    return database_url[len(prefix):] or ':memory:'
+
+
+class SQLiteHistoryStore:
+    """Session history persisted to SQLite by a background writer thread"""
+
+    def __init__(self, database_url: str, cache: SessionStore,
+                 flush_interval: float = 0.5, batch_size: int = 256,
+                 retention_days: float = 30.0, prune_interval: float = 3600.0):
+        """
+        Open the database and start the writer
+
+        Args:
+            database_url: sqlite:/// URL of the history database
+            cache: In-memory store that serves reads for live sessions
+            flush_interval: Longest time (seconds) a write waits before it is flushed
+            batch_size: Pending writes that trigger an immediate flush
+            retention_days: Messages older than this are deleted (0 keeps everything)
+            prune_interval: Seconds between deletions of old messages
+        """
+        self.cache = cache
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+
+        path = sqlite_path_from_url(database_url)
+        self._temp_dir = None
+        if path == ':memory:':
+            # A shared-cache memory database locks whole tables against readers, so
+            # use a private file that is removed on close instead
+            self._temp_dir = tempfile.mkdtemp(prefix='chat_history_')
+            path = os.path.join(self._temp_dir, 'history.db')
+        self._path = path
+
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript(SCHEMA)
+        self._writer_conn.commit()
+
+        self._readers = threading.local()
+        self._watch = self._connect()  # Only asked for PRAGMA data_version
+        self._watch_lock = threading.Lock()
+        self._token = uuid.uuid4().hex  # Our row in history_writers
+        self._op_ids = itertools.count(1)
+        self._pending = deque()  # (op id, kind, value)
+        self._in_flight = []  # Batch being written; moves there from _pending under _condition
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()  # Cache and queue bookkeeping for one request; never held by the writer
+        self._versions: Dict[str, int] = {}  # session_id -> data_version the cache reflects
+        self._stopping = False
+        self._flush_requests = 0
+        self._next_prune = time.monotonic()
+
+        self._writer = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+        logger.info(f"SQLite chat history at {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._readers.conn = conn
+        return conn
+
+    def _enqueue(self, kind: str, value):
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("History store is closed")
+            self._pending.append((next(self._op_ids), kind, value))
+            if kind == 'flush':
+                self._flush_requests += 1
+                self._condition.notify()
+            elif len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _load(self, session_id: str, since: Optional[float] = None,
+              conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+        """Read a session's most recent messages through the (session, time) index"""
+        query = 'SELECT role, content, timestamp FROM messages WHERE session_id = ?'
+        params: list = [session_id]
+        if since is not None:
+            query += ' AND created_at >= ?'
+            params.append(since)
+        query += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(self.cache.max_messages)
+
+        rows = (conn or self._reader()).execute(query, params).fetchall()
+        return [
+            {'role': role, 'content': content, 'timestamp': timestamp}
+            for role, content, timestamp in reversed(rows)
+        ]
+
+    def _data_version(self) -> int:
+        """Changes whenever any connection but the watcher commits; no table is read"""
+        with self._watch_lock:
+            return self._watch.execute('PRAGMA data_version').fetchone()[0]
+
+    def _reload(self, session_id: str) -> List[Dict]:
+        """
+        A session's messages from SQLite plus this worker's writes that are not in them
+
+        Our last committed op id is read in the same snapshot as the rows, so a batch
+        committing meanwhile is counted exactly once.
+        """
+        with self._condition:
+            ops = self._in_flight + list(self._pending)
+        conn = self._reader()
+        conn.execute('BEGIN')
+        try:
+            messages = self._load(session_id, conn=conn)
+            row = conn.execute(
+                'SELECT last_op FROM history_writers WHERE token = ?', (self._token,)
+            ).fetchone()
+        finally:
+            conn.rollback()
+        committed = row[0] if row else 0
+        for op_id, kind, value in ops:
+            if op_id <= committed:
+                continue
+            if kind == 'clear' and value == session_id:
+                messages = []
+            elif kind == 'insert' and value[0] == session_id:
+                messages.append({'role': value[1], 'content': value[2], 'timestamp': value[3]})
+        return messages[-self.cache.max_messages:]
+
+    def _sync(self, session_id: str):
+        """Re-seed a session from SQLite if anything was committed since it was last read"""
+        version = self._data_version()
+        if self._versions.get(session_id) == version and self.cache.contains(session_id):
+            return
+        self.cache.clear(session_id)
+        self.cache.seed(session_id, self._reload(session_id))
+        self._versions[session_id] = version
+        if len(self._versions) > 2 * max(len(self.cache), 1024):
+            # Forget versions of sessions the cache has evicted
+            for stale in [sid for sid in self._versions if not self.cache.contains(sid)]:
+                del self._versions[stale]
+
+    def append(self, session_id: str, *messages: Dict):
+        """Record messages; they are visible immediately and persisted in the background"""
+        now = time.time()
+        with self._lock:
+            self._sync(session_id)
+            self.cache.append(session_id, *messages)
+            for message in messages:
+                self._enqueue('insert', (
+                    session_id,
+                    message.get('role', ''),
+                    message.get('content', ''),
+                    message.get('timestamp'),
+                    now,
+                ))
+
+    def get(self, session_id: str, since: Optional[float] = None) -> List[Dict]:
+        """
+        Return a session's messages, oldest first
+
+        Args:
+            session_id: Conversation to read
+            since: Optional Unix time; only messages stored at or after it
+        """
+        if since is not None:
+            self.flush()
+            return self._load(session_id, since)
+        with self._lock:
+            self._sync(session_id)
+            return self.cache.get(session_id)
+
+    def clear(self, session_id: str):
+        """Forget a session in memory and on disk (other workers see it once committed)"""
+        with self._lock:
+            self.cache.clear(session_id)
+            self.cache.seed(session_id, [])
+            self._enqueue('clear', session_id)
+
+    def flush(self, timeout: float = 5.0):
+        """Block until every write queued so far has been committed"""
+        done = threading.Event()
+        self._enqueue('flush', done)
+        done.wait(timeout)
+
+    def _take_batch(self) -> list:
+        """Wait for work (or the next prune), then give the batch up to flush_interval to fill"""
+        with self._condition:
+            while not self._pending and not self._stopping:
+                remaining = self._next_prune - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+            deadline = time.monotonic() + self.flush_interval
+            while (not self._stopping and not self._flush_requests
+                   and len(self._pending) < self.batch_size):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = list(self._pending)
+            self._pending.clear()
+            self._in_flight = batch
+            self._flush_requests = 0
+            return batch
+
+    def _write(self, batch: list):
+        inserts = []
+        events = []
+        conn = self._writer_conn
+        try:
+            try:
+                with conn:
+                    for _, kind, value in batch:
+                        if kind == 'insert':
+                            inserts.append(value)
+                            continue
+                        # Keep ordering: flush queued inserts before a clear
+                        if inserts:
+                            conn.executemany(INSERT, inserts)
+                            inserts = []
+                        if kind == 'clear':
+                            conn.execute('DELETE FROM messages WHERE session_id = ?', (value,))
+                        elif kind == 'flush':
+                            events.append(value)
+                    if inserts:
+                        conn.executemany(INSERT, inserts)
+                    # Committed with the batch, so readers know which of our ops a snapshot holds
+                    conn.execute(MARK, (self._token, batch[-1][0]))
+            finally:
+                with self._condition:
+                    self._in_flight = []
+        except sqlite3.Error as e:
+            logger.error(f"Error writing chat history batch of {len(batch)}: {str(e)}")
+        finally:
+            for event in events:
+                event.set()
+
+    def _prune(self):
+        """Delete messages past the retention period (every worker does this; it is idempotent)"""
+        self._next_prune = time.monotonic() + self.prune_interval
+        if self.retention_days <= 0:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        try:
+            with self._writer_conn as conn:
+                deleted = conn.execute('DELETE FROM messages WHERE created_at < ?', (cutoff,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Chat history prune failed: {str(e)}")
+            return
+        if deleted:
+            logger.info(f"Pruned {deleted} chat messages older than {self.retention_days} days")
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            if time.monotonic() >= self._next_prune:
+                self._prune()
+            with self._condition:
+                if self._stopping and not self._pending:
+                    return
+
+    def close(self, timeout: float = 10.0):
+        """Drain pending writes and stop the writer"""
+        with self._condition:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+        self._writer.join(timeout)
+        if self._writer.is_alive():
+            logger.warning("Chat history writer did not drain before shutdown")
+        else:
+            try:
+                with self._writer_conn as conn:
+                    conn.execute('DELETE FROM history_writers WHERE token = ?', (self._token,))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not remove chat history writer row: {str(e)}")
+            self._writer_conn.close()
+            self._watch.close()
+            if self._temp_dir:
+                shutil.rmtree(self._temp_dir, ignore_errors=True)
+        logger.info("Chat history store closed")
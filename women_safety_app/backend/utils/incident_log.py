@@ -0,0 +1,386 @@
+"""
+Incident log with incrementally maintained spatio-temporal aggregates
+Incidents are appended to a compact binary log shared by every worker; each
+worker folds new log records into time-decayed counts per geohash cell and
+time-of-day bucket, so reads are a couple of dictionary lookups. Once the log
+grows past a limit, one worker writes the aggregates to a snapshot and
+truncates the log, so starting a worker never replays the full history.
+"""
+
+import contextlib
+import logging
+import math
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils import geohash
+from utils.json_codec import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# timestamp (unix seconds), latitude, longitude, type, flags, reporter
+RECORD = struct.Struct('<dffBBI')
+FLAG_VERIFIED = 1  # Confirmed server-side; client uploads are unverified
+
+# Incident types as stored in the log, and how much each counts
+INCIDENT_TYPES = ('sos', 'shake', 'manual')
+TYPE_WEIGHTS = {'sos': 1.0, 'shake': 0.8, 'manual': 0.5}
+
+BUCKET_HOURS = 4  # Time-of-day buckets: 00-04, 04-08, ... 20-24
+BUCKETS = 24 // BUCKET_HOURS
+
+PRUNE_WEIGHT = 0.01  # Aggregates decayed below this are dropped
+MAX_AGE = 365 * 86400.0  # Older incident times are clamped to this age
+PRUNE_INTERVAL = 3600.0  # Seconds between prunes outside compaction
+
+# "Location: 30.76, 76.57 ..." as logged by the app's LocationService
+_LOCATION = re.compile(r'(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)')
+
+
+def reporter_key(device_id: str) -> int:
+    """32-bit reporter id stored in the log for a device"""
+    return zlib.crc32(device_id.encode('utf-8'))
+
+
+def time_bucket(timestamp: float) -> int:
+    """Time-of-day bucket of a unix timestamp, in server local time"""
+    return datetime.fromtimestamp(timestamp).hour // BUCKET_HOURS
+
+
+def parse_incident(data: Dict, now: Optional[float] = None) -> Tuple[float, float, float, int]:
+    """
+    Validate one uploaded incident (the app's IncidentEntry JSON, plus optional
+    latitude/longitude) and return (timestamp, latitude, longitude, type index)
+
+    Raises:
+        ValueError: If the incident is unusable
+    """
+    if not isinstance(data, dict):
+        raise ValueError('incident must be an object')
+
+    incident_type = data.get('type', 'manual')
+    if incident_type not in INCIDENT_TYPES:
+        raise ValueError(f"unknown type {incident_type!r}")
+
+    if data.get('latitude') is not None and data.get('longitude') is not None:
+        try:
+            latitude, longitude = float(data['latitude']), float(data['longitude'])
+        except (TypeError, ValueError):
+            raise ValueError('latitude and longitude must be numbers')
+    else:
+        match = _LOCATION.search(str(data.get('location') or ''))
+        if not match:
+            raise ValueError('no coordinates')
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or (latitude == 0 and longitude == 0):
+        raise ValueError('coordinates out of range')
+
+    now = time.time() if now is None else now
+    try:
+        # Naive times (the app's toIso8601String) are read as server local time
+        timestamp = datetime.fromisoformat(str(data['timestamp']).replace('Z', '+00:00')).timestamp()
+    except (KeyError, ValueError, OverflowError, OSError):
+        raise ValueError('missing or invalid timestamp')
+    # Phone clocks drift, and an incident cannot be in the future; anything older
+    # than MAX_AGE has decayed to nothing anyway
+    timestamp = min(max(timestamp, now - MAX_AGE), now)
+
+    return timestamp, latitude, longitude, INCIDENT_TYPES.index(incident_type)
+
+
+class IncidentAggregator:
+    """
+    Append-only incident log plus decayed counts per (cell, bucket)
+
+    Each aggregate is stored as (value, unverified part, as_of): its decayed
+    weight at time as_of. Adding an incident decays the value to the
+    incident's time and adds the incident's weight, so updates and reads are
+    O(1) whatever the history.
+
+    Unverified incidents count for `unverified_weight` of their type weight,
+    and one reporter's decayed contribution to a cell is capped at
+    `reporter_cap`; a cell's weight is capped at `cell_cap` when read. The caps
+    are applied while folding the log, so every worker reaches the same counts.
+    """
+
+    def __init__(self, log_path: str, half_life_days: float = 30.0, precision: int = 7,
+                 refresh_interval: float = 1.0, reporter_cap: float = 1.0, cell_cap: float = 3.0,
+                 unverified_weight: float = 0.5, compact_bytes: int = 1 << 20):
+        """
+        Args:
+            log_path: Shared log file (created if missing); the snapshot and lock
+                files sit next to it
+            half_life_days: Time for an incident's weight to halve
+            precision: Geohash precision of the aggregate cells
+            refresh_interval: Seconds between checks for records written by other workers
+            reporter_cap: Most decayed weight one reporter can add to a cell
+            cell_cap: Most decayed weight a cell and bucket can have
+            unverified_weight: Share of its type weight an unverified incident counts for
+            compact_bytes: Log size at which it is folded into the snapshot and truncated
+        """
+        self.log_path = log_path
+        self.snapshot_path = log_path + '.snapshot'
+        self.lock_path = log_path + '.lock'
+        self.decay = math.log(2) / (half_life_days * 86400)
+        self.precision = precision
+        self.refresh_interval = refresh_interval
+        self.reporter_cap = reporter_cap
+        self.cell_cap = cell_cap
+        self.unverified_weight = unverified_weight
+        self.compact_bytes = compact_bytes
+
+        directory = os.path.dirname(log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._cells: Dict[Tuple[str, int], List[float]] = {}
+        self._reporters: Dict[Tuple[int, str], List[float]] = {}
+        self._offset = 0
+        self._snapshot_id = None
+        self._next_refresh = 0.0
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL
+        self._lock = threading.Lock()
+        self.records = 0
+        self.capped = 0
+        self.compactions = 0
+
+        self.refresh(force=True)
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive: bool = False, blocking: bool = True):
+        """
+        Cross-process lock: appends and reads share it, compaction takes it exclusively
+
+        Yields whether the lock was acquired (only False when not blocking).
+        """
+        if fcntl is None:
+            yield True
+            return
+        handle = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(handle, flags if blocking else flags | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(handle)  # Also releases the lock
+
+    def _decayed(self, entry: List[float], now: float) -> float:
+        return entry[0] * math.exp(-self.decay * max(0.0, now - entry[2]))
+
+    def _add(self, table: Dict, key, weight: float, unverified: float, timestamp: float):
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [weight, unverified, timestamp]
+        elif timestamp >= entry[2]:
+            factor = math.exp(-self.decay * (timestamp - entry[2]))
+            entry[0] = entry[0] * factor + weight
+            entry[1] = entry[1] * factor + unverified
+            entry[2] = timestamp
+        else:
+            # Uploaded late: decay the incident to the aggregate's time instead
+            factor = math.exp(-self.decay * (entry[2] - timestamp))
+            entry[0] += weight * factor
+            entry[1] += unverified * factor
+
+    def _apply(self, timestamp: float, latitude: float, longitude: float, type_index: int,
+               flags: int, reporter: int):
+        bucket = time_bucket(timestamp)  # Raises before anything changes for a bad record
+        cell = geohash.encode(latitude, longitude, self.precision)
+        weight = TYPE_WEIGHTS[INCIDENT_TYPES[type_index]]
+        self.records += 1
+        if flags & FLAG_VERIFIED:
+            self._add(self._cells, (cell, bucket), weight, 0.0, timestamp)
+            return
+
+        weight *= self.unverified_weight
+        used = self._reporters.get((reporter, cell))
+        if used is not None:
+            weight = min(weight, self.reporter_cap - self._decayed(used, timestamp))
+        if weight <= 0:
+            self.capped += 1
+            return
+        self._add(self._reporters, (reporter, cell), weight, 0.0, timestamp)
+        self._add(self._cells, (cell, bucket), weight, weight, timestamp)
+
+    def _load_snapshot(self) -> bool:
+        """Replace the aggregates with a snapshot another worker wrote; returns whether it did"""
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return False
+        snapshot_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if snapshot_id == self._snapshot_id:
+            return False
+        with open(self.snapshot_path, 'rb') as handle:
+            snapshot = loads(handle.read())
+        self._cells = {(cell, bucket): [value, unverified, as_of]
+                       for cell, bucket, value, unverified, as_of in snapshot['cells']}
+        self._reporters = {(reporter, cell): [value, 0.0, as_of]
+                           for reporter, cell, value, as_of in snapshot['reporters']}
+        self.records = snapshot['records']
+        self.capped = snapshot['capped']
+        self._offset = 0  # The log was truncated when the snapshot was written
+        self._snapshot_id = snapshot_id
+        return True
+
+    def _fold_log(self):
+        """Apply whole records appended since the last fold; file lock held"""
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return
+        # Only whole records; a crashed writer may have left part of one
+        end = self._offset + (size - self._offset) // RECORD.size * RECORD.size
+        if end <= self._offset:
+            return
+        with open(self.log_path, 'rb') as handle:
+            handle.seek(self._offset)
+            data = handle.read(end - self._offset)
+        skipped = 0
+        for record in RECORD.iter_unpack(data):
+            try:
+                self._apply(*record)
+            except (ValueError, OverflowError, OSError, IndexError):
+                # Written before timestamps were clamped, or corrupt
+                skipped += 1
+        if skipped:
+            logger.warning(f"Skipped {skipped} unusable incident log records")
+        self._offset = end
+
+    def _prune(self, now: float) -> int:
+        """Drop aggregates whose weight has decayed to almost nothing; returns how many"""
+        dropped = 0
+        for table in (self._cells, self._reporters):
+            stale = [key for key, entry in table.items() if self._decayed(entry, now) < PRUNE_WEIGHT]
+            for key in stale:
+                del table[key]
+            dropped += len(stale)
+        return dropped
+
+    def _compact(self):
+        """Write the aggregates to the snapshot and truncate the log; self._lock held"""
+        with self._file_lock(exclusive=True, blocking=False) as locked:
+            if not locked:
+                return  # Another worker is compacting, or appends are in progress
+            self._load_snapshot()
+            self._fold_log()
+            self._prune(time.time())
+            snapshot = {
+                'records': self.records,
+                'capped': self.capped,
+                'cells': [[cell, bucket, value, unverified, as_of]
+                          for (cell, bucket), (value, unverified, as_of) in self._cells.items()],
+                'reporters': [[reporter, cell, value, as_of]
+                              for (reporter, cell), (value, _, as_of) in self._reporters.items()],
+            }
+            temporary = f"{self.snapshot_path}.{os.getpid()}"
+            with open(temporary, 'w', encoding='utf-8') as handle:
+                handle.write(dumps(snapshot))
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, self.snapshot_path)
+            os.truncate(self.log_path, 0)
+            stat = os.stat(self.snapshot_path)
+            self._snapshot_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._offset = 0
+            self.compactions += 1
+            logger.info(f"Compacted incident log into {len(self._cells)} aggregates")
+
+    def refresh(self, force: bool = False):
+        """Fold log records appended since the last refresh (by any worker) into the aggregates"""
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return
+        with self._lock:
+            self._next_refresh = now + self.refresh_interval
+            with self._file_lock():
+                self._load_snapshot()
+                self._fold_log()
+            if self._offset >= self.compact_bytes:
+                self._compact()
+            elif now >= self._next_prune:
+                self._prune(time.time())
+            if now >= self._next_prune:
+                self._next_prune = now + PRUNE_INTERVAL
+
+    def ingest(self, incidents: Iterable[Tuple[float, float, float, int]], reporter: str,
+               verified: bool = False) -> int:
+        """
+        Append parsed incidents to the log in one write; returns how many were written
+
+        Args:
+            incidents: Output of parse_incident
+            reporter: Device the incidents came from
+            verified: Whether the server confirmed them (client uploads are not)
+        """
+        flags = FLAG_VERIFIED if verified else 0
+        key = reporter_key(reporter)
+        data = b''.join(RECORD.pack(*incident, flags, key) for incident in incidents)
+        if not data:
+            return 0
+        # O_APPEND keeps concurrent writers from different workers from interleaving
+        with self._file_lock():
+            handle = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(handle, view):]
+            finally:
+                os.close(handle)
+        self.refresh(force=True)
+        return len(data) // RECORD.size
+
+    def weight(self, cell: str, bucket: int, now: Optional[float] = None) -> Tuple[float, float]:
+        """Decayed incident weight of one cell and bucket (capped), and its unverified part"""
+        entry = self._cells.get((cell, bucket))
+        if entry is None or entry[0] <= 0:
+            return 0.0, 0.0
+        now = time.time() if now is None else now
+        value = self._decayed(entry, now)
+        capped = min(value, self.cell_cap)
+        return capped, capped * entry[1] / entry[0]
+
+    def summary(self, latitude: float, longitude: float, now: Optional[float] = None) -> Dict:
+        """Decayed incident weight at a point, for the current bucket and the whole day"""
+        self.refresh()
+        now = time.time() if now is None else now
+        cell = geohash.encode(latitude, longitude, self.precision)
+        by_bucket = [self.weight(cell, bucket, now) for bucket in range(BUCKETS)]
+        current = time_bucket(now)
+        return {
+            'cell': cell,
+            'timeBucket': current,
+            'recent': round(by_bucket[current][0], 3),
+            'allDay': round(sum(weight for weight, _ in by_bucket), 3),
+            'unverified': round(sum(unverified for _, unverified in by_bucket), 3),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'log_path': self.log_path,
+            'log_bytes': self._offset,
+            'records': self.records,
+            'capped_records': self.capped,
+            'aggregates': len(self._cells),
+            'reporter_aggregates': len(self._reporters),
+            'compactions': self.compactions,
+            'half_life_days': round(math.log(2) / self.decay / 86400, 2),
+            'cell_precision': self.precision,
+            'reporter_cap': self.reporter_cap,
+            'cell_cap': self.cell_cap,
+        }
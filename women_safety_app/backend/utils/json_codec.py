@@ -0,0 +1,82 @@
+"""
+JSON codec for request bodies, responses and upstream replies
+Uses orjson when it is installed and falls back to the standard library
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up (see requirements.txt)
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# json.dumps arguments the orjson path can honour
+_ORJSON_DUMP_ARGS = {'default', 'sort_keys', 'ensure_ascii', 'separators', 'indent'}
+
+
+def _orjson_option(sort_keys: bool = False, indent: bool = False) -> int:
+    # Datetimes go through `default` so they serialize exactly as with the json module
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return option
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Parse JSON text or UTF-8 bytes
+
+    Raises:
+        ValueError: If the input is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """Compact JSON text, non-ASCII characters kept as UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_orjson_option(sort_keys)).decode('utf-8')
+    return json.dumps(obj, sort_keys=sort_keys, default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+
+    Behaves like DefaultJSONProvider (same `default` hook, key sorting and
+    debug indentation) and defers to it when orjson is not installed or a
+    caller passes json.dumps arguments orjson has no equivalent for.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or not set(kwargs) <= _ORJSON_DUMP_ARGS or kwargs.get('indent') not in (None, 2):
+            return super().dumps(obj, **kwargs)
+        option = _orjson_option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent') == 2)
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=_orjson_option(self.sort_keys, indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+
+def describe() -> Dict[str, str]:
+    """Which codec is in use, for status endpoints"""
+    return {'backend': BACKEND, 'version': getattr(orjson, '__version__', json.__version__)}
@@ -1,46 +1,172 @@
 """
 Logging configuration for Women Safety App Backend
+Request threads only put records on a queue; a background listener writes them
+to the console and to the log file.
+
+Every worker process appends to the same file, so rotation is left to logrotate
+by default (the file is reopened when it is moved away), e.g.:
+
+    /srv/backend/logs/backend.log {
+        daily
+        rotate 14
+        compress
+        delaycompress
+        missingok
+    }
+
+With LOG_ROTATION=midnight each process instead rotates its own
+backend.<pid>.log, so no two processes rename the same file.
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
 from datetime import datetime
+from typing import Optional
+
+from config.config import Config
+from utils.json_codec import dumps
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return dumps(entry, default=str)
+
+
+class AccessSampler(logging.Filter):
+    """
+    Keep a sample of access log records
+
+    Server errors and slow requests are always kept; others with probability
+    `rate`. Runs before the record is queued, so dropped records cost almost nothing.
+    """
+
+    def __init__(self, rate: float = 1.0, slow_ms: float = 1000.0):
+        super().__init__()
+        self.rate = min(1.0, max(0.0, rate))
+        self.slow_ms = slow_ms
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'status', 0) >= 500 or getattr(record, 'duration_ms', 0) >= self.slow_ms:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+def _file_handler(log_file: str, rotation: str, backup_days: int) -> logging.Handler:
+    """
+    Handler for the log file
 
-def setup_logger(name):
-    """Setup logger with file and console handlers"""
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Create logger
+    Raises:
+        ValueError: If rotation is not 'external' or 'midnight'
+    """
+    if rotation == 'external':
+        # Safe with many writers: appends only, and reopens the file after logrotate moves it
+        return logging.handlers.WatchedFileHandler(log_file, encoding='utf-8', delay=True)
+    if rotation == 'midnight':
+        root, extension = os.path.splitext(log_file)
+        return logging.handlers.TimedRotatingFileHandler(
+            f"{root}.{os.getpid()}{extension}", when='midnight', backupCount=backup_days,
+            encoding='utf-8', delay=True
+        )
+    raise ValueError(f"Unknown log rotation: {rotation!r}")
+
+
+def start_logging(log_file: Optional[str] = None, json_format: Optional[bool] = None,
+                  backup_days: Optional[int] = None,
+                  rotation: Optional[str] = None) -> logging.handlers.QueueHandler:
+    """
+    Start the background log writer (once per process); unset arguments come from Config
+
+    Args:
+        log_file: Log file (LOG_FILE)
+        json_format: Write the file as JSON lines instead of text (LOG_FORMAT)
+        backup_days: Rotated files to keep with midnight rotation (LOG_BACKUP_DAYS)
+        rotation: 'external' (logrotate) or 'midnight' (per-process files) (LOG_ROTATION)
+
+    Returns:
+        The queue handler loggers should attach
+    """
+    global _queue_handler, _listener
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        log_file = log_file or Config.LOG_FILE
+        json_format = Config.LOG_FORMAT == 'json' if json_format is None else json_format
+        backup_days = Config.LOG_BACKUP_DAYS if backup_days is None else backup_days
+        rotation = rotation or Config.LOG_ROTATION
+
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file_handler = _file_handler(log_file, rotation, backup_days)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(JSONFormatter() if json_format else logging.Formatter(
+            '[%(asctime)s] %(levelname)s in %(name)s: %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+
+        _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+        return _queue_handler
+
+
+def stop_logging():
+    """Write out queued records and stop the background writer"""
+    global _queue_handler, _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _queue_handler = _listener = None
+
+
+def setup_logger(name: Optional[str], level: str = 'DEBUG') -> logging.Logger:
+    """
+    Setup logger that writes through the shared background writer
+
+    Uses the writer already started, or starts it from Config; either way the
+    file, format and rotation are the configured ones.
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    
-    # Log file path
-    log_file = f"logs/backend_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    # Create formatters
-    detailed_formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(name)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # File handler
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(detailed_formatter)
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter(
-        '%(levelname)s: %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
-    
-    # Add handlers to logger
-    if not logger.handlers:  # Avoid duplicate handlers
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
+    logger.setLevel(level)
+
+    handler = _queue_handler or start_logging()
+    if handler not in logger.handlers:  # Avoid duplicate handlers
+        logger.addHandler(handler)
+
     return logger
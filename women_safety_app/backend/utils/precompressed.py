@@ -0,0 +1,136 @@
+"""
+Pre-encoded, pre-compressed JSON responses
+Constant payload fields are serialized and gzip-compressed once; each request
+only encodes and compresses its few varying fields (e.g. the timestamp) and
+appends them to the stored bytes. Cacheable GETs get weak ETags instead.
+"""
+
+import gzip
+import hashlib
+import json
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from flask import Request, Response, jsonify
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# gzip member header: magic, deflate, no flags, no mtime, no extra flags, unknown OS
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def _dumps(data: Dict) -> bytes:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def accepts_gzip(request: Request) -> bool:
+    return request.accept_encodings['gzip'] > 0
+
+
+class PrecompressedJSON:
+    """
+    JSON object whose constant fields are encoded and deflated ahead of time
+
+    The constant part is compressed up to a full flush, which leaves the
+    deflate stream byte-aligned with no back-references into it, so a tail
+    compressed separately per request can be appended to form one gzip member.
+    """
+
+    def __init__(self, constant: Dict, level: int = 9):
+        """
+        Args:
+            constant: Fields that are identical in every response
+            level: zlib compression level for the constant part
+        """
+        encoded = _dumps(constant)
+        # '{...}' -> '{...,' so the per-request fields can follow
+        self.prefix = encoded[:-1] + b',' if constant else b'{'
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.deflated = compressor.compress(self.prefix) + compressor.flush(zlib.Z_FULL_FLUSH)
+        self.crc = zlib.crc32(self.prefix)
+
+    def body(self, variable: Dict, use_gzip: bool = False) -> bytes:
+        """
+        Complete body with the varying fields appended, optionally as a gzip member
+
+        Raises:
+            ValueError: If there are no varying fields (the prefix ends with a comma)
+        """
+        if not variable:
+            raise ValueError("PrecompressedJSON needs at least one varying field")
+        tail = _dumps(variable)[1:]
+        if not use_gzip:
+            return self.prefix + tail
+        compressor = zlib.compressobj(1, zlib.DEFLATED, -zlib.MAX_WBITS)
+        trailer = struct.pack('<II', zlib.crc32(tail, self.crc),
+                              (len(self.prefix) + len(tail)) & 0xffffffff)
+        return _GZIP_HEADER + self.deflated + compressor.compress(tail) + compressor.flush() + trailer
+
+    def response(self, request: Request, variable: Dict, status: int = 200) -> Response:
+        """Response negotiated against the request's Accept-Encoding"""
+        use_gzip = accepts_gzip(request)
+        response = Response(self.body(variable, use_gzip), status=status, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class PrecompressedCache:
+    """Bounded map from constant fields to their PrecompressedJSON"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, PrecompressedJSON]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, constant: Dict) -> PrecompressedJSON:
+        key = tuple(constant.items())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = PrecompressedJSON(constant)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request: Request, constant: Dict, variable: Dict, status: int = 200) -> Response:
+        return self.get(constant).response(request, variable, status)
+
+
+def etag_for(payload: Dict, ignore: Iterable[str] = ('timestamp',)) -> str:
+    """Weak ETag value over the payload, leaving out fields that change on every request"""
+    stable = {key: value for key, value in payload.items() if key not in ignore}
+    return hashlib.blake2b(json.dumps(stable, sort_keys=True, default=str).encode('utf-8'),
+                           digest_size=12).hexdigest()
+
+
+def conditional_json(request: Request, payload: Dict, status: int = 200,
+                     ignore: Iterable[str] = ('timestamp',), max_age: Optional[int] = None) -> Response:
+    """
+    JSON response for a cacheable GET
+
+    Answers 304 when the client's If-None-Match already holds the payload's
+    ETag, and gzips larger bodies for clients that accept it.
+    """
+    etag = etag_for(payload, ignore)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+        response.status_code = status
+        if accepts_gzip(request) and response.content_length >= MIN_COMPRESS_SIZE:
+            response.set_data(gzip.compress(response.get_data(), compresslevel=6, mtime=0))
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,165 @@
+"""
+Token-bucket rate limiting shared by every worker process on the host
+Bucket state lives in a small SQLite file, so gunicorn workers enforce one limit
+"""
+
+import functools
+import itertools
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from flask import jsonify, make_response, request
+
+from utils.session_store import get_session_id
+
+logger = logging.getLogger(__name__)
+
+_RATE = re.compile(r'^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$')
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Parse '100/hour' into (capacity, tokens per second)"""
+    match = _RATE.match(rate or '')
+    if not match:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    count = int(match.group(1))
+    return count, count / _PERIODS[match.group(2)]
+
+
+class RateLimiter:
+    """Token buckets keyed by client (or session) and route limit"""
+
+    # Buckets are pruned once every this many checks
+    PRUNE_EVERY = 1000
+
+    def __init__(self, db_path: str, default_rate: str, key_by: str = 'client'):
+        """
+        Args:
+            db_path: SQLite file shared by the workers (':memory:' for a single process)
+            default_rate: Limit for routes without an override, e.g. '100/hour'
+            key_by: 'client' (remote address) or 'session' (session id)
+        """
+        self.db_path = db_path
+        self.default_rate = default_rate
+        self.key_by = key_by
+        parse_rate(default_rate)
+
+        self._local = threading.local()
+        self._checks = itertools.count(1)  # next() is atomic under the GIL
+        self._longest_refill = 0.0
+        self._shared_conn = None
+        if db_path == ':memory:':
+            # One connection for the process; a plain :memory: database is per connection
+            self._shared_conn = self._open()
+            self._shared_lock = threading.Lock()
+        else:
+            self._conn()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')  # losing bucket state on a crash only forgives some requests
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    def check(self, key: str, rate: Optional[str] = None, cost: float = 1.0) -> Tuple[bool, int, float]:
+        """
+        Take `cost` tokens from a bucket if it has them
+
+        Returns (allowed, remaining tokens, seconds until a request would be allowed).
+        """
+        capacity, refill = parse_rate(rate or self.default_rate)
+        self._longest_refill = max(self._longest_refill, capacity / refill)
+        bucket = f"{rate or self.default_rate}|{key}"
+        now = time.time()
+
+        if self._shared_conn is not None:
+            with self._shared_lock:
+                return self._take(self._shared_conn, bucket, capacity, refill, cost, now)
+        return self._take(self._conn(), bucket, capacity, refill, cost, now)
+
+    def _take(self, conn, bucket, capacity, refill, cost, now):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (bucket,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * refill)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (bucket, tokens, now))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            # Fail open: an unavailable limiter must not take the API down
+            logger.error(f"Rate limiter error: {str(e)}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            return True, 0, 0.0
+
+        if next(self._checks) % self.PRUNE_EVERY == 0:
+            self._prune(conn, now)
+
+        retry_after = 0.0 if allowed else (cost - tokens) / refill
+        return allowed, int(tokens), retry_after
+
+    def _prune(self, conn, now):
+        """Drop buckets idle long enough to have refilled completely"""
+        try:
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self._longest_refill,))
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limiter prune failed: {str(e)}")
+
+    def client_key(self) -> str:
+        if self.key_by == 'session':
+            return get_session_id(request, request.get_json(silent=True))
+        return request.remote_addr or 'unknown'
+
+    def limit(self, rate: Optional[str] = None):
+        """
+        Route decorator enforcing a limit (the default rate unless overridden)
+
+        Rejected requests get 429 with Retry-After; all responses carry
+        X-RateLimit-Limit and X-RateLimit-Remaining.
+        """
+        limit_value = rate or self.default_rate
+        capacity, _ = parse_rate(limit_value)
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                allowed, remaining, retry_after = self.check(self.client_key(), limit_value)
+                if not allowed:
+                    response = jsonify({
+                        'success': False,
+                        'error': 'Rate limit exceeded',
+                        'limit': limit_value
+                    })
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                else:
+                    response = make_response(view(*args, **kwargs))
+                response.headers['X-RateLimit-Limit'] = str(capacity)
+                response.headers['X-RateLimit-Remaining'] = str(remaining)
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,134 @@
+"""
+Session-keyed chat history store
+Keeps a bounded ring buffer of messages per session with idle eviction
+"""
+
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_SESSION = 'default'
+
+
+class _Shard:
+    """One lock and the sessions that hash to it"""
+
+    __slots__ = ('lock', 'sessions', 'last_sweep')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, list] = {}  # session_id -> [deque, last_seen]
+        self.last_sweep = time.monotonic()
+
+
+class SessionStore:
+    """Thread-safe per-session history with sharded locks"""
+
+    def __init__(self, max_messages: int = 20, session_timeout: float = 86400,
+                 shards: int = 16):
+        """
+        Initialize the store
+
+        Args:
+            max_messages: Messages kept per session (oldest dropped first)
+            session_timeout: Seconds of inactivity before a session is evicted
+            shards: Number of independently locked partitions
+        """
+        self.max_messages = max_messages
+        self.session_timeout = session_timeout
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[zlib.crc32(session_id.encode('utf-8')) % len(self._shards)]
+
+    def _sweep(self, shard: _Shard, now: float):
+        """Drop idle sessions from a shard; caller holds the shard lock"""
+        if now - shard.last_sweep < min(self.session_timeout, 60):
+            return
+        shard.last_sweep = now
+        cutoff = now - self.session_timeout
+        expired = [sid for sid, entry in shard.sessions.items() if entry[1] < cutoff]
+        for sid in expired:
+            del shard.sessions[sid]
+
+    def append(self, session_id: str, *messages: Dict):
+        """Append one or more messages to a session"""
+        shard = self._shard(session_id)
+        now = time.monotonic()
+        with shard.lock:
+            self._sweep(shard, now)
+            entry = shard.sessions.get(session_id)
+            if entry is None:
+                entry = [deque(maxlen=self.max_messages), now]
+                shard.sessions[session_id] = entry
+            entry[0].extend(messages)
+            entry[1] = now
+
+    def get(self, session_id: str) -> List[Dict]:
+        """Return a copy of a session's messages, oldest first"""
+        shard = self._shard(session_id)
+        now = time.monotonic()
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is None:
+                return []
+            if now - entry[1] > self.session_timeout:
+                del shard.sessions[session_id]
+                return []
+            return list(entry[0])
+
+    def contains(self, session_id: str) -> bool:
+        """Whether a live session is held in memory"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            return entry is not None and time.monotonic() - entry[1] <= self.session_timeout
+
+    def seed(self, session_id: str, messages: List[Dict]) -> bool:
+        """Populate a session that is not yet held; returns False if it already was"""
+        shard = self._shard(session_id)
+        now = time.monotonic()
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is not None and now - entry[1] <= self.session_timeout:
+                return False
+            shard.sessions[session_id] = [deque(messages, maxlen=self.max_messages), now]
+            return True
+
+    def clear(self, session_id: str):
+        """Forget a session"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """Evict every idle session now; returns the number evicted"""
+        cutoff = time.monotonic() - self.session_timeout
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired = [sid for sid, entry in shard.sessions.items() if entry[1] < cutoff]
+                for sid in expired:
+                    del shard.sessions[sid]
+                evicted += len(expired)
+        return evicted
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+def get_session_id(request, data: Optional[Dict] = None) -> str:
+    """
+    Resolve the chat session for a request
+
+    Uses the X-Session-ID header, then a session_id field in the JSON body,
+    then the client address.
+    """
+    session_id = request.headers.get('X-Session-ID')
+    if not session_id and isinstance(data, dict):
+        session_id = data.get('session_id')
+    if not session_id:
+        session_id = request.remote_addr
+    return str(session_id or DEFAULT_SESSION)[:128]
@@ -0,0 +1,38 @@
+"""
+Server-sent events helpers
+Formats SSE frames and splits finished text into sentence-sized chunks
+"""
+
+import re
+from typing import Dict, Iterator, Optional
+
+from utils.json_codec import dumps
+
+# Split after sentence punctuation or line breaks, keeping the delimiter with the chunk
+_CHUNK_BOUNDARY = re.compile(r'(?<=[.!?:\n])\s+')
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # Stop nginx from buffering the stream
+}
+
+
+def format_sse(data: Dict, event: Optional[str] = None) -> str:
+    """Encode one SSE frame with a JSON payload"""
+    frame = f"event: {event}\n" if event else ''
+    return f"{frame}data: {dumps(data)}\n\n"
+
+
+def iter_chunks(text: str, min_chars: int = 40) -> Iterator[str]:
+    """Yield sentence chunks of roughly min_chars or more, preserving the original text"""
+    buffer = ''
+    position = 0
+    for match in _CHUNK_BOUNDARY.finditer(text):
+        buffer += text[position:match.end()]
+        position = match.end()
+        if len(buffer) >= min_chars:
+            yield buffer
+            buffer = ''
+    buffer += text[position:]
+    if buffer:
+        yield buffer
@@ -0,0 +1,172 @@
+"""
+Memory-mapped safety score tiles
+A regular lat/lng grid of one-byte scores per hour-of-week bucket, written by an
+offline build and mapped read-only by every worker, so the pages are shared
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SAFETILE'
+VERSION = 1
+# magic, version, buckets, rows, cols, reserved, min_lat, min_lon, tile_deg, built_at
+HEADER = struct.Struct('<8sHHIII4xdddd')
+
+NO_DATA = 255
+HOURS_PER_WEEK = 168
+
+
+def hour_of_week(when: Optional[datetime] = None, hour_of_day: Optional[int] = None) -> int:
+    """0 = Monday 00:00-01:00, 167 = Sunday 23:00-24:00; hour_of_day overrides the hour of `when`"""
+    when = when or datetime.now()
+    return when.weekday() * 24 + (when.hour if hour_of_day is None else hour_of_day)
+
+
+def parse_hour(time_of_day) -> Optional[int]:
+    """Hour of day (0-23) from the app's "9:30 PM" or a 24-hour "21:30", or None"""
+    try:
+        text = time_of_day.strip().upper()
+        hour = int(text.split(':')[0])
+    except (AttributeError, ValueError):
+        return None
+    if text.endswith('PM'):
+        return hour % 12 + 12 if 1 <= hour <= 12 else None
+    if text.endswith('AM'):
+        return hour % 12 if 1 <= hour <= 12 else None
+    return hour if 0 <= hour <= 23 else None
+
+
+def write_tile_grid(path: str, data: bytes, rows: int, cols: int, buckets: int,
+                    min_lat: float, min_lon: float, tile_deg: float):
+    """
+    Write a tile file atomically: readers see the old file or the new one, never a partial one
+
+    Args:
+        data: rows * cols * buckets scores (0-100, or NO_DATA), tile by tile, row-major
+        buckets: 168 (hour of week), 24 (hour of day) or 1 (no time dependence)
+
+    Raises:
+        ValueError: If data does not match the grid shape
+    """
+    if len(data) != rows * cols * buckets:
+        raise ValueError(f"Expected {rows * cols * buckets} scores, got {len(data)}")
+    if buckets not in (1, 24, HOURS_PER_WEEK):
+        raise ValueError(f"buckets must be 1, 24 or {HOURS_PER_WEEK}")
+
+    header = HEADER.pack(MAGIC, VERSION, buckets, rows, cols, 0, min_lat, min_lon, tile_deg, time.time())
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(prefix='.tiles-', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as out:
+            out.write(header)
+            out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class _MappedTiles:
+    """One mapped version of the tile file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as handle:
+            stat = os.fstat(handle.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if stat.st_size < HEADER.size:
+            raise ValueError(f"{path} is too small to be a tile file")
+        (magic, version, self.buckets, self.rows, self.cols, _,
+         self.min_lat, self.min_lon, self.tile_deg, self.built_at) = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} tile file")
+        if stat.st_size != HEADER.size + self.rows * self.cols * self.buckets:
+            raise ValueError(f"{path} is truncated")
+
+
+class TileGrid:
+    """
+    O(1) score lookups from a tile file
+
+    The file is re-checked at most every check_interval seconds; when a new
+    build has replaced it, the new file is mapped and swapped in. Lookups in
+    flight keep using the mapping they started with.
+    """
+
+    def __init__(self, path: str, check_interval: float = 30.0):
+        """
+        Args:
+            path: Tile file written by write_tile_grid
+            check_interval: Seconds between checks for a newly published file
+
+        Raises:
+            OSError / ValueError: If the file cannot be mapped
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._tiles = _MappedTiles(path)
+        self._next_check = time.monotonic() + check_interval
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_interval
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != self._tiles.identity:
+                self._tiles = _MappedTiles(self.path)
+                self.reloads += 1
+                logger.info(f"Reloaded safety tiles from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping current safety tiles, could not load {self.path}: {str(e)}")
+        finally:
+            self._lock.release()
+
+    def lookup(self, latitude: float, longitude: float, hour: Optional[int] = None) -> Optional[int]:
+        """
+        Score of the tile holding a point, or None outside the grid or without data
+
+        Args:
+            hour: Hour of week (see hour_of_week); defaults to now
+        """
+        self._maybe_reload()
+        tiles = self._tiles
+        row = int((latitude - tiles.min_lat) / tiles.tile_deg)
+        col = int((longitude - tiles.min_lon) / tiles.tile_deg)
+        if latitude < tiles.min_lat or longitude < tiles.min_lon or row >= tiles.rows or col >= tiles.cols:
+            return None
+        if hour is None:
+            hour = hour_of_week()
+        score = tiles.map[HEADER.size + (row * tiles.cols + col) * tiles.buckets + hour % tiles.buckets]
+        return None if score == NO_DATA else score
+
+    def stats(self):
+        tiles = self._tiles
+        return {
+            'path': self.path,
+            'rows': tiles.rows,
+            'cols': tiles.cols,
+            'buckets': tiles.buckets,
+            'tile_deg': tiles.tile_deg,
+            'bounds': [tiles.min_lat, tiles.min_lon,
+                       tiles.min_lat + tiles.rows * tiles.tile_deg, tiles.min_lon + tiles.cols * tiles.tile_deg],
+            'built_at': datetime.fromtimestamp(tiles.built_at).isoformat(),
+            'reloads': self.reloads,
+        }
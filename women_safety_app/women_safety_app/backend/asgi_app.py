@@ -0,0 +1,417 @@
+"""
+ASGI serving mode for the AI backend
+Same routes and responses as app.py, but model calls are awaited on one event loop
+instead of holding a worker thread each, so slow Gemini calls don't cap concurrency.
+AI routes wait in the same priority lanes as app.py (emergency, support, chat).
+
+Run with:  hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+
+import asyncio
+import datetime
+import functools
+import logging
+import os
+import time
+
+import httpx
+from quart import Quart, Response, jsonify, make_response, request
+from quart.wrappers.response import ResponseBody
+
+import async_http_client
+from app import (
+    CHAT_ERROR_RESPONSE, CHAT_FALLBACK_RESPONSE, CHAT_MODELS, CHAT_SPEC, CHAT_SYSTEM_PROMPT,
+    GEMINI_API_KEY, HEDGE_POLICIES, SUPPORT_FALLBACK_RESPONSE, SUPPORT_SPEC, THREAT_FALLBACK_RESPONSE,
+    THREAT_SPEC, GeminiStreamError, answer_chat_locally, assess_area, chat_history,
+    intent_classifier, intent_stats, log_pipeline_result, model_router, parse_coordinates,
+    parse_gemini_text, pipeline_stats, quota_governor, record_error_response, record_model_result,
+    response_cache, semantic_cache, trusted_zone_lookup, trusted_zones,
+)
+from llm_pipeline import LLMPipeline
+import main_backend  # noqa: F401  (puts the main backend's shared utils package on sys.path)
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.json_codec import FastJSONProvider, loads
+from utils.session_store import get_session_id
+from utils.sse import SSE_HEADERS, format_sse, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+app.json = FastJSONProvider(app)  # orjson when installed
+
+# As many slots as upstream calls, so requests queue in the priority lanes rather
+# than first-come at the upstream semaphore
+admission = AdmissionController(
+    max_concurrent=async_http_client.UPSTREAM_CONCURRENCY,
+    max_waiting=int(os.getenv('ASGI_ADMISSION_MAX_WAITING', 1024))
+)
+
+
+class _AdmittedBody(ResponseBody):
+    """Response body that frees its admission slot once it has been sent"""
+
+    def __init__(self, body):
+        self.body = body
+        self.released = False
+
+    async def __aenter__(self):
+        return await self.body.__aenter__()
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        try:
+            await self.body.__aexit__(exc_type, exc_value, tb)
+        finally:
+            if not self.released:
+                self.released = True
+                admission.release()
+
+
+def admit(lane_name):
+    """Async counterpart of admission.admit in app.py; the slot is held until the response is sent"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                await admission.acquire_async(lane_name)
+            except AdmissionRejected as e:
+                logger.warning(f"Admission rejected: {e}")
+                response = jsonify({
+                    'success': False,
+                    'error': 'Server busy, please retry',
+                    'lane': e.lane,
+                    'reason': e.reason
+                })
+                response.status_code = 503
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            try:
+                response = await make_response(await view(*args, **kwargs))
+            except BaseException:
+                admission.release()
+                raise
+            response.response = _AdmittedBody(response.response)
+            return response
+        return wrapper
+    return decorator
+
+
+@app.before_serving
+async def startup():
+    await async_http_client.start(int(os.getenv('HTTP_WARM_CONNECTIONS', 2)))
+
+
+@app.after_serving
+async def shutdown():
+    await async_http_client.close()
+
+
+@app.after_request
+async def add_cors_headers(response):
+    # Equivalent of CORS(app) in the Flask server
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-Session-ID'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
+
+
+async def post_gemini_model_async(model_name, payload):
+    """Async post_gemini_model; same (response_json, status_code, error, elapsed) contract"""
+    url = f"/v1beta/models/{model_name}:generateContent?key={GEMINI_API_KEY}"
+    delay = quota_governor.reserve(model_name)
+    if delay is None:
+        return None, 429, f"{model_name} is over its learned quota", 0.0
+    if delay:
+        await asyncio.sleep(delay)
+    started = time.monotonic()
+    try:
+        api_response = await async_http_client.post(url, json=payload)
+    except httpx.TimeoutException:
+        elapsed = time.monotonic() - started
+        model_router.record_failure(model_name, elapsed)
+        return None, None, f"Timeout connecting to {model_name}", elapsed
+    except httpx.HTTPError as e:
+        model_router.record_failure(model_name)
+        return None, None, str(e), time.monotonic() - started
+    elapsed = time.monotonic() - started
+
+    if api_response.status_code == 200:
+        try:
+            return loads(api_response.content), 200, None, elapsed
+        except ValueError:
+            model_router.record_failure(model_name, elapsed)
+            return None, 200, "Response was not JSON", elapsed
+
+    return None, api_response.status_code, record_error_response(model_name, api_response, elapsed), elapsed
+
+
+# Same stages, caching and stats as the Flask server; only dispatch is async
+llm_pipeline = LLMPipeline(
+    dispatch=post_gemini_model_async,
+    parse=parse_gemini_text,
+    report=record_model_result,
+    router=model_router,
+    cache=response_cache,
+    semantic_cache=semantic_cache
+)
+llm_pipeline.add_hook(pipeline_stats)
+
+
+async def stream_gemini_model_async(model_name, payload):
+    """Async stream_gemini_model; raises GeminiStreamError if no text was produced"""
+    url = f"/v1beta/models/{model_name}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+    delay = quota_governor.reserve(model_name)
+    if delay is None:
+        raise GeminiStreamError(f"{model_name} is over its learned quota")
+    if delay:
+        await asyncio.sleep(delay)
+    started = time.monotonic()
+    try:
+        async with async_http_client.stream_post(url, json=payload) as api_response:
+            if api_response.status_code != 200:
+                await api_response.aread()
+                raise GeminiStreamError(record_error_response(model_name, api_response, time.monotonic() - started))
+
+            produced = False
+            async for line in api_response.aiter_lines():
+                if not line or not line.startswith('data:'):
+                    continue
+                chunk = loads(line[5:])
+                candidates = chunk.get('candidates') or [{}]
+                for part in candidates[0].get('content', {}).get('parts', []):
+                    text = part.get('text')
+                    if not text:
+                        continue
+                    if not produced:
+                        model_router.record_success(model_name, time.monotonic() - started)
+                        quota_governor.record_success(model_name)
+                        produced = True
+                    yield text
+    except httpx.HTTPError as e:
+        model_router.record_failure(model_name, time.monotonic() - started)
+        raise GeminiStreamError(str(e))
+
+    if not produced:
+        model_router.record_failure(model_name, time.monotonic() - started)
+        raise GeminiStreamError(f"{model_name} streamed no text")
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.datetime.now().isoformat(),
+        'service': 'Women Safety App AI Backend (Gemini Powered)',
+        'server': 'asgi'
+    })
+
+
+@app.route('/api/ai/stats', methods=['GET'])
+@app.route('/api/cache/stats', methods=['GET'])
+async def cache_stats():
+    return jsonify({
+        'response_cache': response_cache.stats(),
+        'semantic_cache': semantic_cache.stats(),
+        'models': model_router.snapshot(),
+        'quota': quota_governor.snapshot(),
+        'pipeline': pipeline_stats.snapshot(),
+        'intents': dict(intent_stats, enabled=intent_classifier is not None),
+        'hedging': {endpoint: policy.stats() for endpoint, policy in HEDGE_POLICIES.items()},
+        'admission': admission.stats(),
+        'upstream_in_flight': async_http_client.in_flight(),
+        'timestamp': datetime.datetime.now().isoformat()
+    })
+
+
+@app.route('/api/ai/chat', methods=['POST'])
+@admit('chat')
+async def chat():
+    data = await request.get_json()
+    message = data.get('message', '')
+
+    logger.info(f"Received chat message: {message}")
+
+    try:
+        result = await llm_pipeline.run_async(CHAT_SPEC, message)
+        log_pipeline_result(CHAT_SPEC, result)
+        response_text = result.text
+    except Exception as e:
+        logger.error(f"Gemini API Exception: {e}")
+        response_text = CHAT_ERROR_RESPONSE
+
+    chat_history.append(
+        get_session_id(request, data),
+        {'role': 'user', 'content': message},
+        {'role': 'assistant', 'content': response_text}
+    )
+
+    return jsonify({
+        'response': response_text,
+        'timestamp': datetime.datetime.now().isoformat()
+    })
+
+
+@app.route('/api/ai/chat/stream', methods=['POST'])
+@admit('chat')
+async def chat_stream():
+    started = time.monotonic()
+    data = await request.get_json()
+    message = data.get('message', '')
+    session_id = get_session_id(request, data)
+
+    logger.info(f"Received streaming chat message: {message}")
+
+    payload = CHAT_SPEC.build_payload(message)
+    state = {'source': 'fallback'}
+
+    async def pieces():
+        local_text = answer_chat_locally(message)
+        if local_text is not None:
+            state['source'] = 'local'
+            for text in iter_chunks(local_text):
+                yield text
+            return
+
+        cached_text = response_cache.get('chat', CHAT_SYSTEM_PROMPT, message)
+        if cached_text is not None:
+            state['source'] = 'cache'
+            for text in iter_chunks(cached_text):
+                yield text
+            return
+
+        similar_text = semantic_cache.get('chat', CHAT_SYSTEM_PROMPT, message)
+        if similar_text is not None:
+            state['source'] = 'semantic'
+            for text in iter_chunks(similar_text):
+                yield text
+            return
+
+        for model_name in model_router.plan(CHAT_MODELS):
+            produced = False
+            try:
+                async for text in stream_gemini_model_async(model_name, payload):
+                    produced = True
+                    yield text
+                state['source'] = model_name
+                return
+            except GeminiStreamError as e:
+                logger.warning(f"❌ Failed streaming {model_name}: {e}")
+            except Exception as e:
+                logger.error(f"Error streaming {model_name}: {e}")
+                if produced:
+                    state['source'] = 'partial'
+                    return
+
+        for text in iter_chunks(CHAT_FALLBACK_RESPONSE):
+            yield text
+
+    async def generate():
+        first_chunk_at = None
+        sent = []
+        async for text in pieces():
+            if first_chunk_at is None:
+                first_chunk_at = time.monotonic()
+            sent.append(text)
+            yield format_sse({'text': text})
+
+        response_text = ''.join(sent)
+        if state['source'] not in ('local', 'cache', 'semantic', 'fallback', 'partial'):
+            response_cache.put('chat', CHAT_SYSTEM_PROMPT, message, response_text)
+            semantic_cache.put('chat', CHAT_SYSTEM_PROMPT, message, response_text)
+        chat_history.append(
+            session_id,
+            {'role': 'user', 'content': message},
+            {'role': 'assistant', 'content': response_text}
+        )
+
+        finished = time.monotonic()
+        ttfb_ms = round(((first_chunk_at or finished) - started) * 1000, 1)
+        total_ms = round((finished - started) * 1000, 1)
+        logger.info(f"Chat stream from {state['source']} - ttfb {ttfb_ms}ms, total {total_ms}ms")
+        yield format_sse({
+            'source': state['source'],
+            'ttfb_ms': ttfb_ms,
+            'total_ms': total_ms,
+            'timestamp': datetime.datetime.now().isoformat()
+        }, event='done')
+
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None  # the stream lasts as long as the model keeps talking
+    return response
+
+
+@app.route('/api/ai/support', methods=['POST'])
+@admit('support')
+async def support():
+    data = await request.get_json()
+    concern = data.get('concern', '')
+
+    logger.info(f"Received support request: {concern}")
+
+    try:
+        result = await llm_pipeline.run_async(SUPPORT_SPEC, concern)
+        log_pipeline_result(SUPPORT_SPEC, result)
+        response_text = result.text
+    except Exception as e:
+        logger.error(f"Error in support endpoint: {e}")
+        response_text = SUPPORT_FALLBACK_RESPONSE
+
+    return jsonify({
+        'response': response_text,
+        'timestamp': datetime.datetime.now().isoformat()
+    })
+
+
+@app.route('/api/ai/area-safety', methods=['POST'])
+@admit('support')
+async def area_safety():
+    data = await request.get_json()
+    area_name = data.get('area_name', 'Unknown Location')
+    time_of_day = data.get('time_of_day', datetime.datetime.now().strftime("%I:%M %p"))
+
+    logger.info(f"Analyzing safety for: {area_name} at {time_of_day}")
+
+    return jsonify(assess_area(area_name, time_of_day, parse_coordinates(data)))
+
+
+@app.route('/api/zones', methods=['GET'])
+async def list_trusted_zones():
+    return jsonify({
+        'zones': [zone.to_dict() for zone in trusted_zones.zones()],
+        'stats': trusted_zones.stats()
+    })
+
+
+@app.route('/api/zones/lookup', methods=['POST'])
+async def lookup_trusted_zones():
+    """Point-in-zone and nearest zone for one point, or for a batch under 'points'"""
+    status, body = trusted_zone_lookup(await request.get_json(silent=True) or {})
+    return jsonify(body), status
+
+
+@app.route('/api/ai/threat-assessment', methods=['POST'])
+@admit('emergency')
+async def threat_assessment():
+    data = await request.get_json()
+    threat = data.get('threat', '')
+
+    logger.info(f"Threat assessment for: {threat}")
+
+    try:
+        result = await llm_pipeline.run_async(THREAT_SPEC, threat)
+        log_pipeline_result(THREAT_SPEC, result)
+        response_text = result.text
+    except Exception as e:
+        logger.error(f"Error in threat assessment: {e}")
+        response_text = THREAT_FALLBACK_RESPONSE
+
+    return jsonify({
+        'response': response_text,
+        'timestamp': datetime.datetime.now().isoformat()
+    })
+
+
+@app.route('/api/chat/clear', methods=['POST'])
+async def clear_history():
+    chat_history.clear(get_session_id(request, await request.get_json(silent=True)))
+    logger.info("Chat history cleared")
+    return jsonify({'status': 'success', 'message': 'History cleared'})
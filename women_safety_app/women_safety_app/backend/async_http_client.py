@@ -0,0 +1,82 @@
+"""
+Non-blocking HTTP client for the Gemini API (used by the ASGI server)
+One pooled httpx.AsyncClient per event loop, with a cap on concurrent upstream calls
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+
+from http_client import GEMINI_BASE_URL, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', 100))
+UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', 200))
+
+_client = None
+_semaphore = None
+_in_flight = 0
+
+
+async def start(warm_connections=2):
+    """Create the client on the running loop and open a few connections"""
+    global _client, _semaphore
+    _client = httpx.AsyncClient(
+        base_url=GEMINI_BASE_URL,
+        headers={'Content-Type': 'application/json'},
+        limits=httpx.Limits(
+            max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+    _semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+
+    async def _open():
+        try:
+            await _client.head('/', timeout=HTTP_CONNECT_TIMEOUT)
+        except httpx.HTTPError as e:
+            logger.warning(f"Async HTTP warm-up failed: {e}")
+
+    await asyncio.gather(*(_open() for _ in range(warm_connections)))
+
+
+async def close():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def in_flight():
+    """Number of upstream calls currently holding a concurrency slot"""
+    return _in_flight
+
+
+@asynccontextmanager
+async def _slot():
+    global _in_flight
+    async with _semaphore:
+        _in_flight += 1
+        try:
+            yield
+        finally:
+            _in_flight -= 1
+
+
+async def post(url, json=None):
+    """POST to the API, waiting for a free upstream slot first"""
+    async with _slot():
+        return await _client.post(url, json=json)
+
+
+@asynccontextmanager
+async def stream_post(url, json=None):
+    """Streaming POST; the upstream slot is held until the stream is closed"""
+    async with _slot():
+        async with _client.stream('POST', url, json=json) as response:
+            yield response
@@ -0,0 +1,222 @@
+"""
+Hedged model requests
+If the primary model is slower than its usual latency percentile, the same request
+is also sent to the next model and whichever answers first wins
+"""
+
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a fraction of requests (each request earns `ratio` of a hedge)
+
+    Losing thread-pool attempts cannot be interrupted and run to completion, still
+    using a worker and upstream quota; no hedge is sent while `burst` of them are
+    still running.
+    """
+
+    def __init__(self, ratio=0.2, burst=5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._losers_running = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.losers = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1 or self._losers_running >= self.burst:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    def track_loser(self, future):
+        """Count a losing attempt that is still running until it finishes"""
+        with self._lock:
+            self._losers_running += 1
+            self.losers += 1
+        future.add_done_callback(self._loser_done)
+
+    def _loser_done(self, future):
+        with self._lock:
+            self._losers_running -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'tokens': round(self._tokens, 2),
+                'losers': self.losers,
+                'losers_running': self._losers_running,
+            }
+
+
+class HedgePolicy:
+    """Per-endpoint hedging settings"""
+
+    def __init__(self, percentile=0.9, min_delay=0.3, max_delay=4.0, default_delay=2.0,
+                 budget_ratio=0.2, budget_burst=5):
+        """
+        percentile: primary model latency percentile to wait for before hedging
+        min_delay / max_delay: clamp on the hedge delay in seconds
+        default_delay: delay used before any latency has been observed
+        budget_ratio / budget_burst: hedge budget (see HedgeBudget)
+        """
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+
+    def hedge_delay(self, observed):
+        if observed is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def stats(self):
+        return dict(self.budget.stats(), percentile=self.percentile)
+
+
+def run_sequential(models, attempt):
+    """Try models one at a time; same contract as run_hedged"""
+    last_status, last_error = None, "No models available"
+    for model in models:
+        text, status_code, error = attempt(model)
+        if text is not None:
+            return text, model, status_code, None
+        last_status, last_error = status_code, error
+    return None, None, last_status, last_error
+
+
+def run_hedged(models, attempt, policy, executor, latency_percentile):
+    """
+    Try models in order, hedging a slow primary with the next model
+
+    models: ordered model names (e.g. from ModelRouter.plan)
+    attempt: callable(model) -> (text, status_code, error); text is None on failure
+    policy: HedgePolicy for the endpoint
+    executor: thread pool the attempts run on
+    latency_percentile: callable(model, fraction) -> seconds or None
+
+    Returns (text, model, status_code, error). At most one hedge is sent per request;
+    after a failure the chain continues sequentially. A losing attempt that has
+    already started runs to completion (its answer is discarded, it still reports
+    to the router) and counts against the hedge budget until it finishes.
+    """
+    remaining = list(models)
+    pending = {}
+    last_status, last_error = None, "No models available"
+    hedge_sent = False
+    primary = None
+
+    policy.budget.record_request()
+
+    def launch():
+        model = remaining.pop(0)
+        pending[executor.submit(attempt, model)] = model
+        return model
+
+    if remaining:
+        primary = launch()
+
+    while pending:
+        timeout = None
+        if remaining and not hedge_sent and len(pending) == 1:
+            timeout = policy.hedge_delay(latency_percentile(primary, policy.percentile))
+
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            # Primary is slower than usual - hedge once if the budget allows
+            hedge_sent = True
+            if policy.budget.try_spend():
+                launch()
+            continue
+
+        for future in done:
+            model = pending.pop(future)
+            text, status_code, error = future.result()
+            if text is not None:
+                for other in pending:
+                    # cancel() only stops attempts still queued on the executor
+                    if not other.cancel():
+                        policy.budget.track_loser(other)
+                return text, model, status_code, None
+            last_status, last_error = status_code, error
+
+        if not pending and remaining:
+            primary = launch()
+
+    return None, None, last_status, last_error
+
+
+async def run_sequential_async(models, attempt):
+    """Async run_sequential; attempt is a coroutine function"""
+    last_status, last_error = None, "No models available"
+    for model in models:
+        text, status_code, error = await attempt(model)
+        if text is not None:
+            return text, model, status_code, None
+        last_status, last_error = status_code, error
+    return None, None, last_status, last_error
+
+
+async def run_hedged_async(models, attempt, policy, latency_percentile):
+    """Async run_hedged; the losing request is cancelled rather than left to finish"""
+    remaining = list(models)
+    pending = {}
+    last_status, last_error = None, "No models available"
+    hedge_sent = False
+    primary = None
+
+    policy.budget.record_request()
+
+    def launch():
+        model = remaining.pop(0)
+        pending[asyncio.ensure_future(attempt(model))] = model
+        return model
+
+    if remaining:
+        primary = launch()
+
+    try:
+        while pending:
+            timeout = None
+            if remaining and not hedge_sent and len(pending) == 1:
+                timeout = policy.hedge_delay(latency_percentile(primary, policy.percentile))
+
+            done, _ = await asyncio.wait(list(pending), timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                hedge_sent = True
+                if policy.budget.try_spend():
+                    launch()
+                continue
+
+            for task in done:
+                model = pending.pop(task)
+                text, status_code, error = task.result()
+                if text is not None:
+                    return text, model, status_code, None
+                last_status, last_error = status_code, error
+
+            if not pending and remaining:
+                primary = launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return None, None, last_status, last_error
@@ -0,0 +1,73 @@
+"""
+Shared keep-alive HTTP client for the Gemini API
+One pooled requests.Session per process so connections and TLS sessions are reused
+"""
+
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+
+# Pool and timeout settings
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 15))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=HTTP_POOL_SIZE,
+                    pool_block=False,
+                    max_retries=0,  # the model fallback loop decides what to retry
+                )
+                session.mount(GEMINI_BASE_URL, adapter)
+                session.headers.update({
+                    'Content-Type': 'application/json',
+                    'Connection': 'keep-alive',
+                })
+                _session = session
+    return _session
+
+
+def post(url, json=None, timeout=None, **kwargs):
+    """POST through the pooled session with separate connect/read timeouts"""
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    return get_session().post(url, json=json, timeout=timeout, **kwargs)
+
+
+def warm_up(connections=2):
+    """Open connections to the API host ahead of the first request (in the background)"""
+    session = get_session()
+
+    def _open():
+        try:
+            # Any response completes the TCP+TLS handshake and returns the socket to the pool
+            session.head(GEMINI_BASE_URL, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_CONNECT_TIMEOUT))
+        except requests.RequestException as e:
+            logger.warning(f"HTTP warm-up failed: {e}")
+
+    # Concurrent requests so each one holds its own connection
+    threads = [
+        threading.Thread(target=_open, name=f'http-warm-up-{i}', daemon=True)
+        for i in range(connections)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
@@ -0,0 +1,131 @@
+"""
+Hashed n-gram intent classifier
+Messages become hashed character n-gram vectors; a softmax layer (one NumPy weight
+matrix) trained offline picks the intent, so a batch costs one matrix multiply
+
+Train from a labeled file (label<TAB>message per line):
+    python intent_classifier.py intent_training.tsv intent_model.npz
+"""
+
+import re
+import sys
+import zlib
+
+import numpy as np
+
+NGRAM_SIZES = (2, 3, 4)
+DEFAULT_FEATURES = 1 << 14
+
+_WORDS = re.compile(r"[a-z0-9']+")
+
+
+def _feature_ids(text, n_features):
+    """Hashed ids of the message's character n-grams and words (crc32, so stable across processes)"""
+    words = _WORDS.findall(text.lower())
+    padded = ' ' + ' '.join(words) + ' '
+    ids = [zlib.crc32(('w:' + word).encode()) % n_features for word in words]
+    for n in NGRAM_SIZES:
+        ids.extend(zlib.crc32(padded[i:i + n].encode()) % n_features for i in range(len(padded) - n + 1))
+    return ids
+
+
+def featurize(texts, n_features=DEFAULT_FEATURES):
+    """(len(texts), n_features) float32 matrix of L2-normalised hashed counts"""
+    matrix = np.zeros((len(texts), n_features), dtype=np.float32)
+    rows, ids = [], []
+    for row, text in enumerate(texts):
+        text_ids = _feature_ids(text, n_features)
+        rows.extend([row] * len(text_ids))
+        ids.extend(text_ids)
+    np.add.at(matrix, (rows, ids), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class IntentClassifier:
+    """Softmax regression over hashed n-gram features"""
+
+    def __init__(self, weights, bias, labels):
+        """weights: (n_features, n_labels) matrix; bias: (n_labels,); labels: intent names"""
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = [str(label) for label in labels]
+        self.n_features = self.weights.shape[0]
+
+    @classmethod
+    def load(cls, path):
+        """Raises OSError / KeyError / ValueError if the model file is missing or malformed"""
+        with np.load(path, allow_pickle=False) as model:
+            return cls(model['weights'], model['bias'], model['labels'])
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    def predict_proba(self, texts):
+        """(len(texts), n_labels) probabilities"""
+        return _softmax(featurize(texts, self.n_features) @ self.weights + self.bias)
+
+    def classify_batch(self, texts):
+        """[(label, confidence)] for each message"""
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[index], float(probabilities[row, index])) for row, index in enumerate(best)]
+
+    def classify(self, text):
+        return self.classify_batch([text])[0]
+
+    def scores(self, text):
+        """{label: probability} for one message"""
+        return dict(zip(self.labels, self.predict_proba([text])[0].tolist()))
+
+    @classmethod
+    def train(cls, texts, labels, n_features=DEFAULT_FEATURES, epochs=300, learning_rate=2.0, l2=1e-4):
+        """Full-batch gradient descent on the cross-entropy loss"""
+        names = sorted(set(labels))
+        targets = np.zeros((len(texts), len(names)), dtype=np.float32)
+        targets[np.arange(len(texts)), [names.index(label) for label in labels]] = 1.0
+
+        features = featurize(texts, n_features)
+        weights = np.zeros((n_features, len(names)), dtype=np.float32)
+        bias = np.zeros(len(names), dtype=np.float32)
+        for _ in range(epochs):
+            error = (_softmax(features @ weights + bias) - targets) / len(texts)
+            weights -= learning_rate * (features.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(weights, bias, names)
+
+
+def read_labeled(path):
+    """(texts, labels) from label<TAB>message lines; blank lines and # comments are skipped"""
+    texts, labels = [], []
+    with open(path, encoding='utf-8') as handle:
+        for number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            label, sep, text = line.partition('\t')
+            if not sep or not text.strip():
+                raise ValueError(f"{path}:{number}: expected label<TAB>message")
+            labels.append(label.strip())
+            texts.append(text.strip())
+    return texts, labels
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("usage: python intent_classifier.py LABELED_FILE MODEL_FILE")
+    texts, labels = read_labeled(sys.argv[1])
+    classifier = IntentClassifier.train(texts, labels)
+    predicted = [label for label, _ in classifier.classify_batch(texts)]
+    accuracy = sum(p == l for p, l in zip(predicted, labels)) / len(labels)
+    classifier.save(sys.argv[2])
+    print(f"Trained on {len(texts)} messages, {len(classifier.labels)} intents "
+          f"(training accuracy {accuracy:.1%}) -> {sys.argv[2]}")
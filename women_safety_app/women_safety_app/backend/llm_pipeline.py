@@ -0,0 +1,244 @@
+"""
+Request pipeline shared by every Gemini-backed endpoint
+Each endpoint only supplies an EndpointSpec (prompt, models, fallbacks); the
+pipeline runs local -> prompt -> cache -> semantic -> dispatch -> parse -> fallback and times each stage
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from hedging import run_hedged, run_hedged_async, run_sequential, run_sequential_async
+
+STAGES = ('local', 'prompt', 'cache', 'semantic', 'dispatch', 'parse', 'fallback')
+
+
+class EndpointSpec:
+    """What differs between endpoints: prompt, model chain and fallback policy"""
+
+    def __init__(self, name, system_prompt, models, input_label='User',
+                 fallback_response='', quota_response=None, hedge_policy=None, local_answer=None):
+        """
+        name: endpoint name used for caching, hedging and stats
+        input_label: how the user's text is introduced in the prompt
+        quota_response: used instead of fallback_response when the last model answered 429
+        hedge_policy: HedgePolicy to race a slow primary model, or None for sequential
+        local_answer: callable(user_text) -> text or None, tried before any model
+        """
+        self.name = name
+        self.system_prompt = system_prompt
+        self.models = models
+        self.input_label = input_label
+        self.fallback_response = fallback_response
+        self.quota_response = quota_response
+        self.hedge_policy = hedge_policy
+        self.local_answer = local_answer
+
+    def build_prompt(self, user_text):
+        return f"{self.system_prompt}\n\n{self.input_label}: {user_text}\n\nAssistant:"
+
+    def build_payload(self, user_text):
+        return {"contents": [{"parts": [{"text": self.build_prompt(user_text)}]}]}
+
+    def fallback(self, status_code):
+        if status_code == 429 and self.quota_response:
+            return self.quota_response
+        return self.fallback_response
+
+
+class PipelineResult:
+    """Outcome of one pipeline run"""
+
+    def __init__(self, text, source, status_code=None, error=None, timings=None):
+        self.text = text
+        self.source = source  # 'local', 'cache', 'semantic', 'fallback' or the model that answered
+        self.status_code = status_code
+        self.error = error
+        self.timings = timings or {}
+
+    def timings_ms(self):
+        return {stage: round(seconds * 1000, 2) for stage, seconds in self.timings.items()}
+
+
+class _StageTimer:
+    """Collects stage durations for one request (dispatch/parse may run on several threads)"""
+
+    def __init__(self):
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+class StageStats:
+    """Timing hook that keeps recent per-endpoint, per-stage durations for /api/ai/stats"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, endpoint, stage, seconds):
+        with self._lock:
+            samples = self._samples.get((endpoint, stage))
+            if samples is None:
+                samples = self._samples[(endpoint, stage)] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for (endpoint, stage), samples in self._samples.items():
+                ordered = sorted(samples)
+                result.setdefault(endpoint, {})[stage] = {
+                    'count': len(ordered),
+                    'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+                    'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                }
+            return result
+
+
+class LLMPipeline:
+    """Runs EndpointSpecs against the model chain"""
+
+    def __init__(self, dispatch, parse, report, router, cache=None, executor=None, semantic_cache=None):
+        """
+        dispatch: callable(model, payload) -> (response_json, status_code, error, elapsed);
+                  response_json is None on failure (a coroutine function for run_async)
+        parse: callable(response_json) -> text or None
+        report: callable(model, ok, elapsed) recording a parsed outcome
+        router: ModelRouter deciding which models to try
+        cache: optional ResponseCache (exact matches)
+        semantic_cache: optional SemanticCache, tried after an exact-match miss
+        executor: thread pool for hedged attempts (sync runs only)
+        """
+        self.dispatch = dispatch
+        self.parse = parse
+        self.report = report
+        self.router = router
+        self.cache = cache
+        self.semantic_cache = semantic_cache
+        self.executor = executor
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """Register callable(endpoint, stage, seconds), called once per stage per request"""
+        self._hooks.append(hook)
+
+    def _parse(self, timer, model, response_json, status_code, error, elapsed):
+        if response_json is None:
+            return None, status_code, error
+        with timer.stage('parse'):
+            text = self.parse(response_json)
+        self.report(model, text is not None, elapsed)
+        if text is None:
+            return None, status_code, "Response had no candidates"
+        return text, status_code, None
+
+    def _answer_locally(self, spec, user_text, timer):
+        if spec.local_answer is None:
+            return None
+        with timer.stage('local'):
+            text = spec.local_answer(user_text)
+        if text is None:
+            return None
+        result = PipelineResult(text, 'local', timings=timer.timings)
+        self._emit(spec, result)
+        return result
+
+    def _before_dispatch(self, spec, user_text, timer):
+        """(payload, cached_text, cache_source); cached_text is None on a miss"""
+        with timer.stage('prompt'):
+            payload = spec.build_payload(user_text)
+        with timer.stage('cache'):
+            cached = self.cache.get(spec.name, spec.system_prompt, user_text) if self.cache else None
+        if cached is not None:
+            return payload, cached, 'cache'
+        if self.semantic_cache and self.semantic_cache.enabled_for(spec.name):
+            with timer.stage('semantic'):
+                cached = self.semantic_cache.get(spec.name, spec.system_prompt, user_text)
+        return payload, cached, 'semantic'
+
+    def _finish(self, spec, user_text, timer, text, model, status_code, error):
+        if text is not None:
+            if self.cache:
+                self.cache.put(spec.name, spec.system_prompt, user_text, text)
+            if self.semantic_cache:
+                self.semantic_cache.put(spec.name, spec.system_prompt, user_text, text)
+            result = PipelineResult(text, model, status_code, None, timer.timings)
+        else:
+            with timer.stage('fallback'):
+                fallback = spec.fallback(status_code)
+            result = PipelineResult(fallback, 'fallback', status_code, error, timer.timings)
+        self._emit(spec, result)
+        return result
+
+    def _emit(self, spec, result):
+        for hook in self._hooks:
+            for stage, seconds in result.timings.items():
+                hook(spec.name, stage, seconds)
+
+    def run(self, spec, user_text):
+        timer = _StageTimer()
+        local = self._answer_locally(spec, user_text, timer)
+        if local is not None:
+            return local
+        payload, cached, cache_source = self._before_dispatch(spec, user_text, timer)
+        if cached is not None:
+            result = PipelineResult(cached, cache_source, timings=timer.timings)
+            self._emit(spec, result)
+            return result
+
+        def attempt(model):
+            with timer.stage('dispatch'):
+                response = self.dispatch(model, payload)
+            return self._parse(timer, model, *response)
+
+        candidates = self.router.plan(spec.models)
+        if spec.hedge_policy and self.executor is not None:
+            text, model, status_code, error = run_hedged(
+                candidates, attempt, spec.hedge_policy, self.executor, self.router.latency_percentile
+            )
+        else:
+            text, model, status_code, error = run_sequential(candidates, attempt)
+        return self._finish(spec, user_text, timer, text, model, status_code, error)
+
+    async def run_async(self, spec, user_text):
+        """run() for the ASGI server; dispatch must be a coroutine function"""
+        timer = _StageTimer()
+        local = self._answer_locally(spec, user_text, timer)
+        if local is not None:
+            return local
+        payload, cached, cache_source = self._before_dispatch(spec, user_text, timer)
+        if cached is not None:
+            result = PipelineResult(cached, cache_source, timings=timer.timings)
+            self._emit(spec, result)
+            return result
+
+        async def attempt(model):
+            started = time.perf_counter()
+            try:
+                response = await self.dispatch(model, payload)
+            finally:
+                timer.add('dispatch', time.perf_counter() - started)
+            return self._parse(timer, model, *response)
+
+        candidates = self.router.plan(spec.models)
+        if spec.hedge_policy:
+            text, model, status_code, error = await run_hedged_async(
+                candidates, attempt, spec.hedge_policy, self.router.latency_percentile
+            )
+        else:
+            text, model, status_code, error = await run_sequential_async(candidates, attempt)
+        return self._finish(spec, user_text, timer, text, model, status_code, error)
@@ -0,0 +1,19 @@
+"""
+Modules shared with the main backend
+Puts the main backend (../../backend, or MAIN_BACKEND_PATH) on sys.path so its
+utils package is imported from there instead of being copied here. Import this
+before any `utils.` import.
+"""
+
+import os
+import sys
+
+MAIN_BACKEND_PATH = os.getenv('MAIN_BACKEND_PATH', os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend')))
+
+if not os.path.isdir(os.path.join(MAIN_BACKEND_PATH, 'utils')):
+    raise ImportError(f"Main backend not found at {MAIN_BACKEND_PATH} (set MAIN_BACKEND_PATH)")
+
+# Appended, so modules in this directory win any name clash
+if MAIN_BACKEND_PATH not in sys.path:
+    sys.path.append(MAIN_BACKEND_PATH)
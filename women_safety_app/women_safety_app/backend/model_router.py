@@ -0,0 +1,157 @@
+"""
+Health-aware routing across Gemini models
+Tracks latency, errors and rate-limit windows per model and orders the fallback chain
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+_DURATION = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*s\s*$')
+
+
+def parse_retry_delay(error_json):
+    """Extract RetryInfo.retryDelay (e.g. "37s") from a Gemini 429 body, in seconds"""
+    try:
+        details = error_json['error']['details']
+    except (KeyError, TypeError):
+        return None
+    for detail in details or []:
+        if 'RetryInfo' in detail.get('@type', ''):
+            match = _DURATION.match(str(detail.get('retryDelay', '')))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class ModelHealth:
+    """Rolling health statistics for one model"""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True = success
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.rate_limited_until = 0.0
+        self.probe_started = 0.0
+
+    def p50(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ModelRouter:
+    """Chooses which models to try, and in what order, for each request"""
+
+    def __init__(self, failure_threshold=3, cooldown=30.0, window=50, default_rate_limit_delay=10.0,
+                 quota=None):
+        """
+        failure_threshold: consecutive failures that open a model's circuit
+        cooldown: seconds a circuit stays open before one probe request is let through
+        window: number of recent calls kept for latency and error statistics
+        default_rate_limit_delay: back-off for a 429 without a RetryInfo delay
+        quota: optional QuotaGovernor; models with no calls left this minute are tried last
+        """
+        self.quota = quota
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.default_rate_limit_delay = default_rate_limit_delay
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model):
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = ModelHealth(self.window)
+        return health
+
+    def plan(self, models):
+        """
+        Return the usable models, fastest observed p50 first
+
+        Models inside a retryDelay window or with an open circuit are skipped,
+        and models that have used up their learned quota go to the back.
+        An empty list means every model is known to be down.
+        """
+        now = time.monotonic()
+        available = []
+        with self._lock:
+            for position, model in enumerate(models):
+                health = self._get(model)
+                if health.rate_limited_until > now:
+                    continue
+                if health.open_until > now:
+                    continue
+                if health.open_until and health.consecutive_failures >= self.failure_threshold:
+                    # Half-open: let one probe through per cooldown period
+                    if health.probe_started + self.cooldown > now:
+                        continue
+                    health.probe_started = now
+                exhausted = self.quota is not None and self.quota.remaining(model) == 0
+                p50 = health.p50()
+                # Untried models keep their configured order, after models with known latency
+                available.append((exhausted, p50 if p50 is not None else float('inf'), position, model))
+        available.sort()
+        return [model for _, _, _, model in available]
+
+    def record_success(self, model, latency):
+        with self._lock:
+            health = self._get(model)
+            health.latencies.append(latency)
+            health.outcomes.append(True)
+            health.consecutive_failures = 0
+            health.open_until = 0.0
+            health.probe_started = 0.0
+
+    def record_failure(self, model, latency=None):
+        with self._lock:
+            health = self._get(model)
+            if latency is not None:
+                health.latencies.append(latency)
+            health.outcomes.append(False)
+            health.consecutive_failures += 1
+            if health.consecutive_failures >= self.failure_threshold:
+                health.open_until = time.monotonic() + self.cooldown
+
+    def record_rate_limit(self, model, retry_delay=None):
+        """Skip a model until its retryDelay has passed"""
+        delay = retry_delay if retry_delay is not None else self.default_rate_limit_delay
+        with self._lock:
+            health = self._get(model)
+            health.outcomes.append(False)
+            health.rate_limited_until = max(health.rate_limited_until, time.monotonic() + delay)
+
+    def latency_percentile(self, model, fraction):
+        """Observed latency percentile for a model in seconds, or None if unknown"""
+        with self._lock:
+            return self._get(model).percentile(fraction)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    'p50_ms': round(health.p50() * 1000) if health.latencies else None,
+                    'error_rate': round(health.error_rate(), 3),
+                    'consecutive_failures': health.consecutive_failures,
+                    'circuit_open': health.open_until > now,
+                    'rate_limited_for_s': max(0.0, round(health.rate_limited_until - now, 1)),
+                }
+                for model, health in self._health.items()
+            }
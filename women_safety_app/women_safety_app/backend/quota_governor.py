@@ -0,0 +1,127 @@
+"""
+Process-wide pacing of Gemini calls
+Learns each model's requests-per-minute limit from 429 responses and spaces
+calls out so the whole process stays just under it
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class ModelQuota:
+    """Learned limit and send history for one model"""
+
+    def __init__(self):
+        self.sent = deque()  # send times within the last window
+        self.limit = None  # learned requests per window, None until the first 429
+        self.next_slot = 0.0
+        self.last_adjusted = 0.0
+        self.rate_limits = 0
+        self.paced = 0
+        self.denied = 0
+
+
+class QuotaGovernor:
+    """Shared by every request path that calls a model"""
+
+    def __init__(self, window=60.0, safety_factor=0.9, max_wait=2.0):
+        """
+        window: quota period in seconds (Gemini limits are per minute)
+        safety_factor: fraction of the observed limit to aim for after a 429
+        max_wait: longest a call may be delayed for pacing before the caller moves on
+        """
+        self.window = window
+        self.safety_factor = safety_factor
+        self.max_wait = max_wait
+        self._quotas = {}
+        self._lock = threading.Lock()
+
+    def _get(self, model):
+        quota = self._quotas.get(model)
+        if quota is None:
+            quota = self._quotas[model] = ModelQuota()
+        return quota
+
+    def _trim(self, quota, now):
+        while quota.sent and quota.sent[0] <= now - self.window:
+            quota.sent.popleft()
+
+    def reserve(self, model, max_wait=None):
+        """
+        Claim a send slot for a model
+
+        Returns the seconds the caller must wait before sending (0 for now),
+        or None if the next slot is further away than max_wait.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        now = time.monotonic()
+        with self._lock:
+            quota = self._get(model)
+            self._trim(quota, now)
+            if quota.limit is None:
+                quota.sent.append(now)
+                return 0.0
+
+            # Spread calls evenly over the window instead of bursting up to the limit
+            slot = max(now, quota.next_slot)
+            if len(quota.sent) >= quota.limit:
+                slot = max(slot, quota.sent[len(quota.sent) - quota.limit] + self.window)
+            delay = slot - now
+            if delay > max_wait:
+                quota.denied += 1
+                return None
+            quota.next_slot = slot + self.window / quota.limit
+            quota.sent.append(slot)
+            if delay > 0:
+                quota.paced += 1
+            return delay
+
+    def record_success(self, model):
+        """Probe upwards: one more request per window for each window without a 429"""
+        now = time.monotonic()
+        with self._lock:
+            quota = self._get(model)
+            if quota.limit is not None and now - quota.last_adjusted >= self.window:
+                quota.limit += 1
+                quota.last_adjusted = now
+
+    def record_rate_limit(self, model):
+        """A 429 means the calls sent in the current window reached the real limit"""
+        now = time.monotonic()
+        with self._lock:
+            quota = self._get(model)
+            self._trim(quota, now)
+            observed = max(1, int(len(quota.sent) * self.safety_factor))
+            if quota.limit is None or observed < quota.limit:
+                quota.limit = observed
+            else:
+                quota.limit = max(1, int(quota.limit * self.safety_factor))
+            quota.last_adjusted = now
+            quota.rate_limits += 1
+
+    def remaining(self, model):
+        """Calls left in the current window, or None while the limit is unknown"""
+        now = time.monotonic()
+        with self._lock:
+            quota = self._get(model)
+            if quota.limit is None:
+                return None
+            self._trim(quota, now)
+            return max(0, quota.limit - len(quota.sent))
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for model, quota in self._quotas.items():
+                self._trim(quota, now)
+                result[model] = {
+                    'learned_rpm': round(quota.limit * 60 / self.window) if quota.limit else None,
+                    'sent_in_window': len(quota.sent),
+                    'remaining': max(0, quota.limit - len(quota.sent)) if quota.limit else None,
+                    'rate_limits': quota.rate_limits,
+                    'paced': quota.paced,
+                    'denied': quota.denied,
+                }
+            return result
@@ -0,0 +1,123 @@
+"""
+Bounded TTL/LRU cache for LLM responses
+Keyed by endpoint, system prompt hash and normalized user text
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so trivially different inputs share a key"""
+    return _WHITESPACE.sub(' ', text).strip().lower()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-endpoint TTLs and a byte budget"""
+
+    # Rough per-entry bookkeeping cost on top of the key and value bytes
+    ENTRY_OVERHEAD = 64
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, ttls=None, default_ttl=0):
+        """
+        max_bytes: total size of cached keys and values
+        ttls: endpoint -> seconds; an endpoint with no positive TTL is not cached
+        default_ttl: TTL for endpoints missing from ttls
+        """
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+        self._prompt_hashes = {}
+
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def enabled_for(self, endpoint):
+        return self.ttl_for(endpoint) > 0
+
+    def make_key(self, endpoint, system_prompt, user_text):
+        prompt_hash = self._prompt_hashes.get(system_prompt)
+        if prompt_hash is None:
+            prompt_hash = hashlib.sha1(system_prompt.encode('utf-8')).hexdigest()[:16]
+            self._prompt_hashes[system_prompt] = prompt_hash
+        return f"{endpoint}:{prompt_hash}:{normalize_text(user_text)}"
+
+    def get(self, endpoint, system_prompt, user_text):
+        """Return the cached response or None"""
+        if not self.enabled_for(endpoint):
+            return None
+
+        key = self.make_key(endpoint, system_prompt, user_text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.current_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, endpoint, system_prompt, user_text, value):
+        """Store a response; oversized values are skipped"""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+
+        key = self.make_key(endpoint, system_prompt, user_text)
+        size = len(key.encode('utf-8')) + len(value.encode('utf-8')) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'ttls': {endpoint: self.ttl_for(endpoint) for endpoint in self.ttls},
+            }
@@ -0,0 +1,188 @@
+"""
+Near-duplicate answer cache for LLM responses
+Messages are embedded locally as hashed word and character-trigram vectors; a
+bounded matrix of recent message vectors is searched with one matrix-vector
+product. Catches rewordings ("Someone is following me!!", small typos), not
+free paraphrases. Matches whose negations differ ("safe" / "unsafe",
+"should I call" / "should I not call") are always refused.
+"""
+
+import hashlib
+import re
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+
+CHAR_NGRAM_SIZE = 3
+WORD_WEIGHT = 2.0  # Whole words count more than the character n-grams inside them
+DUPLICATE_SIMILARITY = 0.999  # put() overwrites an entry this close instead of adding one
+
+_WORDS = re.compile(r"[a-z0-9]+")
+_APOSTROPHES = re.compile(r"['\u2019]")
+
+NEGATION_WORDS = frozenset({
+    'not', 'no', 'never', 'nobody', 'nothing', 'nowhere', 'none', 'neither', 'nor', 'without',
+    'cannot', 'cant', 'dont', 'doesnt', 'didnt', 'isnt', 'arent', 'wasnt', 'werent', 'wont',
+    'wouldnt', 'shouldnt', 'couldnt', 'havent', 'hasnt', 'hadnt', 'aint', 'mustnt', 'neednt',
+})
+
+
+def tokenize(text):
+    """Lowercase words with apostrophes dropped, so "don't" and "dont" are the same word"""
+    return _WORDS.findall(_APOSTROPHES.sub('', text.lower()))
+
+
+def _negation_count(words):
+    return sum(1 for word in words if word in NEGATION_WORDS)
+
+
+def negation_differs(words, other_words):
+    """Whether two messages differ in not/no/never-style words or an un- prefix"""
+    if _negation_count(words) != _negation_count(other_words):
+        return True
+    first, second = Counter(words), Counter(other_words)
+    for ours, theirs in ((first, second), (second, first)):
+        for word in ours:
+            if word.startswith('un') and word[2:] in theirs and word not in theirs:
+                return True
+    return False
+
+
+def embed(words, n_features=2048):
+    """L2-normalised hashed feature vector (all zeros for no words)"""
+    vector = np.zeros(n_features, dtype=np.float32)
+    if not words:
+        return vector
+    # crc32 rather than hash() so vectors do not change between processes
+    np.add.at(vector, [zlib.crc32(('w:' + word).encode()) % n_features for word in words], WORD_WEIGHT)
+    padded = ' ' + ' '.join(words) + ' '
+    np.add.at(vector, [zlib.crc32(padded[i:i + CHAR_NGRAM_SIZE].encode()) % n_features
+                       for i in range(len(padded) - CHAR_NGRAM_SIZE + 1)], 1.0)
+    return vector / np.linalg.norm(vector)
+
+
+class SemanticCache:
+    """Thread-safe, bounded near-duplicate cache with LRU eviction, partitioned per endpoint and prompt"""
+
+    def __init__(self, max_entries=1000, threshold=0.93, n_features=2048, endpoints=()):
+        """
+        threshold: minimum cosine similarity for a cached answer to be served
+        endpoints: endpoints that use the cache; all others opt out
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.n_features = n_features
+        self.endpoints = frozenset(endpoints)
+
+        self._vectors = np.zeros((max_entries, n_features), dtype=np.float32)
+        self._partitions = np.full(max_entries, -1, dtype=np.int32)  # -1 marks a free slot
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._words = [None] * max_entries
+        self._values = [None] * max_entries
+        self._partition_ids = {}
+        self._size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+
+        self.hits = {}
+        self.misses = {}
+        self.refused = 0  # Similar enough, but negations differ
+        self.evictions = 0
+
+    def enabled_for(self, endpoint):
+        return endpoint in self.endpoints
+
+    def _partition(self, endpoint, system_prompt):
+        return endpoint, hashlib.sha1(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+    def _candidates(self, partition_id, vector, threshold):
+        """Slots of this partition at or above threshold, most similar first; lock held"""
+        if self._size == 0:
+            return []
+        similarities = self._vectors[:self._size] @ vector
+        similarities[self._partitions[:self._size] != partition_id] = -1.0
+        slots = np.flatnonzero(similarities >= threshold)
+        return [(int(slot), float(similarities[slot])) for slot in slots[np.argsort(-similarities[slots])]]
+
+    def get(self, endpoint, system_prompt, user_text):
+        """Return the answer cached for a near-duplicate message, or None"""
+        if not self.enabled_for(endpoint):
+            return None
+        words = tokenize(user_text)
+        vector = embed(words, self.n_features)
+        with self._lock:
+            partition_id = self._partition_ids.get(self._partition(endpoint, system_prompt))
+            candidates = [] if partition_id is None else self._candidates(partition_id, vector, self.threshold)
+            for slot, _ in candidates:
+                if negation_differs(words, self._words[slot]):
+                    self.refused += 1
+                    continue
+                self._tick += 1
+                self._last_used[slot] = self._tick
+                self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+                return self._values[slot]
+            self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+            return None
+
+    def put(self, endpoint, system_prompt, user_text, value):
+        """Store an answer, replacing an identical message or evicting the least recently used"""
+        if not self.enabled_for(endpoint):
+            return
+        words = tokenize(user_text)
+        if not words:
+            return
+        vector = embed(words, self.n_features)
+        with self._lock:
+            partition = self._partition(endpoint, system_prompt)
+            partition_id = self._partition_ids.setdefault(partition, len(self._partition_ids))
+            slot = None
+            for candidate, _ in self._candidates(partition_id, vector, DUPLICATE_SIMILARITY):
+                if not negation_differs(words, self._words[candidate]):
+                    slot = candidate
+                    break
+            if slot is None:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(self._last_used.argmin())
+                    self.evictions += 1
+            self._tick += 1
+            self._vectors[slot] = vector
+            self._partitions[slot] = partition_id
+            self._last_used[slot] = self._tick
+            self._words[slot] = words
+            self._values[slot] = value
+
+    def clear(self):
+        with self._lock:
+            self._partitions.fill(-1)
+            self._words = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'entries': self._size,
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': hits,
+                'misses': misses,
+                'refused': self.refused,
+                'evictions': self.evictions,
+                'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                'endpoints': {
+                    endpoint: {
+                        'hits': self.hits.get(endpoint, 0),
+                        'misses': self.misses.get(endpoint, 0),
+                    } for endpoint in sorted(self.endpoints)
+                },
+            }
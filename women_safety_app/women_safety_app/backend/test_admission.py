@@ -0,0 +1,104 @@
+"""
+Tests for priority admission in the ASGI server
+Run with: python -m pytest test_admission.py
+"""
+
+import asyncio
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_emergency_is_admitted_before_earlier_chat():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1)
+        await admission.acquire_async('chat')
+        order = []
+
+        async def request(lane):
+            await admission.acquire_async(lane)
+            order.append(lane)
+            admission.release()
+
+        tasks = [asyncio.create_task(request('chat'))]
+        await settle()
+        tasks.append(asyncio.create_task(request('emergency')))
+        await settle()
+        assert admission.stats()['waiting'] == 2
+
+        admission.release()
+        await asyncio.gather(*tasks)
+        return order, admission.stats()
+
+    order, stats = run(scenario())
+    assert order == ['emergency', 'chat']
+    assert stats['running'] == 0 and stats['waiting'] == 0
+
+
+def test_cancelled_waiter_leaves_its_lane():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1)
+        await admission.acquire_async('chat')
+        waiter = asyncio.create_task(admission.acquire_async('support'))
+        await settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        admission.release()
+        return admission.stats()
+
+    stats = run(scenario())
+    assert stats['running'] == 0 and stats['waiting'] == 0
+
+
+def test_async_waiter_expires():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, lanes={'chat': (2, 4, 0.05)})
+        await admission.acquire_async('chat')
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire_async('chat')
+        return rejected.value, admission.stats()
+
+    error, stats = run(scenario())
+    assert error.reason == 'expired'
+    assert stats['running'] == 1 and stats['lanes']['chat']['expired'] == 1
+
+
+@pytest.fixture
+def asgi(monkeypatch):
+    asgi_app = pytest.importorskip('asgi_app')
+    monkeypatch.setattr(asgi_app, 'admission', AdmissionController(
+        max_concurrent=1, lanes={'emergency': (0, 0, 1.0), 'support': (1, 0, 1.0), 'chat': (2, 0, 1.0)}
+    ))
+    return asgi_app
+
+
+def test_asgi_routes_hold_a_slot_until_the_response_is_sent(asgi):
+    async def scenario():
+        client = asgi.app.test_client()
+        response = await client.post('/api/chat/clear', json={})  # not admission controlled
+        assert response.status_code == 200
+
+        response = await client.post('/api/ai/area-safety', json={'area_name': 'Sector 17'})
+        await response.get_data()
+        assert response.status_code == 200
+        assert asgi.admission.stats()['running'] == 0
+
+        await asgi.admission.acquire_async('chat')
+        response = await client.post('/api/ai/threat-assessment', json={'threat': 'someone is following me'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert (await response.get_json())['lane'] == 'emergency'
+
+    run(scenario())
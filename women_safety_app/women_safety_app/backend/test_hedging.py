@@ -0,0 +1,177 @@
+"""
+Tests for hedged model requests and the hedge budget
+Run with: python -m pytest test_hedging.py
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from hedging import HedgeBudget, HedgePolicy, run_hedged, run_hedged_async
+
+
+def no_latency(model, fraction):
+    return None  # Always wait default_delay before hedging
+
+
+def policy(ratio=1.0, burst=1):
+    return HedgePolicy(min_delay=0.01, default_delay=0.05, budget_ratio=ratio, budget_burst=burst)
+
+
+class Models:
+    """Attempt function whose models answer immediately, fail, or wait for a release"""
+
+    def __init__(self, slow=(), failing=()):
+        self.slow = set(slow)
+        self.failing = set(failing)
+        self.release = threading.Event()
+        self.calls = []
+
+    def attempt(self, model):
+        self.calls.append(model)
+        if model in self.slow:
+            self.release.wait(5)
+        if model in self.failing:
+            return None, 503, f'{model} unavailable'
+        return f'answer from {model}', 200, None
+
+
+def eventually(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_budget_earns_a_fraction_of_a_hedge_per_request():
+    budget = HedgeBudget(ratio=0.5, burst=2)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+
+    budget.record_request()
+    assert not budget.try_spend()
+    budget.record_request()
+    assert budget.try_spend()
+
+    for _ in range(10):
+        budget.record_request()
+    assert budget.stats()['tokens'] == 2  # Capped at burst
+    assert budget.stats()['hedges'] == 3 and budget.stats()['requests'] == 12
+
+
+def test_running_losers_hold_the_budget():
+    budget = HedgeBudget(ratio=1.0, burst=1)
+    loser = Future()
+    loser.set_running_or_notify_cancel()
+    budget.track_loser(loser)
+    assert not budget.try_spend()  # A token is available, but a loser is still running
+    assert budget.stats()['losers_running'] == 1
+
+    loser.set_result(('late answer', 200, None))
+    assert budget.stats()['losers_running'] == 0
+    assert budget.try_spend()
+    assert budget.stats()['losers'] == 1
+
+
+def test_slow_primary_is_hedged_and_the_loser_is_tracked(executor):
+    models = Models(slow={'primary'})
+    hedges = policy()
+    result = run_hedged(['primary', 'secondary'], models.attempt, hedges, executor, no_latency)
+    assert result == ('answer from secondary', 'secondary', 200, None)
+    assert hedges.stats()['hedges'] == 1
+    assert hedges.stats()['losers_running'] == 1
+
+    # While the loser runs, the next slow primary is waited out instead of hedged
+    second = executor.submit(run_hedged, ['primary', 'secondary'], models.attempt, hedges,
+                             executor, no_latency)
+    with pytest.raises(TimeoutError):
+        second.result(timeout=0.2)
+    models.release.set()
+    assert second.result(timeout=5)[1] == 'primary'
+    assert hedges.stats()['hedges'] == 1
+    eventually(lambda: hedges.stats()['losers_running'] == 0)  # The loser's callback runs on its worker
+    assert models.calls.count('secondary') == 1
+
+
+def test_no_hedge_without_tokens(executor):
+    models = Models(slow={'primary'})
+    hedges = policy(ratio=0.0, burst=1)
+    assert hedges.budget.try_spend()  # Spend the only token
+
+    threading.Timer(0.2, models.release.set).start()
+    result = run_hedged(['primary', 'secondary'], models.attempt, hedges, executor, no_latency)
+    assert result[1] == 'primary'
+    assert models.calls == ['primary']
+    assert hedges.stats()['requests'] == 1 and hedges.stats()['hedges'] == 1
+
+
+class QueueingExecutor:
+    """Runs the first attempt; later ones stay queued, as behind busy workers"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.started = False
+        self.queued = []
+
+    def submit(self, fn, *args):
+        if not self.started:
+            self.started = True
+            return self.executor.submit(fn, *args)
+        future = Future()
+        self.queued.append(future)
+        return future
+
+
+def test_queued_hedge_is_cancelled_not_tracked(executor):
+    models = Models(slow={'primary'})
+    hedges = policy()
+    queueing = QueueingExecutor(executor)
+    threading.Timer(0.2, models.release.set).start()
+    result = run_hedged(['primary', 'secondary'], models.attempt, hedges, queueing, no_latency)
+    assert result[1] == 'primary'
+    assert hedges.stats()['hedges'] == 1
+    assert [future.cancelled() for future in queueing.queued] == [True]
+    assert hedges.stats()['losers'] == hedges.stats()['losers_running'] == 0
+
+
+def test_fast_failure_falls_through_without_hedging(executor):
+    models = Models(failing={'primary'})
+    hedges = policy()
+    result = run_hedged(['primary', 'secondary'], models.attempt, hedges, executor, no_latency)
+    assert result == ('answer from secondary', 'secondary', 200, None)
+    assert hedges.stats()['hedges'] == 0
+
+    models = Models(failing={'primary', 'secondary'})
+    assert run_hedged(['primary', 'secondary'], models.attempt, hedges, executor, no_latency) == (
+        None, None, 503, 'secondary unavailable')
+
+
+def test_async_hedge_cancels_the_loser():
+    hedges = policy()
+    cancelled = []
+
+    async def attempt(model):
+        try:
+            await asyncio.sleep(5 if model == 'primary' else 0)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return f'answer from {model}', 200, None
+
+    async def scenario():
+        result = await run_hedged_async(['primary', 'secondary'], attempt, hedges, no_latency)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario())[1] == 'secondary'
+    assert cancelled == ['primary']
+    assert hedges.stats()['hedges'] == 1 and hedges.stats()['losers'] == 0
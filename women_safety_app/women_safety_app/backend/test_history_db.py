@@ -0,0 +1,100 @@
+"""
+Tests for the main backend's SQLite chat history
+Run with: python -m pytest test_history_db.py
+"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils.history_db import SQLiteHistoryStore
+from utils.session_store import SessionStore
+
+
+def message(text, role='user'):
+    return {'role': role, 'content': text, 'timestamp': None}
+
+
+def texts(messages):
+    return [m['content'] for m in messages]
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'history.db'}"
+
+
+@pytest.fixture
+def stores():
+    opened = []
+
+    def open_store(database_url, **settings):
+        store = SQLiteHistoryStore(database_url, cache=SessionStore(), flush_interval=0.01, **settings)
+        opened.append(store)
+        return store
+
+    yield open_store
+    for store in opened:
+        store.close()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_get_returns_while_a_writer_transaction_is_open(database_url, stores):
+    store = stores(database_url)
+    store.append('s1', message('first'))
+    store.flush()
+
+    # Another worker holds the write lock, so our writer's commit has to wait for it
+    other = sqlite3.connect(database_url[len('sqlite:///'):])
+    other.execute('BEGIN IMMEDIATE')
+    other.execute("INSERT INTO messages (session_id, role, content, created_at) VALUES ('s2', 'user', 'x', 0)")
+    try:
+        store.append('s1', message('second'))
+        wait_for(lambda: store._in_flight)
+
+        started = time.monotonic()
+        assert texts(store.get('s1')) == ['first', 'second']
+        assert time.monotonic() - started < 0.5
+    finally:
+        other.commit()
+        other.close()
+
+    # The other worker's commit forces a reload that races our own commit
+    assert texts(store.get('s1')) == ['first', 'second']
+    store.flush()
+    assert texts(store.get('s1')) == ['first', 'second']
+
+
+def test_writes_from_another_worker_are_picked_up(database_url, stores):
+    first, second = stores(database_url), stores(database_url)
+    first.append('s1', message('hello'), message('hi', role='assistant'))
+    first.flush()
+    assert texts(second.get('s1')) == ['hello', 'hi']
+
+    second.append('s1', message('again'))
+    second.flush()
+    assert texts(first.get('s1')) == ['hello', 'hi', 'again']
+
+    second.clear('s1')
+    second.flush()
+    assert first.get('s1') == []
+
+
+def test_memory_database_is_private_and_removed(stores):
+    store = stores('sqlite:///:memory:')
+    store.append('s1', message('hello'))
+    store.flush()
+    assert texts(store.get('s1')) == ['hello']
+    assert texts(store.get('s1', since=0)) == ['hello']
+
+    store.close()
+    assert not os.path.exists(store._temp_dir)
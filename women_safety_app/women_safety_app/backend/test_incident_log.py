@@ -0,0 +1,95 @@
+"""
+Tests for the main backend's incident log and its aggregates
+Run with: python -m pytest test_incident_log.py
+"""
+
+import os
+import time
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils import incident_log
+from utils.incident_log import MAX_AGE, RECORD, IncidentAggregator, parse_incident
+
+NOW = 1_750_000_000.0
+LATITUDE, LONGITUDE = 30.7689, 76.5754
+
+
+def incident(timestamp, **fields):
+    return dict({'type': 'sos', 'latitude': LATITUDE, 'longitude': LONGITUDE, 'timestamp': timestamp}, **fields)
+
+
+def test_parse_incident():
+    assert parse_incident(incident('2025-06-15T10:00:00+00:00'), now=NOW) == (
+        1749981600.0, LATITUDE, LONGITUDE, 0)
+    assert parse_incident({'type': 'shake', 'location': 'Location: 30.76, 76.57',
+                           'timestamp': '2025-06-15T10:00:00Z'}, now=NOW)[1:] == (30.76, 76.57, 1)
+
+
+@pytest.mark.parametrize('timestamp, expected', [
+    ('9999-12-31T23:59:59+00:00', NOW),  # Future: clamped to now
+    ('0001-01-01T00:00:00+00:00', NOW - MAX_AGE),  # Ancient: clamped to the oldest allowed
+])
+def test_timestamps_are_clamped(timestamp, expected):
+    assert parse_incident(incident(timestamp), now=NOW)[0] == expected
+
+
+@pytest.mark.parametrize('timestamp', ['0001-01-01T00:00:00', 'yesterday', 1e20, None])
+def test_unusable_timestamps_are_rejected(timestamp):
+    with pytest.raises(ValueError, match='timestamp'):
+        parse_incident(incident(timestamp), now=NOW)
+
+
+@pytest.mark.parametrize('error', [OverflowError, OSError])
+def test_platform_time_errors_are_rejected(monkeypatch, error):
+    class Moment:
+        def timestamp(self):
+            raise error('timestamp out of range for platform time_t')
+
+    class Clock:
+        @staticmethod
+        def fromisoformat(text):
+            return Moment()
+
+    monkeypatch.setattr(incident_log, 'datetime', Clock)
+    with pytest.raises(ValueError, match='timestamp'):
+        parse_incident(incident('2025-06-15T10:00:00'), now=NOW)
+
+
+def test_unusable_log_records_are_skipped(tmp_path):
+    path = str(tmp_path / 'incidents.log')
+    with open(path, 'wb') as handle:
+        handle.write(RECORD.pack(-1e18, LATITUDE, LONGITUDE, 0, 0, 1))  # Written before clamping
+        handle.write(RECORD.pack(time.time(), LATITUDE, LONGITUDE, 0, 0, 1))
+    aggregator = IncidentAggregator(path)
+    assert aggregator.records == 1
+    assert aggregator.summary(LATITUDE, LONGITUDE)['allDay'] > 0
+
+
+def test_compaction_and_replay_reach_the_same_counts(tmp_path):
+    path = str(tmp_path / 'incidents.log')
+    settings = {'compact_bytes': RECORD.size * 4, 'refresh_interval': 0.0}
+    now = time.time()
+    batches = [
+        [(now - 3600 * hours, LATITUDE, LONGITUDE, hours % 3) for hours in range(1, 6)],
+        [(now - 60, LATITUDE + 0.01, LONGITUDE, 0), (now - 30, LATITUDE, LONGITUDE, 1)],
+    ]
+
+    writer = IncidentAggregator(path, **settings)
+    early = IncidentAggregator(path, **settings)  # Started before the compaction
+    writer.ingest(batches[0], 'device-one', verified=True)
+    assert writer.compactions == 1
+    assert os.path.getsize(path) == 0 and os.path.exists(path + '.snapshot')
+
+    writer.ingest(batches[1], 'device-two')
+    assert os.path.getsize(path) == 2 * RECORD.size
+
+    late = IncidentAggregator(path, **settings)  # Started from the snapshot plus the log
+    early.refresh(force=True)
+    for point in [(LATITUDE, LONGITUDE), (LATITUDE + 0.01, LONGITUDE)]:
+        expected = writer.summary(*point, now=now)
+        assert expected['allDay'] > 0
+        assert late.summary(*point, now=now) == expected
+        assert early.summary(*point, now=now) == expected
+    assert writer.records == late.records == early.records == 7
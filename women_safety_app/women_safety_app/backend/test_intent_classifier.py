@@ -0,0 +1,93 @@
+"""
+Tests for the intent classifier and the local-or-Gemini decision for chat
+Run with: python -m pytest test_intent_classifier.py
+"""
+
+import os
+
+import pytest
+
+from intent_classifier import IntentClassifier, read_labeled
+
+TRAINING_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_training.tsv')
+
+THREATS = [
+    "someone is following me home",
+    "a man is following me",
+    "I think I'm being followed",
+    "there's a guy stalking me",
+    "I'm scared, someone is following me",
+    "I'm scared, he grabbed my arm",
+    "help me someone is attacking me",
+    "someone is outside my door",
+]
+
+SAFETY_CHECKS = [
+    "is this area safe at night",
+    "is it safe to walk here",
+    "how safe is this neighbourhood",
+    "is the park safe after dark",
+    "is it safe to take the metro at 11pm in delhi",
+]
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return IntentClassifier.train(*read_labeled(TRAINING_PATH))
+
+
+@pytest.fixture
+def app_module(classifier, monkeypatch):
+    app = pytest.importorskip('app')
+    monkeypatch.setattr(app, 'intent_classifier', classifier)
+    monkeypatch.setattr(app, 'intent_stats', {'local': 0, 'upstream': 0})
+    return app
+
+
+def test_training_data_is_learned(classifier):
+    texts, labels = read_labeled(TRAINING_PATH)
+    predicted = [label for label, _ in classifier.classify_batch(texts)]
+    assert sum(p == l for p, l in zip(predicted, labels)) / len(labels) > 0.95
+
+
+def test_scores_are_a_distribution(classifier):
+    scores = classifier.scores("is it safe to walk here")
+    assert set(scores) == set(classifier.labels)
+    assert sum(scores.values()) == pytest.approx(1.0, abs=1e-4)
+    assert max(scores, key=scores.get) == classifier.classify("is it safe to walk here")[0]
+
+
+@pytest.mark.parametrize('message', THREATS)
+def test_threats_always_go_upstream(app_module, message):
+    assert app_module.answer_chat_locally(message) is None
+
+
+def test_threats_go_upstream_at_any_threshold(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'INTENT_CONFIDENCE_THRESHOLD', 0.0)
+    assert all(app_module.answer_chat_locally(message) is None for message in THREATS)
+    assert app_module.intent_stats == {'local': 0, 'upstream': len(THREATS)}
+
+
+@pytest.mark.parametrize('message', SAFETY_CHECKS)
+def test_safety_checks_stay_local(app_module, message):
+    assert app_module.answer_chat_locally(message) == app_module.INTENT_RESPONSES['safety_check']
+
+
+def test_confidence_threshold_holds(app_module, classifier, monkeypatch):
+    message = "is it safe to take the metro at 11pm in delhi"
+    _, confidence = classifier.classify(message)
+    assert confidence >= app_module.INTENT_CONFIDENCE_THRESHOLD
+
+    monkeypatch.setattr(app_module, 'INTENT_CONFIDENCE_THRESHOLD', confidence + 0.01)
+    assert app_module.answer_chat_locally(message) is None
+    monkeypatch.setattr(app_module, 'INTENT_CONFIDENCE_THRESHOLD', confidence)
+    assert app_module.answer_chat_locally(message) is not None
+
+
+def test_only_confident_answers_are_local(app_module, classifier):
+    texts, _ = read_labeled(TRAINING_PATH)
+    for message in texts + THREATS + SAFETY_CHECKS + ["what's the weather tomorrow"]:
+        intent, confidence = classifier.classify(message)
+        if app_module.answer_chat_locally(message) is not None:
+            assert confidence >= app_module.INTENT_CONFIDENCE_THRESHOLD
+            assert intent in app_module.CURATED_INTENTS
@@ -0,0 +1,118 @@
+"""
+Tests for the main backend's pre-compressed JSON and conditional GET responses
+Run with: python -m pytest test_precompressed.py
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, request
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils.precompressed import (MIN_COMPRESS_SIZE, PrecompressedCache, PrecompressedJSON,
+                                 conditional_json)
+
+app = Flask(__name__)
+
+CONSTANT = {
+    'isSafe': True,
+    'safetyScore': 82,
+    'message': 'This area appears to be relatively safe. Stay alert — सुरक्षित रहें.',
+    'details': {'placeTypes': {'police': 2, 'hospital': 1}, 'nearby': ['Sector 17 Plaza'] * 20},
+}
+
+
+def request_headers(gzip_ok=False, etag=None):
+    headers = {'Accept-Encoding': 'gzip, deflate'} if gzip_ok else {}
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    return headers
+
+
+def decoded(response):
+    data = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+@pytest.mark.parametrize('constant', [CONSTANT, {}])
+@pytest.mark.parametrize('variable', [
+    {'timestamp': '2025-06-15T21:30:00'},
+    {'timestamp': '2025-06-15T21:30:01', 'cached': False, 'note': 'दिल्ली ' * 50},
+])
+def test_spliced_gzip_member_matches_the_plain_body(constant, variable):
+    payload = PrecompressedJSON(constant)
+    plain = payload.body(variable)
+    assert json.loads(plain) == dict(constant, **variable)
+
+    compressed = payload.body(variable, use_gzip=True)
+    assert gzip.decompress(compressed) == plain  # Also checks the spliced CRC and length
+
+
+def test_constant_part_is_compressed_once():
+    payload = PrecompressedJSON(CONSTANT)
+    first = payload.body({'timestamp': 'a'}, use_gzip=True)
+    second = payload.body({'timestamp': 'b'}, use_gzip=True)
+    stored = slice(10, 10 + len(payload.deflated))  # After the gzip header
+    assert first[stored] == second[stored] == payload.deflated
+    assert len(first) < len(payload.prefix)
+
+
+def test_varying_fields_are_required():
+    with pytest.raises(ValueError):
+        PrecompressedJSON(CONSTANT).body({})
+
+
+@pytest.mark.parametrize('gzip_ok', [True, False])
+def test_response_negotiates_encoding(gzip_ok):
+    with app.test_request_context(headers=request_headers(gzip_ok)):
+        response = PrecompressedJSON(CONSTANT).response(request, {'timestamp': 'now'}, status=201)
+    assert response.status_code == 201
+    assert response.headers.get('Content-Encoding') == ('gzip' if gzip_ok else None)
+    assert 'Accept-Encoding' in response.vary
+    assert decoded(response) == dict(CONSTANT, timestamp='now')
+
+
+def test_cache_reuses_and_bounds_entries():
+    constant = {'success': True, 'response': 'Stay calm.', 'emergency': True}
+    cache = PrecompressedCache(max_entries=2)
+    first = cache.get(constant)
+    assert cache.get(dict(constant)) is first
+    cache.get(dict(constant, response='Call 112.'))
+    cache.get(dict(constant, response='Move to a lit area.'))
+    assert cache.get(constant) is not first  # Evicted as least recently used
+
+
+def test_matching_etag_gets_304():
+    payload = {'messages': ['hello'] * 5, 'timestamp': '2025-06-15T21:30:00'}
+    with app.test_request_context():
+        first = conditional_json(request, payload, max_age=30)
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/"')
+    assert first.headers['Cache-Control'] == 'private, max-age=30'
+
+    # The timestamp is left out of the ETag, so a later render still matches
+    later = dict(payload, timestamp='2025-06-15T21:31:00')
+    with app.test_request_context(headers=request_headers(etag=first.headers['ETag'])):
+        revalidated = conditional_json(request, later)
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+    assert revalidated.headers['ETag'] == first.headers['ETag']
+    assert revalidated.headers['Cache-Control'] == 'no-cache'
+
+    changed = dict(payload, messages=['hello'] * 6)
+    with app.test_request_context(headers=request_headers(etag=first.headers['ETag'])):
+        response = conditional_json(request, changed)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+
+
+@pytest.mark.parametrize('size, gzipped', [(10, False), (MIN_COMPRESS_SIZE, True)])
+def test_only_larger_bodies_are_gzipped(size, gzipped):
+    payload = {'history': 'x' * size}
+    with app.test_request_context(headers=request_headers(gzip_ok=True)):
+        response = conditional_json(request, payload)
+    assert (response.headers.get('Content-Encoding') == 'gzip') is gzipped
+    assert decoded(response) == payload
@@ -0,0 +1,93 @@
+"""
+Tests for the main backend's shared token-bucket rate limiter
+Run with: python -m pytest test_rate_limit.py
+"""
+
+import importlib
+import os
+import sqlite3
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils import rate_limit
+from utils.rate_limit import RateLimiter, parse_rate
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'time', clock)
+    return clock
+
+
+def test_parse_rate():
+    assert parse_rate('100/hour') == (100, 100 / 3600)
+    assert parse_rate(' 5 / second ') == (5, 5.0)
+    with pytest.raises(ValueError):
+        parse_rate('100 per hour')
+
+
+def test_bucket_refills_over_time(clock):
+    limiter = RateLimiter(':memory:', '2/minute')
+    assert limiter.check('client')[:2] == (True, 1)
+    assert limiter.check('client')[:2] == (True, 0)
+
+    allowed, remaining, retry_after = limiter.check('client')
+    assert (allowed, remaining) == (False, 0)
+    assert retry_after == pytest.approx(30.0)
+
+    clock.now += 29.0
+    assert not limiter.check('client')[0]
+    clock.now += 1.0
+    assert limiter.check('client')[:2] == (True, 0)
+
+    # Never refills past capacity
+    clock.now += 3600
+    assert limiter.check('client')[:2] == (True, 1)
+
+
+def test_cost_and_separate_buckets(clock):
+    limiter = RateLimiter(':memory:', '10/hour')
+    assert limiter.check('a', cost=8)[:2] == (True, 2)
+    assert not limiter.check('a', cost=3)[0]
+    assert limiter.check('b', cost=3)[:2] == (True, 7)
+    assert limiter.check('a', '5/hour')[:2] == (True, 4)
+
+
+def test_workers_share_buckets_through_the_file(clock, tmp_path):
+    path = str(tmp_path / 'rate_limits.db')
+    first, second = RateLimiter(path, '2/hour'), RateLimiter(path, '2/hour')
+    assert first.check('client')[0]
+    assert second.check('client')[0]
+    assert not first.check('client')[0]
+
+
+def test_fails_open_when_the_database_breaks(tmp_path):
+    path = str(tmp_path / 'rate_limits.db')
+    limiter = RateLimiter(path, '1/hour')
+    assert limiter.check('client')[0]
+    assert not limiter.check('client')[0]
+
+    other = sqlite3.connect(path)
+    other.execute('DROP TABLE buckets')
+    other.close()
+
+    assert limiter.check('client') == (True, 0, 0.0)
+    assert limiter.check('client') == (True, 0, 0.0)
+
+
+def test_default_database_does_not_depend_on_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv('RATE_LIMIT_DB', raising=False)
+    monkeypatch.chdir(tmp_path)
+    config = importlib.reload(importlib.import_module('config.config'))
+    assert os.path.isabs(config.Config.RATE_LIMIT_DB)
+    assert os.path.dirname(config.Config.RATE_LIMIT_DB) == main_backend.MAIN_BACKEND_PATH
@@ -0,0 +1,119 @@
+"""
+Tests for the main backend's route safety scoring and its upstream lookup budget
+Run with: python -m pytest test_route_safety.py
+"""
+
+import threading
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's ai_models on sys.path)
+from ai_models.area_safety import AreaSafetyEngine
+from ai_models.places import PlacesSource, PlacesSourceError
+from ai_models.route_safety import NEUTRAL_SCORE, RouteSafetyScorer, decode_polyline
+
+START, END = (30.70, 76.70), (30.70, 76.80)  # About 9.6 km due east
+
+
+def encode_polyline(points):
+    encoded, previous = [], (0, 0)
+    for point in points:
+        current = tuple(round(value * 1e5) for value in point)
+        for value, before in zip(current, previous):
+            delta = value - before
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                encoded.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            encoded.append(chr(delta + 63))
+        previous = current
+    return ''.join(encoded)
+
+
+class RecordingSource(PlacesSource):
+    name = 'recording'
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def nearby(self, latitude, longitude, radius):
+        with self._lock:
+            self.calls.append((latitude, longitude))
+        if self.fail:
+            raise PlacesSourceError('quota exceeded')
+        return []
+
+
+class FixedTiles:
+    def __init__(self, score):
+        self.score = score
+
+    def lookup(self, latitude, longitude, hour=None):
+        return self.score
+
+
+ROUTE = encode_polyline([START, END])
+
+
+def scorer_for(source, max_lookups, tiles=None):
+    engine = AreaSafetyEngine(source, tiles=tiles)
+    return RouteSafetyScorer(engine, spacing_m=200, max_samples=50, workers=4, max_lookups=max_lookups)
+
+
+def test_polyline_round_trip():
+    assert decode_polyline(ROUTE).tolist() == [list(START), list(END)]
+    with pytest.raises(ValueError):
+        decode_polyline(ROUTE[:-1])
+
+
+def test_lookups_stay_within_budget_and_spread_along_the_route():
+    source = RecordingSource()
+    result = scorer_for(source, max_lookups=5).score_routes([ROUTE])
+
+    assert result['distinctCells'] > 20
+    assert result['upstreamLookups'] == len(source.calls) == 5
+    assert result['skippedCells'] == result['distinctCells'] - 5
+    assert result['routes'][0]['unscoredSamples'] == result['routes'][0]['samples'] - 5
+
+    longitudes = sorted(longitude for _, longitude in source.calls)
+    assert longitudes[0] - START[1] < 0.005 and END[1] - longitudes[-1] < 0.005
+    gaps = [b - a for a, b in zip(longitudes, longitudes[1:])]
+    assert min(gaps) > 0.015  # Not bunched at the start of the route
+
+
+def test_cached_cells_do_not_use_the_budget():
+    source = RecordingSource()
+    scorer = scorer_for(source, max_lookups=5)
+    first = scorer.score_routes([ROUTE])
+    second = scorer.score_routes([ROUTE])
+
+    assert second['upstreamLookups'] == 5
+    assert second['skippedCells'] == first['skippedCells'] - 5
+    assert len(set(source.calls)) == 10  # The second request looked up new cells only
+
+
+def test_unbudgeted_route_is_fully_scored():
+    source = RecordingSource()
+    result = scorer_for(source, max_lookups=100).score_routes([ROUTE, ROUTE])
+    assert result['upstreamLookups'] == result['distinctCells'] == len(source.calls)
+    assert result['skippedCells'] == 0
+    assert [route['unscoredSamples'] for route in result['routes']] == [0, 0]
+
+
+def test_failed_lookups_count_against_the_budget_and_score_neutral():
+    source = RecordingSource(fail=True)
+    result = scorer_for(source, max_lookups=5).score_routes([ROUTE])
+    route = result['routes'][0]
+    assert result['upstreamLookups'] == len(source.calls) == 5
+    assert route['unscoredSamples'] == route['samples']
+    assert route['safetyScore'] == NEUTRAL_SCORE
+
+
+def test_tiles_answer_without_lookups():
+    source = RecordingSource()
+    result = scorer_for(source, max_lookups=5, tiles=FixedTiles(90)).score_routes([ROUTE])
+    assert result['upstreamLookups'] == result['skippedCells'] == len(source.calls) == 0
+    assert result['routes'][0]['safetyScore'] == 90
+    assert 'Passes through safe/busy areas' in result['routes'][0]['safetyFeatures']
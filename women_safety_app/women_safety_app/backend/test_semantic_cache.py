@@ -0,0 +1,125 @@
+"""
+Tests for the near-duplicate answer cache
+Run with: python -m pytest test_semantic_cache.py
+"""
+
+import pytest
+
+from llm_pipeline import EndpointSpec, LLMPipeline
+from semantic_cache import SemanticCache, embed, negation_differs, tokenize
+
+PROMPT = 'You are a safety assistant.'
+
+
+def similarity(first, second):
+    return float(embed(tokenize(first)) @ embed(tokenize(second)))
+
+
+def cache_with(*messages, **settings):
+    cache = SemanticCache(endpoints=['chat'], **settings)
+    for message in messages:
+        cache.put('chat', PROMPT, message, f"answer to {message}")
+    return cache
+
+
+@pytest.mark.parametrize('cached, asked', [
+    ("is it safe to walk alone at night", "is it unsafe to walk alone at night"),
+    ("should I call the police", "should I not call the police"),
+    ("I feel safe here", "I don't feel safe here"),
+    ("is the station open at night", "is the station never open at night"),
+])
+def test_negated_messages_never_match(cached, asked):
+    assert negation_differs(tokenize(cached), tokenize(asked))
+    # Refused even with a threshold low enough to accept the similarity
+    assert cache_with(cached, threshold=0.5).get('chat', PROMPT, asked) is None
+
+
+def test_negated_pairs_are_similar_enough_to_need_the_guard():
+    assert similarity("is it unsafe to walk alone at night", "is it safe to walk alone at night") > 0.85
+    assert similarity("should I not call the police", "should I call the police") > 0.85
+
+
+def test_free_paraphrase_is_not_served():
+    assert similarity("someone is following me", "I think a man is following me home") < 0.93
+    assert cache_with("someone is following me").get('chat', PROMPT, "I think a man is following me home") is None
+
+
+def test_no_threshold_serves_the_paraphrase_without_confusing_different_questions():
+    paraphrase = similarity("someone is following me", "I think a man is following me home")
+    different = [
+        ("is it safe to walk at night", "is it safe to drive at night"),
+        ("someone is following me", "someone is following me on instagram"),
+        ("is the metro safe at night", "is the bus safe at night"),
+    ]
+    # Any threshold low enough for the paraphrase would also serve these wrong answers
+    assert all(similarity(first, second) > paraphrase for first, second in different)
+    for first, second in different:
+        assert cache_with(first).get('chat', PROMPT, second) is None
+
+
+def test_rewording_is_served():
+    cache = cache_with("someone is following me")
+    assert cache.get('chat', PROMPT, "Someone is following me!!") == "answer to someone is following me"
+
+
+def test_negation_on_both_sides_still_matches():
+    cache = cache_with("I don't feel safe here")
+    assert cache.get('chat', PROMPT, "I dont feel safe here") == "answer to I don't feel safe here"
+
+
+def test_default_threshold_is_strict():
+    assert SemanticCache().threshold >= 0.93
+
+
+def test_partitioned_by_endpoint_and_prompt():
+    cache = SemanticCache(endpoints=['chat', 'support'])
+    cache.put('chat', PROMPT, "someone is following me", 'chat answer')
+    assert cache.get('support', PROMPT, "someone is following me") is None
+    assert cache.get('chat', 'A different prompt', "someone is following me") is None
+
+
+def test_endpoints_opt_in():
+    cache = SemanticCache(endpoints=['chat'])
+    cache.put('threat-assessment', PROMPT, "someone is following me", 'answer')
+    assert cache.get('threat-assessment', PROMPT, "someone is following me") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = cache_with("one two three", "four five six", max_entries=2)
+    assert cache.get('chat', PROMPT, "one two three") is not None
+    cache.put('chat', PROMPT, "seven eight nine", 'answer')
+    assert cache.get('chat', PROMPT, "four five six") is None
+    assert cache.get('chat', PROMPT, "one two three") is not None
+    assert cache.stats()['evictions'] == 1
+
+
+class _Router:
+    def plan(self, models):
+        return list(models)
+
+    def latency_percentile(self, model, percentile):
+        return None
+
+
+def test_pipeline_serves_near_duplicates_from_the_semantic_stage():
+    calls = []
+
+    def dispatch(model, payload):
+        calls.append(model)
+        return {'text': 'model answer'}, 200, None, 0.01
+
+    pipeline = LLMPipeline(
+        dispatch=dispatch,
+        parse=lambda response_json: response_json['text'],
+        report=lambda model, ok, elapsed: None,
+        router=_Router(),
+        semantic_cache=SemanticCache(endpoints=['chat'])
+    )
+    spec = EndpointSpec('chat', PROMPT, ['model-a'])
+
+    assert pipeline.run(spec, "someone is following me").source == 'model-a'
+    repeat = pipeline.run(spec, "Someone is following me!")
+    assert (repeat.source, repeat.text) == ('semantic', 'model answer')
+    assert pipeline.run(spec, "no one is following me").source == 'model-a'
+    assert calls == ['model-a', 'model-a']
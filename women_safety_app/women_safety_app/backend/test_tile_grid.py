@@ -0,0 +1,127 @@
+"""
+Tests for the main backend's memory-mapped safety tiles and their reload
+Run with: python -m pytest test_tile_grid.py
+"""
+
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's utils on sys.path)
+from utils import tile_grid
+from utils.tile_grid import HEADER, NO_DATA, TileGrid, hour_of_week, parse_hour, write_tile_grid
+
+# Two rows by three columns of 0.1 degree tiles
+GRID = {'rows': 2, 'cols': 3, 'min_lat': 30.0, 'min_lon': 76.0, 'tile_deg': 0.1}
+
+
+def publish(path, score, buckets=1):
+    write_tile_grid(path, bytes([score]) * (GRID['rows'] * GRID['cols'] * buckets), buckets=buckets, **GRID)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'tiles.bin')
+
+
+@pytest.mark.parametrize('text, hour', [
+    ('9:30 PM', 21), ('12:15 AM', 0), ('12:00 pm', 12), ('21:30', 21), ('0:05', 0),
+    ('13:00 PM', None), ('24:00', None), ('noon', None), (None, None),
+])
+def test_parse_hour(text, hour):
+    assert parse_hour(text) == hour
+
+
+def test_hour_of_week():
+    sunday_evening = datetime(2025, 6, 15, 21, 30)
+    assert hour_of_week(datetime(2025, 6, 9, 0, 10)) == 0
+    assert hour_of_week(sunday_evening) == 6 * 24 + 21
+    assert hour_of_week(sunday_evening, hour_of_day=3) == 6 * 24 + 3
+
+
+def test_lookup_by_tile_and_hour(path):
+    data = bytearray()
+    for tile in range(GRID['rows'] * GRID['cols']):
+        data += bytes((tile * 10 + hour) % 100 for hour in range(24))
+    data[-1] = NO_DATA  # Top-right tile, 23:00
+    write_tile_grid(path, bytes(data), buckets=24, **GRID)
+
+    grid = TileGrid(path)
+    assert grid.lookup(30.05, 76.05, hour=0) == 0
+    assert grid.lookup(30.05, 76.15, hour=3) == 13
+    assert grid.lookup(30.15, 76.25, hour=24 + 5) == 55  # Hour of week folds onto hour of day
+    assert grid.lookup(30.15, 76.25, hour=23) is None
+    for outside in [(29.99, 76.05), (30.05, 75.99), (30.21, 76.05), (30.05, 76.31)]:
+        assert grid.lookup(*outside, hour=0) is None
+
+
+def test_bad_writes_leave_the_published_file_alone(path):
+    publish(path, 40)
+    with pytest.raises(ValueError, match='Expected'):
+        write_tile_grid(path, b'\x00', buckets=1, **GRID)
+    with pytest.raises(ValueError, match='buckets'):
+        write_tile_grid(path, b'\x00' * 12, buckets=2, **GRID)
+    assert os.listdir(os.path.dirname(path)) == ['tiles.bin']
+    assert TileGrid(path).lookup(30.05, 76.05) == 40
+
+
+def test_new_build_is_swapped_in_after_the_check_interval(path, monkeypatch):
+    publish(path, 40)
+    grid = TileGrid(path, check_interval=60)
+    old = grid._tiles
+    publish(path, 70)
+    assert grid.lookup(30.05, 76.05) == 40  # Not checked yet
+
+    now = tile_grid.time.monotonic() + 61
+    monkeypatch.setattr(tile_grid.time, 'monotonic', lambda: now)
+    assert grid.lookup(30.05, 76.05) == 70
+    assert grid.reloads == grid.stats()['reloads'] == 1
+    assert old.map[HEADER.size] == 40  # Readers holding the old mapping still see the old build
+
+    assert grid.lookup(30.05, 76.05) == 70
+    assert grid.reloads == 1  # Unchanged file, no remap
+
+
+def test_broken_build_keeps_the_current_tiles(path):
+    publish(path, 40)
+    grid = TileGrid(path, check_interval=0)
+    with open(path + '.partial', 'wb') as handle:
+        handle.write(HEADER.pack(b'SAFETILE', 1, 1, 2, 3, 0, 30.0, 76.0, 0.1, 0.0) + b'\x50' * 3)
+    os.replace(path + '.partial', path)
+
+    assert grid.lookup(30.05, 76.05) == 40
+    assert grid.reloads == 0
+
+    publish(path, 70)
+    assert grid.lookup(30.05, 76.05) == 70
+
+
+def test_readers_only_see_whole_builds_while_publishing(path):
+    publish(path, 1)
+    grid = TileGrid(path, check_interval=0)
+    builds = range(1, 41)
+    seen, errors = set(), []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                seen.update([grid.lookup(30.05, 76.05), grid.lookup(30.15, 76.25)])
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for score in builds:
+        publish(path, score)
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert not errors
+    assert seen <= set(builds)
+    assert grid.lookup(30.05, 76.05) == builds[-1]
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.startswith('.tiles-')]
@@ -0,0 +1,111 @@
+"""
+Tests for the main backend's micro-batching transformers generator
+Run with: python -m pytest test_transformers_generator.py
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import main_backend  # noqa: F401  (puts the main backend's ai_models on sys.path)
+from ai_models import transformers_generator
+from ai_models.transformers_generator import TransformersGenerator
+
+
+class WorkerStopped(BaseException):
+    """Escapes the per-batch handler, as KeyboardInterrupt or SystemExit would"""
+
+
+class FakePipeline:
+    """Stands in for a Hugging Face text-generation pipeline"""
+
+    def __init__(self):
+        self.tokenizer = SimpleNamespace(pad_token_id=0)
+        self.batches = []
+        self.failures = {}  # prompt -> exception raised for any batch containing it
+        self.gate = None  # Event the pipeline waits on before generating
+
+    def __call__(self, prompts, **kwargs):
+        self.batches.append(list(prompts))
+        if self.gate is not None:
+            self.gate.wait(5)
+        for prompt in prompts:
+            if prompt in self.failures:
+                raise self.failures[prompt]
+        return [[{'generated_text': f' {prompt.upper()} '}] for prompt in prompts]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pipeline = FakePipeline()
+    monkeypatch.setattr(transformers_generator, 'get_pipeline', lambda model_name: pipeline)
+    return pipeline
+
+
+def generate_all(generator, prompts):
+    with ThreadPoolExecutor(len(prompts)) as pool:
+        futures = [pool.submit(generator.generate, prompt, 5) for prompt in prompts]
+    return futures
+
+
+def test_concurrent_prompts_share_a_batch(pipeline):
+    generator = TransformersGenerator('fake', 16, max_batch_size=3, max_wait_ms=2000)
+    futures = generate_all(generator, ['one', 'two', 'three'])
+    assert [future.result() for future in futures] == ['ONE', 'TWO', 'THREE']
+    assert len(pipeline.batches) == 1 and sorted(pipeline.batches[0]) == ['one', 'three', 'two']
+
+
+def test_failed_batch_fails_every_prompt_and_the_worker_carries_on(pipeline):
+    pipeline.failures['two'] = RuntimeError('CUDA out of memory')
+    generator = TransformersGenerator('fake', 16, max_batch_size=3, max_wait_ms=500)
+    futures = generate_all(generator, ['one', 'two', 'three'])
+    for future in futures:
+        with pytest.raises(RuntimeError, match='out of memory'):
+            future.result()
+
+    assert generator.generate('four', timeout=5) == 'FOUR'
+
+
+def test_short_result_list_fails_the_batch(pipeline, monkeypatch):
+    monkeypatch.setattr(FakePipeline, '__call__', lambda self, prompts, **kwargs: [])
+    generator = TransformersGenerator('fake', 16, max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match='Expected 1 results, got 0'):
+        generator.generate('one', timeout=5)
+
+
+def test_dead_worker_fails_queued_prompts_and_is_replaced(pipeline):
+    pipeline.failures['one'] = WorkerStopped()
+    pipeline.gate = threading.Event()
+    generator = TransformersGenerator('fake', 16, max_batch_size=1, max_wait_ms=0)
+
+    with ThreadPoolExecutor(3) as pool:
+        first = pool.submit(generator.generate, 'one', 5)
+        while not pipeline.batches:  # 'one' is inside the pipeline
+            time.sleep(0.001)
+        queued = [pool.submit(generator.generate, prompt, 5) for prompt in ['two', 'three']]
+        while generator._queue.qsize() < 2:
+            time.sleep(0.001)
+        pipeline.gate.set()
+
+        for future in [first] + queued:
+            with pytest.raises(WorkerStopped):
+                future.result()
+
+    assert pipeline.batches == [['one']]
+    worker = generator._worker
+    worker.join(5)
+    assert not worker.is_alive()
+
+    pipeline.gate = None
+    assert generator.generate('four', timeout=5) == 'FOUR'
+    assert generator._worker is not worker
+
+
+def test_generators_are_shared_per_model_and_token_limit(monkeypatch):
+    monkeypatch.setattr(transformers_generator, '_generators', {})
+    first = transformers_generator.get_generator('fake', 16)
+    assert transformers_generator.get_generator('fake', 16, max_batch_size=2) is first
+    assert transformers_generator.get_generator('fake', 32) is not first
@@ -0,0 +1,271 @@
+"""
+Trusted zone registry
+Circular zones (centre + radius, like the app's TrustedZone) held in a uniform
+lat/lng grid, so point-in-zone queries only look at nearby zones
+"""
+
+import json
+import math
+import threading
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = 111320.0
+
+# Zones spanning more cells than this are checked directly instead of being gridded
+MAX_CELLS_PER_ZONE = 64
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _unit_vector(latitude, longitude):
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+KD_LEAF_SIZE = 8
+
+
+def _build_kd(items, depth=0):
+    """
+    items: (x, y, z, zone) tuples
+    Nodes are (bounding box, left, right), leaves (bounding box, items); boxes
+    are (min x, min y, min z, max x, max y, max z)
+    """
+    box = tuple(min(item[axis] for item in items) for axis in range(3)) + \
+        tuple(max(item[axis] for item in items) for axis in range(3))
+    if len(items) <= KD_LEAF_SIZE:
+        return box, tuple(items)
+    axis = depth % 3
+    items.sort(key=lambda item: item[axis])
+    mid = len(items) // 2
+    return box, _build_kd(items[:mid], depth + 1), _build_kd(items[mid:], depth + 1)
+
+
+def _box_distance(box, query):
+    """Squared distance from a point to a bounding box"""
+    total = 0.0
+    for axis in range(3):
+        value = query[axis]
+        if value < box[axis]:
+            total += (box[axis] - value) ** 2
+        elif value > box[axis + 3]:
+            total += (value - box[axis + 3]) ** 2
+    return total
+
+
+def _search_kd(node, query, best):
+    """Nearest item to query; best is [zone, squared chord] and is updated in place"""
+    if len(node) == 2:
+        qx, qy, qz = query
+        for x, y, z, zone in node[1]:
+            d = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+            if d < best[1]:
+                best[0], best[1] = zone, d
+        return
+    # Closer child first, the other only if its box could still hold something nearer
+    children = sorted(((_box_distance(child[0], query), child) for child in node[1:]), key=lambda c: c[0])
+    for distance, child in children:
+        if distance < best[1]:
+            _search_kd(child, query, best)
+
+
+class TrustedZone:
+    """A named circle; serialises with the app's field names"""
+
+    __slots__ = ('name', 'latitude', 'longitude', 'radius')
+
+    def __init__(self, name, latitude, longitude, radius=500.0):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+
+    @classmethod
+    def from_dict(cls, data):
+        """Raises ValueError on missing or out-of-range fields"""
+        try:
+            zone = cls(
+                str(data['name']),
+                float(data['latitude']),
+                float(data['longitude']),
+                float(data.get('radiusInMeters', data.get('radius', 500))),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid trusted zone: {e}")
+        if not zone.name or not (-90 <= zone.latitude <= 90 and -180 <= zone.longitude <= 180) or zone.radius <= 0:
+            raise ValueError("Invalid trusted zone: name, coordinates or radius out of range")
+        return zone
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'radiusInMeters': self.radius,
+        }
+
+
+class TrustedZoneIndex:
+    """
+    Grid index over trusted zones
+
+    Each zone is listed in every cell its bounding box touches, so point-in-zone
+    checks only measure the zones of one cell. Cells hold tuples that are swapped
+    whole on writes, so those lookups never take the lock. Nearest-zone queries
+    use a k-d tree over the zone centres as 3D unit vectors (straight-line
+    distance orders points like great-circle distance, with no seams at the
+    antimeridian or poles).
+    """
+
+    def __init__(self, cell_size_m=1000.0):
+        """cell_size_m: grid cell height; roughly the typical zone radius works best"""
+        self.cell_deg = cell_size_m / METERS_PER_DEGREE
+        self._zones = {}  # name -> TrustedZone
+        self._cover = {}  # cell -> tuple of zones overlapping it
+        self._kd_tree = None  # built lazily for nearest()
+        self._large = ()  # zones too big to grid
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._zones)
+
+    def _cell(self, latitude, longitude):
+        return int(math.floor(latitude / self.cell_deg)), int(math.floor(longitude / self.cell_deg))
+
+    def _cover_cells(self, zone):
+        """Cells touched by the zone's bounding box, or None if there are too many"""
+        d_lat = zone.radius / METERS_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(zone.latitude)), 1e-6)
+        d_lon = min(180.0, zone.radius / (METERS_PER_DEGREE * cos_lat))
+        lat0, lon0 = self._cell(zone.latitude - d_lat, zone.longitude - d_lon)
+        lat1, lon1 = self._cell(zone.latitude + d_lat, zone.longitude + d_lon)
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > MAX_CELLS_PER_ZONE:
+            return None
+        return [(i, j) for i in range(lat0, lat1 + 1) for j in range(lon0, lon1 + 1)]
+
+    def _unlink(self, zone):
+        cells = self._cover_cells(zone)
+        if cells is None:
+            self._large = tuple(z for z in self._large if z is not zone)
+        else:
+            for cell in cells:
+                remaining = tuple(z for z in self._cover.get(cell, ()) if z is not zone)
+                if remaining:
+                    self._cover[cell] = remaining
+                else:
+                    self._cover.pop(cell, None)
+        self._kd_tree = None
+
+    def add(self, zone):
+        """Add a zone, replacing any zone with the same name"""
+        with self._lock:
+            previous = self._zones.get(zone.name)
+            if previous is not None:
+                self._unlink(previous)
+            self._zones[zone.name] = zone
+            cells = self._cover_cells(zone)
+            if cells is None:
+                self._large = self._large + (zone,)
+            else:
+                for cell in cells:
+                    self._cover[cell] = self._cover.get(cell, ()) + (zone,)
+            self._kd_tree = None
+
+    def remove(self, name):
+        """Remove a zone by name; returns False if there was none"""
+        with self._lock:
+            zone = self._zones.pop(name, None)
+            if zone is None:
+                return False
+            self._unlink(zone)
+            return True
+
+    def zones(self):
+        return list(self._zones.values())
+
+    def containing(self, latitude, longitude):
+        """Zones the point lies in, nearest centre first, as (zone, distance_m)"""
+        found = []
+        for zone in self._cover.get(self._cell(latitude, longitude), ()) + self._large:
+            distance = distance_m(latitude, longitude, zone.latitude, zone.longitude)
+            if distance <= zone.radius:
+                found.append((zone, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def zone_at(self, latitude, longitude):
+        """The zone the point lies in (nearest centre if several), or None"""
+        found = self.containing(latitude, longitude)
+        return found[0][0] if found else None
+
+    def _tree(self):
+        """k-d tree over zone centres, rebuilt on the first query after a write"""
+        tree = self._kd_tree
+        if tree is None:
+            with self._lock:
+                if self._kd_tree is None:
+                    self._kd_tree = _build_kd([_unit_vector(z.latitude, z.longitude) + (z,)
+                                               for z in self._zones.values()])
+                tree = self._kd_tree
+        return tree
+
+    def nearest(self, latitude, longitude, max_distance=None):
+        """The zone whose centre is closest, as (zone, distance_m), or (None, None)"""
+        if not self._zones:
+            return None, None
+        if max_distance is None or max_distance >= math.pi * EARTH_RADIUS_M:
+            bound = 4.1  # more than the squared chord to the antipode
+        else:
+            bound = (2 * math.sin(max_distance / (2 * EARTH_RADIUS_M))) ** 2
+
+        query = _unit_vector(latitude, longitude)
+        best = [None, bound]
+        _search_kd(self._tree(), query, best)
+        zone = best[0]
+        if zone is None:
+            return None, None
+        return zone, distance_m(latitude, longitude, zone.latitude, zone.longitude)
+
+    def lookup(self, latitude, longitude, max_distance=None):
+        """Point-in-zone plus nearest zone for one point, as a response dict"""
+        found = self.containing(latitude, longitude)
+        if found:
+            nearest, distance = found[0]
+        else:
+            nearest, distance = self.nearest(latitude, longitude, max_distance)
+        return {
+            'latitude': latitude,
+            'longitude': longitude,
+            'inTrustedZone': bool(found),
+            'zones': [zone.name for zone, _ in found],
+            'nearest': nearest.to_dict() if nearest else None,
+            'distanceMeters': round(distance, 1) if distance is not None else None,
+        }
+
+    def lookup_many(self, points, max_distance=None):
+        """lookup() for a list of (latitude, longitude) pairs"""
+        return [self.lookup(latitude, longitude, max_distance) for latitude, longitude in points]
+
+    def stats(self):
+        return {
+            'zones': len(self._zones),
+            'grid_cells': len(self._cover),
+            'large_zones': len(self._large),
+            'cell_size_m': round(self.cell_deg * METERS_PER_DEGREE),
+        }
+
+
+def load_zones(index, path):
+    """Add zones from a JSON list of {name, latitude, longitude, radiusInMeters}; returns the count"""
+    with open(path, encoding='utf-8') as handle:
+        entries = json.load(handle)
+    for entry in entries:
+        index.add(TrustedZone.from_dict(entry))
+    return len(entries)